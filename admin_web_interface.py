@@ -15,8 +15,11 @@ import uuid
 
 # Import our modules
 from mvp_business_system import get_business_manager
+from asgi_bridge import AsgiApp, run_app
+from prometheus_exporter import add_metrics_route
 from admin_file_processor import AdminFileProcessor
 from improved_final_mvp_system import ImprovedFinalMVPChatbot
+from tenant_pool import get_tenant_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +28,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'admin-secret-key-change-in-production')
 CORS(app)
+add_metrics_route(app)  # Prometheus /metrics
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
@@ -39,6 +43,8 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 # Initialize components
 business_manager = get_business_manager()
 file_processor = AdminFileProcessor()
+tenant_pool = get_tenant_pool()
+tenant_pool.reloader.start()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -89,7 +95,9 @@ def create_business():
             phone=data['phone'],
             website=data.get('website', ''),
             instagram_handle=data.get('instagram_handle', ''),
-            sector=data.get('sector', 'general')
+            sector=data.get('sector', 'general'),
+            whatsapp_phone_number_id=data.get('whatsapp_phone_number_id', ''),
+            instagram_user_id=data.get('instagram_user_id', '')
         )
         
         logger.info(f"✅ Created business: {business_id}")
@@ -156,20 +164,18 @@ def upload_products(business_id):
             os.remove(file_path)
             return jsonify(processing_result), 400
         
-        # Add products to business
+        # Add products to business (single journal append + one snapshot write)
         products = processing_result['products']
-        added_count = 0
-        
-        for product in products:
-            try:
-                business_manager.add_product(business_id, product)
-                added_count += 1
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to add product {product.get('name')}: {e}")
+        upsert_result = business_manager.upsert_products(business_id, products)
+        added_count = upsert_result['inserted'] + upsert_result['updated']
         
         # Clean up uploaded file
         os.remove(file_path)
         
+        # Next test message should see the new catalog
+        if added_count:
+            tenant_pool.reload_catalog(business_id, wait=True)
+        
         logger.info(f"✅ Added {added_count} products to business {business_id}")
         
         return jsonify({
@@ -177,6 +183,8 @@ def upload_products(business_id):
             'message': f'Successfully processed and added {added_count} products',
             'processed_count': len(products),
             'added_count': added_count,
+            'inserted_count': upsert_result['inserted'],
+            'updated_count': upsert_result['updated'],
             'business_id': business_id
         })
         
@@ -191,6 +199,31 @@ def upload_products(business_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/businesses/<business_id>/catalog/reload', methods=['POST'])
+def reload_business_catalog(business_id):
+    """Rebuild the tenant catalog in the background and swap it in"""
+    try:
+        business = business_manager.get_business(business_id)
+        if not business:
+            return jsonify({
+                'success': False,
+                'error': 'Business not found'
+            }), 404
+        
+        reloading = tenant_pool.reload_catalog(business_id)
+        return jsonify({
+            'success': True,
+            'reloading': reloading,
+            'reloader': tenant_pool.reloader.get_stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Catalog reload error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/businesses/<business_id>/stats')
 def get_business_stats(business_id):
     """Get business statistics"""
@@ -243,14 +276,21 @@ def test_business_chatbot(business_id):
                 'error': 'Business not found'
             }), 404
         
-        data = request.get_json()
+        data = request.get_json() or {}
         test_message = data.get('message', 'merhaba')
         
-        # Create chatbot instance for this business
-        chatbot = business_manager.get_business_chatbot_instance(business_id)
+        # Cached per-tenant chatbot (rebuilt only when products/settings change)
+        chatbot = tenant_pool.get(business_id)
+        if not chatbot:
+            return jsonify({
+                'success': False,
+                'error': 'Chatbot could not be created'
+            }), 500
         
-        # Generate test session ID
-        session_id = f"test_{uuid.uuid4()}"
+        # Test sessions live in their own namespace; the client may send the
+        # returned test_session_id back to continue a multi-turn test
+        test_token = str(data.get('test_session_id') or uuid.uuid4().hex[:12])[:64]
+        session_id = f"admin-test:{business_id}:{test_token}"
         
         # Get response
         start_time = time.time()
@@ -265,7 +305,8 @@ def test_business_chatbot(business_id):
             'confidence': response.confidence,
             'products_found': response.products_found,
             'processing_time': round(processing_time, 3),
-            'business_id': business_id
+            'business_id': business_id,
+            'test_session_id': test_token
         })
         
     except Exception as e:
@@ -354,6 +395,9 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+# ASGI serving mode (SERVER_MODE=asgi or `uvicorn admin_web_interface:asgi_app`)
+asgi_app = AsgiApp(app)
+
 if __name__ == '__main__':
     port = int(os.environ.get('ADMIN_PORT', 5006))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -377,4 +421,4 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"❌ File Processor error: {e}")
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
+    run_app(app, asgi_app, port, debug)
\ No newline at end of file
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+ASGI Bridge
+Serves a Flask (WSGI) app under an ASGI server, with native async routes for hot paths
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AsgiRequest:
+    """Request seen by a native async route"""
+    method: str
+    path: str
+    query_string: str
+    headers: Dict[str, str]
+    body: bytes = b''
+
+    def json(self) -> Optional[Dict]:
+        try:
+            return json.loads(self.body.decode('utf-8')) if self.body else None
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    def cookie(self, name: str) -> Optional[str]:
+        cookies = SimpleCookie(self.headers.get('cookie', ''))
+        return cookies[name].value if name in cookies else None
+
+@dataclass
+class AsgiResponse:
+    """Response of a native async route; `stream` sends chunks as they are produced"""
+    body: bytes = b''
+    status: int = 200
+    content_type: str = 'application/json'
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    stream: Optional[AsyncIterator[str]] = None
+
+def json_response(data: Dict, status: int = 200, headers: List[Tuple[str, str]] = None) -> AsgiResponse:
+    return AsgiResponse(json.dumps(data, ensure_ascii=False).encode('utf-8'), status, headers=headers or [])
+
+def stream_response(chunks: AsyncIterator[str], content_type: str = 'text/event-stream',
+                    headers: List[Tuple[str, str]] = None) -> AsgiResponse:
+    return AsgiResponse(status=200, content_type=content_type, headers=headers or [], stream=chunks)
+
+class AsgiApp:
+    """ASGI application wrapping a WSGI app
+
+    Routes registered with `route` run as coroutines on the event loop, so
+    thousands of waiting conversations cost no threads. Every other request
+    is handed to the wrapped Flask app on a thread pool (ASGI_WSGI_WORKERS),
+    so all existing endpoints, extensions and sessions keep working
+    unchanged. Run with any ASGI server, e.g. `uvicorn module:asgi_app`.
+    """
+
+    def __init__(self, wsgi_app, workers: int = None):
+        self.wsgi_app = wsgi_app
+        workers = workers or int(os.getenv('ASGI_WSGI_WORKERS', '32'))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wsgi")
+        self._routes: Dict[Tuple[str, str], Callable[[AsgiRequest], Awaitable[AsgiResponse]]] = {}
+
+    def route(self, path: str, methods: Tuple[str, ...] = ('GET',)):
+        """Register a native async route (takes precedence over the WSGI app)"""
+        def decorator(handler):
+            for method in methods:
+                self._routes[(method, path)] = handler
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await self._read_body(receive)
+        handler = self._routes.get((scope['method'], scope['path']))
+        if handler is None:
+            await self._call_wsgi(scope, body, send)
+            return
+
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        request = AsgiRequest(scope['method'], scope['path'], scope['query_string'].decode('latin-1'), headers, body)
+        try:
+            response = await handler(request)
+        except Exception as e:
+            logger.error(f"❌ ASGI route {scope['path']} failed: {e}")
+            response = json_response({'error': 'Internal server error'}, 500)
+        await self._send_response(send, response)
+
+    @staticmethod
+    async def _lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    async def _send_response(send, response: AsgiResponse):
+        headers = [(b'content-type', response.content_type.encode('latin-1'))]
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers]
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+        if response.stream is None:
+            await send({'type': 'http.response.body', 'body': response.body})
+            return
+        try:
+            async for chunk in response.stream:
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        finally:
+            await response.stream.aclose()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    # WSGI fallback
+
+    @staticmethod
+    def _environ(scope, body: bytes) -> Dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1'), value.decode('latin-1')
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'content-length':
+                key = 'HTTP_' + name.upper().replace('-', '_')
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_wsgi(self, environ: Dict) -> Tuple[int, List, List[bytes]]:
+        started = {}
+        chunks: List[bytes] = []
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return chunks.append
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return started['status'], started['headers'], chunks
+
+    async def _call_wsgi(self, scope, body: bytes, send):
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(self._executor, self._run_wsgi, self._environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+def run_app(flask_app, asgi_app: AsgiApp, port: int, debug: bool = False):
+    """Start the Flask dev server, or uvicorn on the ASGI app when SERVER_MODE=asgi"""
+    if os.getenv('SERVER_MODE', 'wsgi').lower() == 'asgi':
+        import uvicorn
+        uvicorn.run(asgi_app, host='0.0.0.0', port=port)
+    else:
+        flask_app.run(debug=debug, host='0.0.0.0', port=port)
@@ -12,12 +12,14 @@ import hmac
 import hashlib
 import json
 from datetime import datetime
+from prometheus_exporter import add_metrics_route
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+add_metrics_route(app)  # Prometheus /metrics
 
 # GitHub webhook secret (güvenlik için)
 WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', 'your-github-webhook-secret')
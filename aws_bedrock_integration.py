@@ -20,6 +20,8 @@ class BedrockResponse:
     confidence: float
     model_used: str
     tokens_used: int
+    input_tokens: int = 0
+    output_tokens: int = 0
 
 class AWSBedrockClient:
     """AWS Bedrock Mistral client"""
@@ -79,14 +81,20 @@ class AWSBedrockClient:
             # Calculate confidence (simple heuristic)
             confidence = min(1.0, len(generated_text) / 100)
             
-            # Token usage
-            tokens_used = response_body.get('usage', {}).get('total_tokens', 0)
+            # Token usage (Bedrock reports it in the response headers)
+            headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            usage = response_body.get('usage', {})
+            input_tokens = int(headers.get('x-amzn-bedrock-input-token-count', usage.get('prompt_tokens', 0)))
+            output_tokens = int(headers.get('x-amzn-bedrock-output-token-count', usage.get('completion_tokens', 0)))
+            tokens_used = usage.get('total_tokens', input_tokens + output_tokens)
             
             return BedrockResponse(
                 text=generated_text.strip(),
                 confidence=confidence,
                 model_used=self.model_id,
-                tokens_used=tokens_used
+                tokens_used=tokens_used,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens
             )
             
         except Exception as e:
@@ -147,9 +155,11 @@ JSON formatı:
         response = self.generate_response(prompt, max_tokens=200, temperature=0.3)
         
         if response:
+            usage = {"input_tokens": response.input_tokens, "output_tokens": response.output_tokens}
             try:
                 # JSON parse et
                 result = json.loads(response.text)
+                result["usage"] = usage
                 return result
             except json.JSONDecodeError:
                 # Fallback
@@ -157,7 +167,8 @@ JSON formatı:
                     "intent": "other",
                     "confidence": 0.5,
                     "entities": {},
-                    "explanation": "JSON parse error"
+                    "explanation": "JSON parse error",
+                    "usage": usage
                 }
         
         return {
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Business Store
+Embedded SQLite backend for businesses and products (WAL mode, indexed lookups)
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    business_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    phone_key TEXT,
+    website TEXT,
+    instagram_handle TEXT,
+    instagram_user_id TEXT,
+    sector TEXT,
+    status TEXT,
+    created_at TEXT,
+    updated_at REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_businesses_phone_key ON businesses(phone_key);
+CREATE INDEX IF NOT EXISTS idx_businesses_status ON businesses(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_businesses_created ON businesses(created_at);
+
+CREATE TABLE IF NOT EXISTS products (
+    business_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    price REAL,
+    final_price REAL,
+    discount REAL,
+    color TEXT,
+    category TEXT,
+    stock INTEGER,
+    created_at TEXT,
+    PRIMARY KEY (business_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS idx_products_business_price ON products(business_id, final_price);
+"""
+
+# Sabit SQL metinleri: sqlite3 her bağlantıda prepared statement'ları cache'ler
+UPSERT_BUSINESS = """
+INSERT INTO businesses (business_id, name, email, phone, phone_key, website, instagram_handle,
+                        instagram_user_id, sector, status, created_at, updated_at, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(business_id) DO UPDATE SET
+    name=excluded.name, email=excluded.email, phone=excluded.phone, phone_key=excluded.phone_key,
+    website=excluded.website, instagram_handle=excluded.instagram_handle,
+    instagram_user_id=excluded.instagram_user_id, sector=excluded.sector, status=excluded.status,
+    created_at=excluded.created_at, updated_at=excluded.updated_at, data=excluded.data
+"""
+SELECT_BUSINESS = "SELECT data FROM businesses WHERE business_id = ?"
+SELECT_BUSINESS_VERSION = "SELECT updated_at FROM businesses WHERE business_id = ?"
+SELECT_SUMMARIES = """
+SELECT b.business_id, b.name, b.email, b.phone, b.website, b.instagram_handle, b.sector, b.status,
+       b.created_at, (SELECT COUNT(*) FROM products p WHERE p.business_id = b.business_id)
+FROM businesses b
+ORDER BY b.created_at
+"""
+SELECT_ALL_BUSINESSES = "SELECT data FROM businesses ORDER BY created_at"
+BUSINESSES_SIGNATURE = "SELECT COUNT(*), MAX(updated_at) FROM businesses"
+COUNT_BUSINESSES = "SELECT COUNT(*) FROM businesses"
+PRODUCT_COLUMNS = ('product_id', 'business_id', 'name', 'description', 'price', 'final_price',
+                   'discount', 'color', 'category', 'stock', 'created_at')
+UPSERT_PRODUCT = f"""
+INSERT INTO products ({', '.join(PRODUCT_COLUMNS)})
+VALUES ({', '.join('?' for _ in PRODUCT_COLUMNS)})
+ON CONFLICT(business_id, product_id) DO UPDATE SET
+    {', '.join(f'{c}=excluded.{c}' for c in PRODUCT_COLUMNS[2:])}
+"""
+SELECT_PRODUCTS = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE business_id = ? ORDER BY rowid"
+DELETE_PRODUCTS = "DELETE FROM products WHERE business_id = ?"
+COUNT_PRODUCTS = "SELECT COUNT(*) FROM products WHERE business_id = ?"
+PRODUCT_STATS = """
+SELECT COUNT(*), MIN(final_price), MAX(final_price) FROM products WHERE business_id = ?
+"""
+PRODUCT_CATEGORIES = "SELECT DISTINCT category FROM products WHERE business_id = ? AND category != ''"
+PRODUCT_COLORS = "SELECT DISTINCT color FROM products WHERE business_id = ? AND color != ''"
+
+def phone_key(phone: str) -> str:
+    """Telefonun eşleme anahtarı: son 10 hane (ülke kodu / baştaki 0 farkı yok sayılır)"""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:]
+
+class SQLiteBusinessStore:
+    """Businesses and products in one SQLite file
+
+    Every thread gets its own connection (WAL lets readers run alongside the
+    single writer); writes are serialized with a lock and grouped in one
+    transaction per call. All SQL is constant text with parameters, so each
+    statement is compiled once per connection and reused from its cache.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        with self._write_lock:
+            conn = self._connection()
+            conn.executescript(SCHEMA)
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # İşletmeler
+
+    def save_business(self, business) -> None:
+        """Insert or update a Business"""
+        data = asdict(business)
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(UPSERT_BUSINESS, (
+                    business.business_id, business.name, business.email, business.phone,
+                    phone_key(business.phone), business.website, business.instagram_handle,
+                    business.instagram_user_id, business.sector, business.status,
+                    business.created_at, time.time(), json.dumps(data, ensure_ascii=False)
+                ))
+
+    def load_business(self, business_id: str) -> Optional[Dict]:
+        """Stored Business fields as a dict"""
+        row = self._connection().execute(SELECT_BUSINESS, (business_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def business_version(self, business_id: str) -> Optional[float]:
+        """Last write time of a business (for change detection)"""
+        row = self._connection().execute(SELECT_BUSINESS_VERSION, (business_id,)).fetchone()
+        return row[0] if row else None
+
+    def list_businesses(self) -> List[Dict]:
+        """Business summaries with product counts in one query"""
+        rows = self._connection().execute(SELECT_SUMMARIES).fetchall()
+        return [{
+            "business_id": row[0],
+            "name": row[1],
+            "email": row[2],
+            "phone": row[3],
+            "website": row[4],
+            "instagram_handle": row[5],
+            "sector": row[6],
+            "status": row[7],
+            "product_count": row[9],
+            "created_at": row[8]
+        } for row in rows]
+
+    def iter_businesses(self) -> List[Dict]:
+        """All stored Business dicts (oldest first)"""
+        rows = self._connection().execute(SELECT_ALL_BUSINESSES).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def businesses_signature(self):
+        """(count, last write time): changes whenever any process writes a business"""
+        return self._connection().execute(BUSINESSES_SIGNATURE).fetchone()
+
+    def count_businesses(self) -> int:
+        return self._connection().execute(COUNT_BUSINESSES).fetchone()[0]
+
+    # Ürünler
+
+    def load_products(self, business_id: str) -> List[Dict]:
+        rows = self._connection().execute(SELECT_PRODUCTS, (business_id,)).fetchall()
+        return [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]
+
+    def count_products(self, business_id: str) -> int:
+        return self._connection().execute(COUNT_PRODUCTS, (business_id,)).fetchone()[0]
+
+    def upsert_products(self, products: Iterable) -> None:
+        """Insert or update BusinessProducts in a single transaction (row order is kept)"""
+        params = [tuple(getattr(p, column) for column in PRODUCT_COLUMNS) for p in products]
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(UPSERT_PRODUCT, params)
+
+    def replace_products(self, business_id: str, products: Iterable) -> None:
+        """Replace a business's whole product list atomically"""
+        params = [tuple(getattr(p, column) for column in PRODUCT_COLUMNS) for p in products]
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(DELETE_PRODUCTS, (business_id,))
+                conn.executemany(UPSERT_PRODUCT, params)
+
+    def product_stats(self, business_id: str) -> Dict:
+        """Count, price range, categories and colors computed in SQL"""
+        conn = self._connection()
+        count, min_price, max_price = conn.execute(PRODUCT_STATS, (business_id,)).fetchone()
+        return {
+            "product_count": count,
+            "categories": [row[0] for row in conn.execute(PRODUCT_CATEGORIES, (business_id,))],
+            "colors": [row[0] for row in conn.execute(PRODUCT_COLORS, (business_id,))],
+            "price_range": {
+                "min": min_price or 0,
+                "max": max_price or 0
+            }
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def migrate_from_json(data_dir: str = "business_data", db_path: str = None) -> Dict:
+    """Copy the JSON layout (businesses/*.json + products snapshot/journal) into SQLite
+
+    Idempotent: running it again overwrites rows with the current JSON state.
+    """
+    from mvp_business_system import MVPBusinessManager
+
+    db_path = db_path or os.path.join(data_dir, "business.db")
+    source = MVPBusinessManager(data_dir, backend='json')
+    store = SQLiteBusinessStore(db_path)
+
+    result = {'businesses': 0, 'products': 0}
+    business_dir = os.path.join(data_dir, "businesses")
+    for filename in sorted(os.listdir(business_dir)):
+        if not filename.endswith('.json'):
+            continue
+        business = source._load_business(filename[:-len('.json')])
+        if business is None:
+            continue
+        products = source._load_products(business.business_id)
+        store.save_business(business)
+        store.replace_products(business.business_id, products)
+        result['businesses'] += 1
+        result['products'] += len(products)
+
+    logger.info(f"📦 Migrated {result['businesses']} businesses, {result['products']} products → {db_path}")
+    store.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON işletme verisini SQLite'a taşı")
+    parser.add_argument("--data-dir", default="business_data")
+    parser.add_argument("--db", default=None, help="varsayılan: <data-dir>/business.db")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = migrate_from_json(args.data_dir, args.db)
+    print(f"✅ {result['businesses']} işletme, {result['products']} ürün taşındı")
+    print("Kullanmak için: BUSINESS_STORE=sqlite")
+
+if __name__ == "__main__":
+    main()
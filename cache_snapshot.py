@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Cache Snapshot System
+Saves hot cache entries on shutdown / periodically and restores them on startup
+so a deploy does not start with a cold cache
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import fields
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from catalog_service import PRODUCT_FIELDS, Product, product_to_dict
+from smart_cache_system import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+_CACHE_ENTRY_FIELDS = tuple(f.name for f in fields(CacheEntry))
+_INTENT_FIELDS = ('intent', 'entities', 'confidence')
+
+def _encode(value: Any) -> Dict:
+    """JSON fallback for cache entries and the objects cached in them (products, intent results)"""
+    if isinstance(value, CacheEntry):
+        return {'__cache_entry__': {name: getattr(value, name) for name in _CACHE_ENTRY_FIELDS}}
+    if all(hasattr(value, name) for name in PRODUCT_FIELDS):
+        return {'__product__': product_to_dict(value)}
+    if all(hasattr(value, name) for name in _INTENT_FIELDS):
+        return {'__intent__': {name: getattr(value, name) for name in _INTENT_FIELDS}}
+    raise TypeError(f"{type(value).__name__} is not snapshot serializable")
+
+def _decode(item: Dict) -> Any:
+    if '__cache_entry__' in item:
+        return CacheEntry(**item['__cache_entry__'])
+    if '__product__' in item:
+        return Product(**item['__product__'])
+    if '__intent__' in item:
+        from improved_final_mvp_system import IntentResult
+        return IntentResult(**item['__intent__'])
+    return item
+
+def snapshot_path(tenant_id: str, directory: str = None) -> str:
+    """Snapshot file of a tenant under CACHE_SNAPSHOT_DIR"""
+    directory = directory or os.getenv('CACHE_SNAPSHOT_DIR', 'cache_snapshots')
+    safe_id = re.sub(r'[^\w.-]', '_', tenant_id)
+    return os.path.join(directory, f"warm_cache_{safe_id}.json")
+
+def exit_on_sigterm():
+    """Turn SIGTERM (systemctl restart) into SystemExit so atexit snapshot hooks run"""
+    # Default SIGTERM kills the process without running atexit handlers
+    if threading.current_thread() is threading.main_thread():
+        try:
+            if signal.getsignal(signal.SIGTERM) in (signal.SIG_DFL, None):
+                signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not install SIGTERM handler: {e}")
+
+def post_deploy_hit_rate(managers: Iterable['CacheSnapshotManager']) -> float:
+    """Smart cache hit rate (%) since restore, over one or more snapshot managers"""
+    hits = requests = 0
+    for manager in managers:
+        counts = manager.post_deploy_counts()
+        if counts is not None:
+            hits += counts[0]
+            requests += counts[1]
+    return (hits / requests * 100) if requests > 0 else 0
+
+class CacheSnapshotManager:
+    """Warm cache snapshot/restore for a chatbot instance
+
+    Covers the SmartCacheSystem (positive and negative entries), the intent
+    cache and the conversation handler cache. Entries that depend on the
+    catalog are discarded on restore when the catalog version changed.
+    """
+
+    def __init__(self, chatbot, snapshot_file: str = None, max_entries: int = 300,
+                 interval: float = 600):
+        self.chatbot = chatbot
+        self.snapshot_file = snapshot_file or os.getenv('CACHE_SNAPSHOT_FILE') or snapshot_path(
+            getattr(chatbot, 'tenant_id', 'default')
+        )
+        self.max_entries = max_entries
+        self.interval = interval  # Periodic snapshot interval (seconds)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._hooks_installed = False
+        self._save_lock = threading.Lock()
+
+        self.stats = {
+            'snapshots_saved': 0,
+            'last_saved_at': 0.0,
+            'last_saved_entries': 0,
+            'restored_at': 0.0,
+            'restored_entries': 0,
+            'discarded_entries': 0,
+            'catalog_changed': False
+        }
+        self._baseline = None  # smart cache counters at restore time
+
+
+    def _hot_cache_entries(self) -> List:
+        """Most valuable SmartCacheSystem entries: by access count, then recency"""
+        smart_cache = self.chatbot.smart_cache
+        now = time.time()
+        with smart_cache._lock:
+            entries = [entry for entry in smart_cache.cache.values() if not entry.is_expired(now)]
+        entries.sort(key=lambda e: (e.access_count, e.timestamp), reverse=True)
+        return entries[:self.max_entries]
+
+    def build_snapshot(self) -> Dict:
+        """Collect hot entries from every cache layer"""
+        smart_cache = self.chatbot.smart_cache
+        now = time.time()
+
+        with smart_cache._lock:
+            negative_entries = {k: v for k, v in smart_cache.negative_cache.items() if v > now}
+
+        # Intent cache has no access metadata; dict order is insertion order (recency)
+        intent_items = list(self.chatbot.intent_cache.items())[-self.max_entries:]
+
+        conversation_cache = self.chatbot.conversation_handler.cache
+        conversation_items = sorted(
+            list(conversation_cache.items()),
+            key=lambda item: item[1]['timestamp'], reverse=True
+        )[:self.max_entries]
+
+        return {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'saved_at': now,
+            'tenant_id': getattr(self.chatbot, 'tenant_id', 'default'),
+            'catalog_version': getattr(self.chatbot, 'catalog_version', ''),
+            'smart_cache': self._hot_cache_entries(),
+            'negative_cache': negative_entries,
+            'intent_cache': dict(intent_items),
+            'conversation_cache': dict(conversation_items)
+        }
+
+    def save(self) -> int:
+        """Write a JSON snapshot atomically (unique temp file + rename); returns entry count"""
+        with self._save_lock:
+            try:
+                snapshot = self.build_snapshot()
+                entry_count = (len(snapshot['smart_cache']) + len(snapshot['negative_cache']) +
+                               len(snapshot['intent_cache']) + len(snapshot['conversation_cache']))
+
+                directory = os.path.dirname(self.snapshot_file) or '.'
+                os.makedirs(directory, exist_ok=True)
+
+                # Unique temp file in the same directory: concurrent savers never
+                # share it and the rename stays on one filesystem
+                fd, tmp_file = tempfile.mkstemp(prefix='.warm_cache_', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(snapshot, f, ensure_ascii=False, default=_encode)
+                    os.replace(tmp_file, self.snapshot_file)
+                except BaseException:
+                    os.unlink(tmp_file)
+                    raise
+
+                self.stats['snapshots_saved'] += 1
+                self.stats['last_saved_at'] = snapshot['saved_at']
+                self.stats['last_saved_entries'] = entry_count
+                logger.info(f"💾 Cache snapshot saved: {entry_count} entries → {self.snapshot_file}")
+                return entry_count
+            except Exception as e:
+                logger.error(f"Cache snapshot save failed: {e}")
+                return 0
+
+
+    def restore(self) -> int:
+        """Load the snapshot into the chatbot caches; returns restored entry count"""
+        if not os.path.exists(self.snapshot_file):
+            logger.info("No cache snapshot found, starting cold")
+            self._mark_restored(0, 0, False)
+            return 0
+
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f, object_hook=_decode)
+        except Exception as e:
+            logger.error(f"Cache snapshot load failed: {e}")
+            self._mark_restored(0, 0, False)
+            return 0
+
+        if snapshot.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            logger.warning("Cache snapshot format changed, ignoring")
+            self._mark_restored(0, 0, False)
+            return 0
+
+        now = time.time()
+        restored = 0
+        discarded = 0
+        catalog_changed = snapshot.get('catalog_version') != getattr(self.chatbot, 'catalog_version', '')
+
+        # Intent results depend only on the message text
+        for message, result in snapshot.get('intent_cache', {}).items():
+            self.chatbot.intent_cache.setdefault(message, result)
+            restored += 1
+
+        catalog_entries = (len(snapshot.get('smart_cache', [])) + len(snapshot.get('negative_cache', {})) +
+                           len(snapshot.get('conversation_cache', {})))
+        if catalog_changed:
+            # Product lists and "not found" answers are stale for a new catalog
+            discarded += catalog_entries
+            logger.info(f"Catalog changed since snapshot, discarded {catalog_entries} catalog entries")
+        else:
+            smart_cache = self.chatbot.smart_cache
+            with smart_cache._lock:
+                for entry in snapshot.get('smart_cache', []):
+                    if entry.is_expired(now) or len(smart_cache.cache) >= smart_cache.max_size:
+                        discarded += 1
+                        continue
+                    smart_cache.cache.setdefault(entry.key, entry)
+                    restored += 1
+
+                for negative_key, expires_at in snapshot.get('negative_cache', {}).items():
+                    if expires_at <= now:
+                        discarded += 1
+                        continue
+                    smart_cache.negative_cache.setdefault(negative_key, expires_at)
+                    restored += 1
+
+            conversation_handler = self.chatbot.conversation_handler
+            for cache_key, item in snapshot.get('conversation_cache', {}).items():
+                if now - item['timestamp'] >= conversation_handler.cache_ttl:
+                    discarded += 1
+                    continue
+                conversation_handler.cache.setdefault(cache_key, item)
+                restored += 1
+
+        self._mark_restored(restored, discarded, catalog_changed)
+        logger.info(f"♻️ Cache snapshot restored: {restored} entries ({discarded} discarded)")
+        return restored
+
+    def _mark_restored(self, restored: int, discarded: int, catalog_changed: bool):
+        cache_stats = self.chatbot.smart_cache.stats
+        self._baseline = {
+            'hits': cache_stats['hits'],
+            'total_requests': cache_stats['total_requests']
+        }
+        self.stats['restored_at'] = time.time()
+        self.stats['restored_entries'] = restored
+        self.stats['discarded_entries'] = discarded
+        self.stats['catalog_changed'] = catalog_changed
+
+
+    def start_periodic(self):
+        """Save a snapshot every `interval` seconds in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def _run():
+            while not self._stop_event.wait(self.interval):
+                self.save()
+
+        self._thread = threading.Thread(target=_run, name="cache-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self, save: bool = True):
+        """Stop periodic snapshots; optionally write a final one"""
+        self._stop_event.set()
+        if save:
+            self.save()
+
+    def install_shutdown_hooks(self):
+        """Save on graceful shutdown (atexit, and SIGTERM from systemctl restart)"""
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+        atexit.register(self.stop)
+        exit_on_sigterm()
+
+
+    def post_deploy_counts(self) -> Optional[Tuple[int, int]]:
+        """(hits, requests) of the smart cache since restore; None before restore"""
+        if self._baseline is None:
+            return None
+        cache_stats = self.chatbot.smart_cache.stats
+        return (cache_stats['hits'] - self._baseline['hits'],
+                cache_stats['total_requests'] - self._baseline['total_requests'])
+
+    def get_stats(self) -> Dict:
+        """Snapshot statistics including the post-deploy hit rate"""
+        stats = dict(self.stats)
+        counts = self.post_deploy_counts()
+        if counts is not None:
+            stats['post_deploy_requests'] = counts[1]
+            stats['post_deploy_hit_rate'] = post_deploy_hit_rate([self])
+            stats['seconds_since_restore'] = time.time() - self.stats['restored_at']
+        return stats
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Catalog Reloader
+Watches products files and hot-swaps rebuilt catalogs into running chatbots
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+from catalog_service import catalog_file_stat, get_catalog_service
+from improved_final_mvp_system import ChatbotCatalog, build_catalog
+
+logger = logging.getLogger(__name__)
+
+class CatalogReloader:
+    """mtime polling watcher with background rebuilds
+
+    Chatbots are grouped by products file so a catalog shared by many
+    tenants is rebuilt once and swapped into all of them. The new catalog
+    (products, RAG index, analyzer) is fully built in a background thread
+    before `swap_catalog` switches each chatbot over.
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval if interval is not None else float(os.getenv('CATALOG_RELOAD_INTERVAL', '30'))
+
+        self._chatbots: "weakref.WeakSet" = weakref.WeakSet()
+        self._file_stats: Dict[str, Optional[Tuple]] = {}
+        self._building: Dict[str, threading.Thread] = {}
+        self._listeners: List[Callable[[str, ChatbotCatalog], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'checks': 0,
+            'reloads': 0,
+            'swaps': 0,
+            'reload_errors': 0,
+            'last_reload_at': 0.0,
+            'last_build_time': 0.0
+        }
+
+    def register(self, chatbot):
+        """Watch a chatbot's products file"""
+        with self._lock:
+            self._chatbots.add(chatbot)
+            self._file_stats.setdefault(chatbot.products_file, catalog_file_stat(chatbot.products_file))
+
+    def add_listener(self, listener: Callable[[str, ChatbotCatalog], None]):
+        """Called with (products_file, catalog) after every swap"""
+        self._listeners.append(listener)
+
+    def _chatbots_by_file(self) -> Dict[str, List]:
+        groups: Dict[str, List] = {}
+        with self._lock:
+            for chatbot in list(self._chatbots):
+                groups.setdefault(chatbot.products_file, []).append(chatbot)
+        return groups
+
+    def check(self) -> int:
+        """Start a reload for every watched file that changed; returns reloads started"""
+        started = 0
+        with self._lock:
+            self.stats['checks'] += 1
+        for products_file in self._chatbots_by_file():
+            file_stat = catalog_file_stat(products_file)
+            with self._lock:
+                if self._file_stats.get(products_file) == file_stat:
+                    continue
+            if self.reload(products_file) is not None:
+                started += 1
+        return started
+
+    def reload(self, products_file: str, wait: bool = False) -> Optional[threading.Thread]:
+        """Rebuild a products file's catalog in the background and swap it in"""
+        with self._lock:
+            thread = self._building.get(products_file)
+            if thread is None or not thread.is_alive():
+                # Record the stat now so the poller does not start a second build
+                self._file_stats[products_file] = catalog_file_stat(products_file)
+                thread = threading.Thread(target=self._build_and_swap, args=(products_file,),
+                                          name="catalog-reload", daemon=True)
+                self._building[products_file] = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def _build_and_swap(self, products_file: str):
+        chatbots = self._chatbots_by_file().get(products_file, [])
+        if not chatbots:
+            return
+
+        try:
+            # Malformed / half-written file raises: the live catalog stays in place
+            catalog_data = get_catalog_service().load(products_file, strict=True)
+
+            # Touched but unchanged content: nothing to rebuild
+            if all(chatbot.catalog_version == catalog_data.version for chatbot in chatbots):
+                return
+
+            start_time = time.time()
+            catalog = build_catalog(products_file, chatbots[0].model, catalog_data)
+            build_time = time.time() - start_time
+
+            swapped = sum(1 for chatbot in chatbots if chatbot.swap_catalog(catalog))
+            for listener in self._listeners:
+                listener(products_file, catalog)
+
+            with self._lock:
+                self.stats['reloads'] += 1
+                self.stats['swaps'] += swapped
+                self.stats['last_reload_at'] = time.time()
+                self.stats['last_build_time'] = build_time
+            logger.info(f"🔄 Catalog reloaded: {products_file} v{catalog.version} "
+                        f"({swapped} chatbots, built in {build_time:.2f}s)")
+        except Exception as e:
+            logger.error(f"❌ Catalog reload failed for {products_file}: {e}")
+            with self._lock:
+                self.stats['reload_errors'] += 1
+        finally:
+            with self._lock:
+                self._building.pop(products_file, None)
+
+    def start(self):
+        """Poll watched files every `interval` seconds in a daemon thread"""
+        if (self._thread and self._thread.is_alive()) or self.interval <= 0:
+            return
+
+        def _run():
+            while not self._stop_event.wait(self.interval):
+                self.check()
+
+        self._thread = threading.Thread(target=_run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def get_stats(self) -> Dict:
+        """Reloader statistics"""
+        with self._lock:
+            return {
+                **self.stats,
+                'watched_files': len(self._file_stats),
+                'watched_chatbots': len(self._chatbots),
+                'reloads_in_flight': len(self._building)
+            }
+
+# Global instance
+_catalog_reloader = None
+_catalog_reloader_lock = threading.Lock()
+
+def get_catalog_reloader() -> CatalogReloader:
+    """Get global catalog reloader"""
+    global _catalog_reloader
+    with _catalog_reloader_lock:
+        if _catalog_reloader is None:
+            _catalog_reloader = CatalogReloader()
+        return _catalog_reloader
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Catalog Service
+Parses a products file once into a shared, immutable in-memory catalog
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import weakref
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from columnar_catalog import ColumnarCatalog
+
+logger = logging.getLogger(__name__)
+
+FIELD_SAMPLE_LIMIT = 3
+PRODUCT_FIELDS = ('name', 'color', 'price', 'discount', 'final_price', 'category', 'stock', 'description')
+
+@dataclass(frozen=True)
+class Product:
+    name: str
+    color: str
+    price: float
+    discount: float
+    final_price: float
+    category: str
+    stock: int
+    description: str = ""
+
+@dataclass(frozen=True)
+class FieldSchema:
+    """Fields present in the catalog and a few sample values per field"""
+    available_fields: FrozenSet[str] = frozenset()
+    field_samples: Mapping[str, Tuple[str, ...]] = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class CatalogData:
+    """Canonical parsed catalog shared by the chatbot, RAG index and analyzer"""
+    products_file: str
+    version: str  # md5 of the file contents
+    products: Sequence[Product]  # ProductRow views over `columns` when NumPy is available
+    schema: FieldSchema
+    columns: Optional['ColumnarCatalog'] = None
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+def _to_product(item: Dict) -> Product:
+    return Product(
+        name=item['name'],
+        color=item['color'],
+        price=item['price'],
+        discount=item['discount'],
+        final_price=item['final_price'],
+        category=item['category'],
+        stock=item['stock']
+    )
+
+def product_to_dict(product) -> Dict:
+    """Plain dict of a Product or ProductRow"""
+    return {field_name: getattr(product, field_name) for field_name in PRODUCT_FIELDS}
+
+def _build_columns(products_data: List[Dict]):
+    try:
+        from columnar_catalog import ColumnarCatalog, ProductRows
+    except ImportError:  # NumPy not installed
+        return None, None
+    columns = ColumnarCatalog(products_data)
+    return columns, ProductRows(columns)
+
+def journal_path(products_file: str) -> str:
+    """Append-only journal next to a products file (products.json -> products.journal)"""
+    return os.path.splitext(products_file)[0] + '.journal'
+
+def _file_stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def catalog_file_stat(products_file: str) -> Optional[Tuple]:
+    """Change signature of a products file and its journal (None if the file is missing)"""
+    file_stat = _file_stat(products_file)
+    if file_stat is None:
+        return None
+    return (file_stat, _file_stat(journal_path(products_file)))
+
+def _replay_journal(products_data: List[Dict], journal_data: bytes):
+    """Apply journal upserts over the snapshot items, matched by product_id"""
+    positions = {item['product_id']: i for i, item in enumerate(products_data) if item.get('product_id')}
+    for line in journal_data.decode('utf-8').splitlines():
+        try:
+            product = json.loads(line)['product']
+        except json.JSONDecodeError:
+            continue  # Half-written last line (crash)
+        index = positions.get(product['product_id'])
+        if index is None:
+            positions[product['product_id']] = len(products_data)
+            products_data.append(product)
+        else:
+            products_data[index] = product
+
+def parse_catalog(products_file: str, raw_data: bytes, journal_data: bytes = b'') -> CatalogData:
+    """Single pass over the products: columnar store (or Product objects) and field schema"""
+    products_data = json.loads(raw_data.decode('utf-8')) if raw_data else []
+    if journal_data:
+        _replay_journal(products_data, journal_data)
+
+    available_fields = set()
+    field_samples: Dict[str, List[str]] = {}
+
+    for item in products_data:
+        for field_name, value in item.items():
+            available_fields.add(field_name)
+            samples = field_samples.setdefault(field_name, [])
+            if value and len(samples) < FIELD_SAMPLE_LIMIT:
+                samples.append(str(value))
+
+    schema = FieldSchema(
+        available_fields=frozenset(available_fields),
+        field_samples=MappingProxyType({k: tuple(v) for k, v in field_samples.items()})
+    )
+    columns, products = _build_columns(products_data)
+    if columns is None:
+        products = tuple(_to_product(item) for item in products_data)
+
+    return CatalogData(
+        products_file=products_file,
+        version=hashlib.md5(raw_data + journal_data).hexdigest()[:12],
+        products=products,
+        schema=schema,
+        columns=columns
+    )
+
+class CatalogLoadError(Exception):
+    """A products file could not be read or parsed"""
+
+class CatalogService:
+    """Loads each products file once per on-disk version
+
+    Catalogs are held weakly: a catalog stays cached while some component
+    (chatbot, RAG index, analyzer) uses it, and a changed file (mtime/size
+    of the file or its journal) is parsed again on the next load. Products
+    appended to the journal by MVPBusinessManager are replayed over the file.
+    """
+
+    def __init__(self):
+        self._catalogs: "weakref.WeakValueDictionary[str, CatalogData]" = weakref.WeakValueDictionary()
+        self._file_stats: Dict[str, Optional[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'loads': 0,
+            'parses': 0,
+            'parse_errors': 0
+        }
+
+    def load(self, products_file: str, strict: bool = False) -> CatalogData:
+        """Get the parsed catalog for a products file (parsing only if needed)
+
+        An unreadable or malformed file (e.g. half-written during an upload)
+        raises CatalogLoadError when `strict`; otherwise the last good catalog
+        of the file is returned, or an empty one if there never was one.
+        """
+        file_stat = catalog_file_stat(products_file)
+
+        with self._lock:
+            self.stats['loads'] += 1
+            catalog = self._catalogs.get(products_file)
+            if catalog is not None and self._file_stats.get(products_file) == file_stat:
+                return catalog
+
+            try:
+                # Journal first: compaction rewrites the file before it removes
+                # the journal, so an old journal is at worst replayed twice
+                try:
+                    with open(journal_path(products_file), 'rb') as f:
+                        journal_data = f.read()
+                except FileNotFoundError:
+                    journal_data = b''
+                with open(products_file, 'rb') as f:
+                    raw_data = f.read()
+                new_catalog = parse_catalog(products_file, raw_data, journal_data)
+            except Exception as e:
+                logger.error(f"❌ Error loading products from {products_file}: {e}")
+                self.stats['parse_errors'] += 1
+                if strict:
+                    raise CatalogLoadError(f"{products_file}: {e}") from e
+                if catalog is not None:
+                    # Keep serving the last good parse; the file is retried next load
+                    return catalog
+                new_catalog = CatalogData(products_file, '', (), FieldSchema())
+
+            self._catalogs[products_file] = new_catalog
+            self._file_stats[products_file] = file_stat
+            self.stats['parses'] += 1
+            logger.info(f"📦 Catalog loaded: {products_file} ({len(new_catalog)} products, v{new_catalog.version})")
+            return new_catalog
+
+    def get_stats(self) -> Dict:
+        """Catalog service statistics"""
+        with self._lock:
+            return {
+                **self.stats,
+                'cached_catalogs': len(self._catalogs)
+            }
+
+# Global instance
+_catalog_service = CatalogService()
+
+def get_catalog_service() -> CatalogService:
+    """Get global catalog service"""
+    return _catalog_service
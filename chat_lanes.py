@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Chat Lanes
+Fast lane (inline) for rule-answerable messages, bounded slow lane for LLM-bound ones
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class _LaneStats:
+    __slots__ = ('requests', 'total_time', 'max_time')
+
+    def __init__(self):
+        self.requests = 0
+        self.total_time = self.max_time = 0.0
+
+    def record(self, elapsed: float):
+        self.requests += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def as_dict(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'avg_time': self.total_time / self.requests if self.requests else 0.0,
+            'max_time': self.max_time
+        }
+
+class _Admission:
+    """Slots of one kind of caller (thread-bound or async) on the slow pool"""
+    __slots__ = ('slots', 'capacity', 'pending', 'rejected')
+
+    def __init__(self, capacity: int):
+        self.slots = threading.BoundedSemaphore(capacity)
+        self.capacity = capacity
+        self.pending = 0
+        self.rejected = 0
+
+class ChatLaneExecutor:
+    """Two-lane chat dispatch
+
+    Fast-lane work runs inline on the caller's thread and never waits for
+    anything. Slow-lane work (anything that may call an LLM) runs on a
+    fixed pool of `slow_workers` threads with at most `slow_queue` more
+    waiting; beyond that `submit_slow` refuses instead of queueing. Keeping
+    workers + queue below the web server's thread count means LLM backlog
+    can never hold every request thread, so greetings and fixed answers
+    keep their microsecond latency.
+
+    Async callers (ASGI mode) wait as coroutines, not threads, so
+    `submit_slow_async` admits up to `async_queue` more jobs to the same
+    workers without touching the thread-bound WSGI limit.
+    """
+
+    def __init__(self, slow_workers: int = None, slow_queue: int = None, async_queue: int = None,
+                 name: str = "chat"):
+        self.slow_workers = slow_workers or int(os.getenv('CHAT_SLOW_WORKERS', '8'))
+        self.slow_queue = slow_queue if slow_queue is not None else int(os.getenv('CHAT_SLOW_QUEUE', '16'))
+        self.async_queue = (async_queue if async_queue is not None
+                            else int(os.getenv('CHAT_ASYNC_SLOW_QUEUE', '4096')))
+        self._pool = ThreadPoolExecutor(max_workers=self.slow_workers, thread_name_prefix=f"{name}-slow")
+        self._sync = _Admission(self.slow_workers + self.slow_queue)
+        self._async = _Admission(self.slow_workers + self.async_queue)
+        self._lock = threading.Lock()
+        self._fast = _LaneStats()
+        self._slow = _LaneStats()
+
+    def run_fast(self, fn: Callable, *args, **kwargs):
+        """Run inline on the calling thread"""
+        start_time = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.time() - start_time
+            with self._lock:
+                self._fast.record(elapsed)
+
+    def submit_slow(self, fn: Callable, *args, **kwargs) -> Optional[Future]:
+        """Queue on the slow pool; None if the pool and its queue are full"""
+        return self._submit(self._sync, fn, args, kwargs)
+
+    def submit_slow_async(self, fn: Callable, *args, **kwargs) -> Optional[Future]:
+        """Queue on the slow pool for an async caller; None if the async queue is full"""
+        return self._submit(self._async, fn, args, kwargs)
+
+    def _submit(self, admission: _Admission, fn: Callable, args, kwargs) -> Optional[Future]:
+        if not admission.slots.acquire(blocking=False):
+            with self._lock:
+                admission.rejected += 1
+            return None
+        with self._lock:
+            admission.pending += 1
+        submitted_at = time.time()
+
+        def run():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.time() - submitted_at
+                with self._lock:
+                    admission.pending -= 1
+                    self._slow.record(elapsed)
+                admission.slots.release()
+
+        return self._pool.submit(run)
+
+    def get_stats(self) -> Dict:
+        """Per-lane request counts and latency (slow lane includes queue wait)"""
+        with self._lock:
+            return {
+                'fast': self._fast.as_dict(),
+                'slow': {
+                    **self._slow.as_dict(),
+                    'pending': self._sync.pending,
+                    'workers': self.slow_workers,
+                    'capacity': self._sync.capacity,
+                    'rejected': self._sync.rejected,
+                    'async_pending': self._async.pending,
+                    'async_capacity': self._async.capacity,
+                    'async_rejected': self._async.rejected
+                }
+            }
+
+# Global instance
+_chat_lanes = None
+_chat_lanes_lock = threading.Lock()
+
+def get_chat_lanes() -> ChatLaneExecutor:
+    """Get global chat lane executor (one slow pool per process)"""
+    global _chat_lanes
+    with _chat_lanes_lock:
+        if _chat_lanes is None:
+            _chat_lanes = ChatLaneExecutor()
+        return _chat_lanes
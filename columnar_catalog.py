@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Columnar Catalog Store
+Hot product fields as NumPy columns with slot-based row views
+"""
+
+import sys
+from collections.abc import Sequence
+from dataclasses import astuple
+from typing import Dict, Iterable, List, Optional, Sequence as SequenceType, Tuple, Union
+
+import numpy as np
+
+from catalog_service import Product
+
+def _encode(values: Iterable[str]) -> Tuple[np.ndarray, Tuple[str, ...], Dict[str, int]]:
+    """Categorical encoding: small integer codes plus a table of interned strings"""
+    table: List[str] = []
+    index: Dict[str, int] = {}
+    codes = []
+    for value in values:
+        value = sys.intern(str(value or ''))
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(table)
+            table.append(value)
+        codes.append(code)
+    dtype = np.int16 if len(table) < 2 ** 15 else np.int32
+    return np.asarray(codes, dtype=dtype), tuple(table), index
+
+class ColumnarCatalog:
+    """Products stored column-wise
+
+    price/final_price/discount/stock are NumPy arrays so filters and sorts
+    run vectorized; color and category are categorical codes into interned
+    string tables. Code that needs objects gets `ProductRow` views.
+    """
+
+    __slots__ = ('names', 'descriptions', 'price', 'final_price', 'discount', 'stock',
+                 'color_codes', 'colors', 'category_codes', 'categories',
+                 '_color_index', '_category_index')
+
+    def __init__(self, records: List[Dict]):
+        self.names = tuple(str(item['name']) for item in records)
+        self.descriptions = tuple(sys.intern(str(item.get('description', '') or '')) for item in records)
+        self.price = np.asarray([item['price'] for item in records], dtype=np.float64)
+        self.final_price = np.asarray([item['final_price'] for item in records], dtype=np.float64)
+        self.discount = np.asarray([item['discount'] for item in records], dtype=np.float64)
+        self.stock = np.asarray([item['stock'] for item in records], dtype=np.int32)
+        self.color_codes, self.colors, self._color_index = _encode(item['color'] for item in records)
+        self.category_codes, self.categories, self._category_index = _encode(item['category'] for item in records)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def row(self, row_id: int) -> 'ProductRow':
+        return ProductRow(self, int(row_id))
+
+    def rows(self, row_ids: Iterable[int] = None) -> List['ProductRow']:
+        if row_ids is None:
+            row_ids = range(len(self))
+        return [ProductRow(self, int(row_id)) for row_id in row_ids]
+
+    def materialize(self, row_id: int) -> Product:
+        """Standalone Product for a row (for pickling / caching outside the catalog)"""
+        return Product(
+            name=self.names[row_id],
+            color=self.colors[self.color_codes[row_id]],
+            price=float(self.price[row_id]),
+            discount=float(self.discount[row_id]),
+            final_price=float(self.final_price[row_id]),
+            category=self.categories[self.category_codes[row_id]],
+            stock=int(self.stock[row_id]),
+            description=self.descriptions[row_id]
+        )
+
+    def mask(self, color: str = None, category: str = None, in_stock: bool = False,
+             discounted: bool = False, min_price: float = None, max_price: float = None) -> np.ndarray:
+        """Vectorized filter; returns a boolean mask over all rows"""
+        result = np.ones(len(self), dtype=bool)
+        if color is not None:
+            result &= self.color_codes == self._color_index.get(color, -1)
+        if category is not None:
+            result &= self.category_codes == self._category_index.get(category, -1)
+        if in_stock:
+            result &= self.stock > 0
+        if discounted:
+            result &= self.discount > 0
+        if min_price is not None:
+            result &= self.final_price >= min_price
+        if max_price is not None:
+            result &= self.final_price <= max_price
+        return result
+
+    def sort_ids(self, column: Union[str, SequenceType[float]] = 'final_price',
+                 row_ids: Optional[np.ndarray] = None, descending: bool = False) -> np.ndarray:
+        """Row ids ordered by a numeric column or per-row values such as search scores
+
+        Only the given ids are sorted when `row_ids` is passed. Ties keep
+        catalog order in both directions (like `sorted(..., reverse=True)`).
+        """
+        values = getattr(self, column) if isinstance(column, str) else np.asarray(column, dtype=np.float64)
+        if row_ids is None:
+            row_ids = np.arange(len(self))
+        keys = values[row_ids]
+        order = np.argsort(-keys if descending else keys, kind='stable')
+        return row_ids[order]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory of the column arrays (strings excluded)"""
+        return sum(getattr(self, name).nbytes for name in
+                   ('price', 'final_price', 'discount', 'stock', 'color_codes', 'category_codes'))
+
+class ProductRow:
+    """Read-only view of one catalog row with the Product interface"""
+
+    __slots__ = ('_catalog', 'row_id')
+
+    def __init__(self, catalog: ColumnarCatalog, row_id: int):
+        self._catalog = catalog
+        self.row_id = row_id
+
+    @property
+    def name(self) -> str:
+        return self._catalog.names[self.row_id]
+
+    @property
+    def color(self) -> str:
+        return self._catalog.colors[self._catalog.color_codes[self.row_id]]
+
+    @property
+    def category(self) -> str:
+        return self._catalog.categories[self._catalog.category_codes[self.row_id]]
+
+    @property
+    def price(self) -> float:
+        return float(self._catalog.price[self.row_id])
+
+    @property
+    def final_price(self) -> float:
+        return float(self._catalog.final_price[self.row_id])
+
+    @property
+    def discount(self) -> float:
+        return float(self._catalog.discount[self.row_id])
+
+    @property
+    def stock(self) -> int:
+        return int(self._catalog.stock[self.row_id])
+
+    @property
+    def description(self) -> str:
+        return self._catalog.descriptions[self.row_id]
+
+    def __reduce__(self):
+        # Cache snapshots must not drag the whole catalog along
+        return (Product, astuple(self._catalog.materialize(self.row_id)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ProductRow):
+            return self._catalog is other._catalog and self.row_id == other.row_id
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._catalog), self.row_id))
+
+    def __repr__(self) -> str:
+        return f"ProductRow({self.row_id}, {self.name!r}, {self.color!r}, {self.final_price})"
+
+class ProductRows(Sequence):
+    """Lazy sequence of row views (no per-product objects kept alive)"""
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: ColumnarCatalog):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.columns.rows(range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ProductRow(self.columns, index)
+
+    def __iter__(self):
+        columns = self.columns
+        for row_id in range(len(columns)):
+            yield ProductRow(columns, row_id)
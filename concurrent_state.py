@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Concurrent State
+Lock-striped counters and a bounded thread-safe cache for state shared by request threads
+"""
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_stripe_ids = itertools.count()
+_thread_stripe = threading.local()
+
+def stripe_index(stripes: int) -> int:
+    """Stable per-thread stripe (thread idents are aligned addresses, so not hashed)"""
+    stripe = getattr(_thread_stripe, 'index', None)
+    if stripe is None:
+        stripe = _thread_stripe.index = next(_stripe_ids)
+    return stripe % stripes
+
+class StripedCounters:
+    """Named counters spread over lock stripes
+
+    Each thread adds to its own stripe, so request threads never contend on
+    one lock (or lose a read-modify-write) when bumping `total_requests`.
+    Reads sum every stripe. Values may be int or float (e.g. total latency).
+    """
+
+    def __init__(self, names: Iterable[str], stripes: int = None):
+        self.names = tuple(names)
+        stripes = stripes or int(os.getenv('STATS_STRIPES', '16'))
+        self._stripes: List[Tuple[threading.Lock, Dict[str, float]]] = [
+            (threading.Lock(), dict.fromkeys(self.names, 0)) for _ in range(stripes)
+        ]
+
+    def add(self, name: str, amount=1):
+        lock, values = self._stripes[stripe_index(len(self._stripes))]
+        with lock:
+            values[name] += amount
+
+    def __getitem__(self, name: str):
+        total = 0
+        for lock, values in self._stripes:
+            with lock:
+                total += values[name]
+        return total
+
+    def snapshot(self) -> Dict[str, float]:
+        """All counters summed over the stripes"""
+        totals = dict.fromkeys(self.names, 0)
+        for lock, values in self._stripes:
+            with lock:
+                for name, value in values.items():
+                    totals[name] += value
+        return totals
+
+class BoundedCache:
+    """Thread-safe dict with LRU eviction
+
+    Drop-in for the plain dict caches (`get`, `setdefault`, `items`, `in`,
+    `len`); `put` evicts the least recently used entries once `max_size`
+    is exceeded instead of iterating the dict while other threads write.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def setdefault(self, key: str, value: Any) -> Any:
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+            self._data[key] = value
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            return value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot, oldest first"""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
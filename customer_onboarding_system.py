@@ -14,6 +14,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from urllib.parse import urlencode
 from mvp_business_system import get_business_manager
+from asgi_bridge import AsgiApp, run_app
+from prometheus_exporter import add_metrics_route
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -26,6 +28,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'customer-onboarding-secret-key')
 CORS(app)
+add_metrics_route(app)  # Prometheus /metrics
 
 # Instagram API Configuration
 INSTAGRAM_APP_ID = os.getenv('INSTAGRAM_APP_ID', 'your-instagram-app-id')
@@ -430,6 +433,9 @@ def not_found(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
+# ASGI serving mode (SERVER_MODE=asgi or `uvicorn customer_onboarding_system:asgi_app`)
+asgi_app = AsgiApp(app)
+
 if __name__ == '__main__':
     port = int(os.environ.get('CUSTOMER_PORT', 5008))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -456,4 +462,4 @@ if __name__ == '__main__':
     print("   INSTAGRAM_APP_ID=your-app-id")
     print("   INSTAGRAM_APP_SECRET=your-app-secret")
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
+    run_app(app, asgi_app, port, debug)
\ No newline at end of file
@@ -4,46 +4,27 @@ Database Analyzer
 Analyzes product database structure and available fields
 """
 
-import json
 import logging
 from typing import Dict, List, Set
 
+from catalog_service import FieldSchema, get_catalog_service
+
 logger = logging.getLogger(__name__)
 
 class DatabaseAnalyzer:
     """Analyzes database structure for dynamic responses"""
     
-    def __init__(self, products_file: str = 'data/products.json'):
+    def __init__(self, products_file: str = 'data/products.json', schema: FieldSchema = None):
         self.products_file = products_file
-        self.available_fields = set()
-        self.field_samples = {}
-        self._analyze_database()
-    
-    def _analyze_database(self):
-        """Analyze database structure"""
-        try:
-            with open(self.products_file, 'r', encoding='utf-8') as f:
-                products = json.load(f)
-            
-            if not products:
-                return
-            
-            # Analyze all fields across all products
-            for product in products:
-                for field, value in product.items():
-                    self.available_fields.add(field)
-                    
-                    # Store sample values
-                    if field not in self.field_samples:
-                        self.field_samples[field] = []
-                    
-                    if value and len(self.field_samples[field]) < 3:
-                        self.field_samples[field].append(str(value))
-            
+        
+        # Field schema is a by-product of catalog loading; no separate scan
+        if schema is None:
+            schema = get_catalog_service().load(products_file).schema
+        self.available_fields: Set[str] = set(schema.available_fields)
+        self.field_samples: Dict[str, List[str]] = {k: list(v) for k, v in schema.field_samples.items()}
+        
+        if self.available_fields:
             logger.info(f"Database analysis complete. Available fields: {self.available_fields}")
-            
-        except Exception as e:
-            logger.error(f"Database analysis error: {e}")
     
     def has_field(self, field_name: str) -> bool:
         """Check if database has a specific field"""
@@ -6,10 +6,15 @@ Handles conversation context, ambiguous inputs, and edge cases
 
 import json
 import logging
+import os
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
 from attribute_system import handle_attribute_query
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -30,6 +35,7 @@ class ConversationContext:
     clarification_attempts: int = 0
     user_preferences: Dict = None
     conversation_history: List[Dict] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
     
     def __post_init__(self):
         if self.last_products is None:
@@ -39,13 +45,25 @@ class ConversationContext:
         if self.conversation_history is None:
             self.conversation_history = []
 
+# Session of the request running in this thread / task (bound by `session()`)
+_current_session: ContextVar[str] = ContextVar('conversation_session', default='')
+
 class EnhancedConversationHandler:
-    """Handles complex conversation scenarios"""
+    """Handles complex conversation scenarios
+    
+    One handler serves every conversation of a chatbot. `context` is the
+    context of the session bound with `session()` on the current thread, so
+    concurrent requests never read or overwrite each other's history and
+    last products. Requests without a session id share the '' session.
+    """
     
-    def __init__(self):
-        self.context = ConversationContext(ConversationState.GREETING)
+    def __init__(self, max_sessions: int = None):
+        self.max_sessions = max_sessions or int(os.getenv('CONVERSATION_MAX_SESSIONS', '5000'))
+        self._sessions: "OrderedDict[str, ConversationContext]" = OrderedDict()
+        self._sessions_lock = threading.Lock()
         self.cache = {}  # Simple in-memory cache
         self.cache_ttl = 300  # 5 minutes
+        self._cache_lock = threading.Lock()
         
         # Ambiguous input patterns
         self.ambiguous_patterns = {
@@ -77,6 +95,30 @@ class EnhancedConversationHandler:
             "multiple_meanings": "Ne demek istediğinizi açıklayabilir misiniz?"
         }
     
+    @contextmanager
+    def session(self, session_id: Optional[str]) -> Iterator[ConversationContext]:
+        """Bind the conversation of `session_id` to the current request"""
+        token = _current_session.set(session_id or '')
+        try:
+            yield self.context
+        finally:
+            _current_session.reset(token)
+    
+    @property
+    def context(self) -> ConversationContext:
+        """Context of the session bound to the current request"""
+        session_id = _current_session.get()
+        with self._sessions_lock:
+            context = self._sessions.get(session_id)
+            if context is None:
+                context = self._sessions[session_id] = ConversationContext(ConversationState.GREETING)
+                # Least recently active conversations are forgotten first
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return context
+    
     def detect_ambiguity(self, message: str) -> Tuple[bool, List[str]]:
         """Detect if message has multiple possible meanings"""
         message_lower = message.lower().strip()
@@ -167,57 +209,61 @@ class EnhancedConversationHandler:
     def get_cached_response(self, query: str) -> Optional[Dict]:
         """Get cached response if available"""
         cache_key = query.lower().strip()
-        if cache_key in self.cache:
-            cached_item = self.cache[cache_key]
+        with self._cache_lock:
+            cached_item = self.cache.get(cache_key)
+            if cached_item is None:
+                return None
             if time.time() - cached_item['timestamp'] < self.cache_ttl:
                 logger.info(f"Cache hit for: {query}")
                 return cached_item['response']
-            else:
-                # Remove expired cache
-                del self.cache[cache_key]
+            # Remove expired cache
+            del self.cache[cache_key]
         return None
     
     def cache_response(self, query: str, response: Dict):
         """Cache response for future use"""
         cache_key = query.lower().strip()
-        self.cache[cache_key] = {
-            'response': response,
-            'timestamp': time.time()
-        }
-        
-        # Simple cache cleanup (keep last 100 items)
-        if len(self.cache) > 100:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]['timestamp'])
-            del self.cache[oldest_key]
+        with self._cache_lock:
+            self.cache[cache_key] = {
+                'response': response,
+                'timestamp': time.time()
+            }
+            
+            # Simple cache cleanup (keep last 100 items)
+            if len(self.cache) > 100:
+                oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]['timestamp'])
+                del self.cache[oldest_key]
     
     def update_context(self, message: str, intent: str, products: List[Dict] = None):
         """Update conversation context"""
-        # Add to history
-        self.context.conversation_history.append({
-            'message': message,
-            'intent': intent,
-            'timestamp': time.time(),
-            'products_count': len(products) if products else 0
-        })
-        
-        # Keep only last 10 messages
-        if len(self.context.conversation_history) > 10:
-            self.context.conversation_history = self.context.conversation_history[-10:]
-        
-        # Update state
-        if intent == "greeting":
-            self.context.state = ConversationState.GREETING
-        elif intent == "product_search":
-            self.context.state = ConversationState.PRODUCT_SEARCH
-            if products:
-                self.context.last_products = products
-                self.context.last_query = message
-        elif intent in ["goodbye", "thanks"]:
-            self.context.state = ConversationState.GOODBYE
-        elif intent == "unclear":
-            self.context.clarification_attempts += 1
-            if self.context.clarification_attempts > 2:
-                self.context.state = ConversationState.CLARIFICATION
+        context = self.context
+        with context.lock:
+            # Add to history
+            context.conversation_history.append({
+                'message': message,
+                'intent': intent,
+                'timestamp': time.time(),
+                'products_count': len(products) if products else 0
+            })
+        
+            # Keep only last 10 messages
+            if len(context.conversation_history) > 10:
+                context.conversation_history = context.conversation_history[-10:]
+        
+            # Update state
+            if intent == "greeting":
+                context.state = ConversationState.GREETING
+            elif intent == "product_search":
+                context.state = ConversationState.PRODUCT_SEARCH
+                if products:
+                    context.last_products = products
+                    context.last_query = message
+            elif intent in ["goodbye", "thanks"]:
+                context.state = ConversationState.GOODBYE
+            elif intent == "unclear":
+                context.clarification_attempts += 1
+                if context.clarification_attempts > 2:
+                    context.state = ConversationState.CLARIFICATION
     
     def generate_contextual_response(self, intent: str, base_response: str) -> str:
         """Generate context-aware response"""
@@ -393,24 +439,33 @@ class EnhancedConversationHandler:
                 'email': 'info@butik.com'
             }
     
-    def reset_context(self):
-        """Reset conversation context"""
-        self.context = ConversationContext(ConversationState.GREETING)
-        self.cache.clear()
+    def reset_context(self, session_id: str = None):
+        """Reset one session's context, or every session and the cache when no id is given"""
+        with self._sessions_lock:
+            if session_id is not None:
+                self._sessions.pop(session_id, None)
+                return
+            self._sessions.clear()
+        with self._cache_lock:
+            self.cache.clear()
     
     def get_conversation_stats(self) -> Dict:
-        """Get conversation statistics"""
-        try:
-            state_value = self.context.state.value if hasattr(self.context.state, 'value') else str(self.context.state)
-        except:
-            state_value = 'unknown'
+        """Aggregate statistics over every session (never creates a session)"""
+        with self._sessions_lock:
+            contexts = list(self._sessions.values())
+        states: Dict[str, int] = {}
+        for context in contexts:
+            state_value = context.state.value if hasattr(context.state, 'value') else str(context.state)
+            states[state_value] = states.get(state_value, 0) + 1
+        with self._cache_lock:
+            cache_size = len(self.cache)
             
         return {
-            'state': state_value,
-            'history_length': len(self.context.conversation_history),
-            'clarification_attempts': self.context.clarification_attempts,
-            'last_products_count': len(self.context.last_products),
-            'cache_size': len(self.cache)
+            'active_sessions': len(contexts),
+            'sessions_by_state': states,
+            'history_length': sum(len(context.conversation_history) for context in contexts),
+            'awaiting_clarification': sum(1 for context in contexts if context.clarification_attempts),
+            'cache_size': cache_size
         }
 
     def detect_image_reference(self, message: str) -> Tuple[bool, str]:
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Graph API Client
+Pooled, retried and rate-limited outbound messaging for WhatsApp and Instagram
+"""
+
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lane_executor import KeyedLaneExecutor
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket with reservations (callers sleep off their own wait)"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token; returns how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class KeyedRateLimiter:
+    """One token bucket per key (LRU-bounded so idle recipients are forgotten)"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            return bucket.reserve()
+
+class GraphAPIClient:
+    """Meta Graph API sender
+
+    One `requests.Session` with a sized connection pool is shared by all
+    sends. Each request has connect/read timeouts; 429, 5xx and connection
+    errors are retried with exponential backoff and full jitter (honoring
+    Retry-After). Sends are throttled per sending number/account
+    (GRAPH_API_NUMBER_RATE msg/s) and per recipient (GRAPH_API_RECIPIENT_RATE
+    msg/s with a small burst), matching Meta's throughput and pair limits.
+    """
+
+    def __init__(self, base_url: str = None, timeout: tuple = None, max_retries: int = None,
+                 pool_size: int = None, number_rate: float = None, recipient_rate: float = None,
+                 recipient_burst: float = None, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.base_url = (base_url or os.getenv('GRAPH_API_BASE_URL', 'https://graph.facebook.com/v18.0')).rstrip('/')
+        self.timeout = timeout or (float(os.getenv('GRAPH_API_CONNECT_TIMEOUT', '3')),
+                                   float(os.getenv('GRAPH_API_READ_TIMEOUT', '10')))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('GRAPH_API_MAX_RETRIES', '3'))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        pool_size = pool_size or int(os.getenv('GRAPH_API_POOL_SIZE', '20'))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        number_rate = number_rate if number_rate is not None else float(os.getenv('GRAPH_API_NUMBER_RATE', '80'))
+        recipient_rate = (recipient_rate if recipient_rate is not None
+                          else float(os.getenv('GRAPH_API_RECIPIENT_RATE', str(1 / 6))))
+        recipient_burst = (recipient_burst if recipient_burst is not None
+                           else float(os.getenv('GRAPH_API_RECIPIENT_BURST', '5')))
+        self.number_limiter = KeyedRateLimiter(number_rate, max(1.0, number_rate))
+        self.recipient_limiter = KeyedRateLimiter(recipient_rate, recipient_burst)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'retries': 0,
+            'throttled_responses': 0,
+            'rate_limit_waits': 0,
+            'rate_limit_wait_time': 0.0
+        }
+
+    def _count(self, key: str, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def reserve(self, sender_key: str, recipient_key: str) -> float:
+        """Take a send slot from both limiters; returns how long to wait before sending"""
+        wait = max(self.number_limiter.reserve(sender_key), self.recipient_limiter.reserve(recipient_key))
+        if wait > 0:
+            self._count('rate_limit_waits')
+            self._count('rate_limit_wait_time', wait)
+        return wait
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def attempt(self, path: str, payload: Dict[str, Any], access_token: str,
+                attempt: int = 0) -> Tuple[bool, Optional[float]]:
+        """One POST (no throttling); returns (sent, retry_delay)
+
+        retry_delay is None when the send must not be retried (4xx or the
+        last attempt), which is counted as failed.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        headers = {'Authorization': f'Bearer {access_token}'}
+        response = None
+        try:
+            response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            if response.status_code < 300:
+                self._count('sent')
+                return True, None
+            if response.status_code == 429:
+                self._count('throttled_responses')
+            elif response.status_code < 500:
+                # 4xx (bad token, invalid recipient...): retrying will not help
+                logger.error(f"❌ Graph API rejected message: {response.status_code} - {response.text[:200]}")
+                self._count('failed')
+                return False, None
+            error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+
+        if attempt >= self.max_retries:
+            logger.error(f"❌ Graph API send failed after {attempt + 1} attempts: {error}")
+            self._count('failed')
+            return False, None
+        self._count('retries')
+        return False, self._retry_delay(attempt, response)
+
+    def post(self, path: str, payload: Dict[str, Any], access_token: str,
+             sender_key: str, recipient_key: str) -> bool:
+        """POST to the Graph API with throttling and retries (blocks the caller while waiting)"""
+        time.sleep(self.reserve(sender_key, recipient_key))
+        for attempt in range(self.max_retries + 1):
+            sent, retry_delay = self.attempt(path, payload, access_token, attempt)
+            if sent or retry_delay is None:
+                return sent
+            time.sleep(retry_delay)
+        return False
+
+    @staticmethod
+    def whatsapp_text(phone_number_id: str, to_number: str, message: str) -> Dict[str, Any]:
+        """post() arguments of a WhatsApp text message (without the token)"""
+        return {
+            'path': f"{phone_number_id}/messages",
+            'payload': {
+                'messaging_product': 'whatsapp',
+                'to': to_number,
+                'type': 'text',
+                'text': {
+                    'body': message
+                }
+            },
+            'sender_key': f"whatsapp:{phone_number_id}",
+            'recipient_key': f"whatsapp:{to_number}"
+        }
+
+    @staticmethod
+    def instagram_text(account_id: str, recipient_id: str, message: str) -> Dict[str, Any]:
+        """post() arguments of an Instagram Messaging API text message (without the token)"""
+        return {
+            'path': f"{account_id}/messages",
+            'payload': {
+                'recipient': {'id': recipient_id},
+                'message': {'text': message}
+            },
+            'sender_key': f"instagram:{account_id}",
+            'recipient_key': f"instagram:{recipient_id}"
+        }
+
+    def send_whatsapp_text(self, phone_number_id: str, to_number: str, message: str, access_token: str) -> bool:
+        """Send a WhatsApp text message from a business phone number"""
+        return self.post(access_token=access_token, **self.whatsapp_text(phone_number_id, to_number, message))
+
+    def send_instagram_text(self, account_id: str, recipient_id: str, message: str, access_token: str) -> bool:
+        """Send an Instagram Messaging API text message from a business account"""
+        return self.post(access_token=access_token, **self.instagram_text(account_id, recipient_id, message))
+
+    def get_stats(self) -> Dict:
+        """Client statistics"""
+        with self._lock:
+            return dict(self.stats)
+
+class DelayScheduler:
+    """One daemon thread running callbacks after a delay (earliest first)"""
+
+    def __init__(self, name: str = "delay"):
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay: float, callback: Callable[[], None]):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), callback))
+            self._condition.notify()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, callback = heapq.heappop(self._heap)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"❌ Delayed callback failed: {e}")
+
+@dataclass
+class _OutboundSend:
+    key: str  # recipient_key, also the lane key
+    request: Dict[str, Any]  # GraphAPIClient.post() arguments
+    access_token: str
+    attempt: int = 0
+    reserved: bool = False  # Rate limiter slot already taken
+    head: bool = False  # Oldest pending send of its recipient
+
+class OutboundMessenger:
+    """Outbound queue so chat workers never block on the Graph API
+
+    Sends run on keyed lanes by recipient: replies to one user stay in
+    order while different users are sent in parallel. Lanes are bounded;
+    a full lane rejects the send instead of blocking the chat worker.
+
+    Lanes are shared by every recipient hashed to them, so a send that has
+    to wait (rate limit slot, retry backoff) is parked on a delay scheduler
+    instead of sleeping on the lane thread. Later sends to the parked
+    recipient queue up behind it to keep its order; other recipients on
+    the lane are not held up. An accepted send whose lane is momentarily
+    full when it is handed back is re-parked for `requeue_delay`, never
+    dropped; only a shutdown drops it.
+    """
+
+    def __init__(self, client: GraphAPIClient, lanes: int = None, max_size: int = None,
+                 requeue_delay: float = None):
+        self.client = client
+        lanes = lanes or int(os.getenv('OUTBOUND_WORKERS', '8'))
+        max_size = max_size or int(os.getenv('OUTBOUND_QUEUE_SIZE', '5000'))
+        self.max_size = max_size
+        self.lanes = KeyedLaneExecutor(lanes, max_depth=max(1, max_size // lanes), name="outbound")
+        self.scheduler = DelayScheduler(name="outbound-delay")
+        self.requeue_delay = (requeue_delay if requeue_delay is not None
+                              else float(os.getenv('OUTBOUND_REQUEUE_DELAY', '0.05')))
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, Deque[_OutboundSend]] = {}  # parked recipient -> sends behind it
+        self._waiting_count = 0
+        self._pending = 0  # Accepted sends not yet delivered, failed or dropped
+        self.stats = {
+            'parked': 0,
+            'requeued': 0,
+            'dropped': 0
+        }
+        atexit.register(self.drain)  # Runs before the lanes' own shutdown
+
+    def _submit(self, send: _OutboundSend) -> bool:
+        return self.lanes.submit(send.key, self._run, send) is not None
+
+    def _enqueue(self, send: _OutboundSend) -> bool:
+        with self._lock:
+            waiting = self._waiting.get(send.key)
+            if waiting is not None and self._waiting_count >= self.max_size:
+                return False
+            self._pending += 1
+            if waiting is not None:
+                waiting.append(send)
+                self._waiting_count += 1
+                return True
+        if self._submit(send):
+            return True
+        with self._lock:
+            self._pending -= 1
+        return False
+
+    def _run(self, send: _OutboundSend):
+        with self._lock:
+            waiting = self._waiting.get(send.key)
+            if waiting is not None and not send.head:
+                # Submitted before an earlier send to this recipient was parked
+                waiting.append(send)
+                self._waiting_count += 1
+                return
+
+        if not send.reserved:
+            send.reserved = True
+            wait = self.client.reserve(send.request['sender_key'], send.request['recipient_key'])
+            if wait > 0:
+                self._park(send, wait)
+                return
+
+        sent, retry_delay = self.client.attempt(send.request['path'], send.request['payload'],
+                                                send.access_token, send.attempt)
+        if not sent and retry_delay is not None:
+            send.attempt += 1
+            self._park(send, retry_delay)
+            return
+        with self._lock:
+            self._pending -= 1
+        self._next(send.key)
+        if not sent:
+            raise RuntimeError("message not delivered")
+
+    def _park(self, send: _OutboundSend, delay: float):
+        send.head = True
+        with self._lock:
+            self._waiting.setdefault(send.key, deque())
+            self.stats['parked'] += 1
+        self.scheduler.call_later(delay, lambda: self._resume(send))
+
+    def _resume(self, send: _OutboundSend):
+        if not self._handoff(send):
+            self._next(send.key)
+
+    def _handoff(self, send: _OutboundSend) -> bool:
+        """Put an accepted send back on its lane; False only if it was dropped (shutdown)"""
+        if self._submit(send):
+            return True
+        if self.lanes.accepting:
+            # Lane full under a burst: try again shortly, the send keeps its place
+            with self._lock:
+                self.stats['requeued'] += 1
+            self.scheduler.call_later(self.requeue_delay, lambda: self._resume(send))
+            return True
+        self._drop(send)
+        return False
+
+    def _next(self, key: str):
+        """Hand the recipient's next waiting send to its lane (or unpark it)"""
+        while True:
+            with self._lock:
+                waiting = self._waiting.get(key)
+                if waiting is None:
+                    return
+                if not waiting:
+                    del self._waiting[key]
+                    return
+                send = waiting.popleft()
+                self._waiting_count -= 1
+            send.head = True
+            if self._handoff(send):
+                return
+
+    def _drop(self, send: _OutboundSend):
+        logger.error(f"❌ Outbound lanes shutting down, dropping message to {send.key}")
+        with self._lock:
+            self.stats['dropped'] += 1
+            self._pending -= 1
+
+    def send_whatsapp(self, phone_number_id: str, to_number: str, message: str, access_token: str) -> bool:
+        """Queue a WhatsApp reply; False if the outbound queue is full"""
+        request = self.client.whatsapp_text(phone_number_id, to_number, message)
+        return self._enqueue(_OutboundSend(request['recipient_key'], request, access_token))
+
+    def send_instagram(self, account_id: str, recipient_id: str, message: str, access_token: str) -> bool:
+        """Queue an Instagram reply; False if the outbound queue is full"""
+        request = self.client.instagram_text(account_id, recipient_id, message)
+        return self._enqueue(_OutboundSend(request['recipient_key'], request, access_token))
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Wait for accepted sends, parked ones included (up to `timeout`), then stop the lanes"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if not self._pending:
+                    break
+            time.sleep(0.05)
+        return self.lanes.shutdown(max(0.0, deadline - time.time()))
+
+    def get_stats(self) -> Dict:
+        """Outbound lane + client statistics"""
+        with self._lock:
+            stats = {**self.stats, 'pending': self._pending, 'parked_recipients': len(self._waiting),
+                     'waiting': self._waiting_count}
+        return {
+            **self.lanes.get_stats(),
+            **stats,
+            'client': self.client.get_stats()
+        }
+
+# Global instances
+_outbound_messenger = None
+_outbound_messenger_lock = threading.Lock()
+
+def get_outbound_messenger() -> OutboundMessenger:
+    """Get global outbound messenger"""
+    global _outbound_messenger
+    with _outbound_messenger_lock:
+        if _outbound_messenger is None:
+            _outbound_messenger = OutboundMessenger(GraphAPIClient())
+        return _outbound_messenger
@@ -4,21 +4,33 @@ Improved Final MVP Chatbot System
 Addresses all edge cases and problematic scenarios
 """
 
+import asyncio
 import json
 import logging
 import os
+import queue
 import time
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field
 import google.generativeai as genai
 from rapidfuzz import fuzz
 from dotenv import load_dotenv
 from aws_bedrock_integration import get_bedrock_client
 from enhanced_conversation_handler import EnhancedConversationHandler
-from smart_cache_system import SmartCacheSystem
+from smart_cache_system import SmartCacheSystem, Uncached
 from fixed_responses import get_fixed_responses
 from color_grouping_system import group_products_by_base_name, format_grouped_products
 from database_analyzer import DatabaseAnalyzer
+from catalog_service import CatalogData, CatalogLoadError, Product, get_catalog_service, product_to_dict
+from overload_controller import LOCAL_INTENT, SHED, SKIP_ENHANCEMENT, SKIP_VALIDATION, get_overload_controller
+from llm_scheduler import get_llm_scheduler
+from chat_lanes import get_chat_lanes
+from concurrent_state import BoundedCache
+from metrics_registry import (CHAT_HISTOGRAM, STAGE_HISTOGRAM, count_cache, get_metrics_registry,
+                              record_llm_call, timed_stage)
+
+DEFAULT_PRODUCTS_FILE = 'data/products.json'
 
 # Import RAG search system
 try:
@@ -37,18 +49,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class Product:
-    name: str
-    color: str
-    price: float
-    discount: float
-    final_price: float
-    category: str
-    stock: int
-    description: str = ""
-
-@dataclass
+@dataclass(frozen=True)
 class IntentResult:
     intent: str
     entities: Dict[str, str]
@@ -61,32 +62,85 @@ class ChatResponse:
     confidence: float
     products_found: int = 0
     processing_time: float = 0.0
+    products: List[Product] = field(default=None, repr=False)  # Catalog rows behind the answer
+
+@dataclass
+class ChatbotCatalog:
+    """Catalog data (products, search index, field schema) shared by every chatbot serving it"""
+    products_file: str
+    products: Sequence[Product]  # Row views over the columnar store
+    version: str
+    rag_search: Optional['RAGProductSearch'] = None
+    db_analyzer: Optional[DatabaseAnalyzer] = None
+    data: Optional[CatalogData] = None  # Keeps the shared parse alive while in use
+
+def load_products_file(products_file: str) -> Tuple[List[Product], str]:
+    """Products and content-hash version of a products file (via the catalog service)"""
+    catalog_data = get_catalog_service().load(products_file)
+    return list(catalog_data.products), catalog_data.version
+
+def build_catalog(products_file: str = DEFAULT_PRODUCTS_FILE, model=None,
+                  catalog_data: CatalogData = None) -> ChatbotCatalog:
+    """Load products, RAG index and database analysis for a products file
+    
+    The file is parsed once; the RAG index and the analyzer reuse that parse.
+    Pass `catalog_data` to build from a parse the caller already checked.
+    """
+    catalog_data = catalog_data or get_catalog_service().load(products_file)
+    
+    # Only the default catalog persists its index under embeddings/;
+    # tenant catalogs are small and rebuilt in memory
+    rag_search = None
+    if RAG_SEARCH_AVAILABLE:
+        try:
+            rag_search = RAGProductSearch(
+                products_file=products_file,
+                persist=(products_file == DEFAULT_PRODUCTS_FILE),
+                model=model,
+                catalog_data=catalog_data
+            )
+            if rag_search.is_available():
+                logger.info("✅ RAG search system initialized successfully")
+            else:
+                logger.warning("⚠️ RAG search system not available")
+        except Exception as e:
+            logger.error(f"RAG search initialization failed: {e}")
+            rag_search = None
+    
+    return ChatbotCatalog(
+        products_file=products_file,
+        products=catalog_data.products,
+        version=catalog_data.version,
+        rag_search=rag_search,
+        db_analyzer=DatabaseAnalyzer(products_file, schema=catalog_data.schema),
+        data=catalog_data
+    )
 
 class ImprovedFinalMVPChatbot:
-    def __init__(self):
-        """Initialize the improved MVP chatbot system"""
+    def __init__(self, tenant_id: str = 'default', products_file: str = None,
+                 business_info: Dict = None, shared=None, catalog: ChatbotCatalog = None):
+        """Initialize the improved MVP chatbot system
+        
+        Pooled tenant chatbots pass `shared` (LLM clients) and `catalog` so heavy
+        components are built once per process / per catalog, not per instance.
+        """
         logger.info("Initializing Improved Final MVP Chatbot System...")
         
-        # Load data
-        self.products = self._load_products()
-        self.business_info = self._load_business_info()
+        self.tenant_id = tenant_id
+        self.products_file = products_file or (catalog.products_file if catalog else DEFAULT_PRODUCTS_FILE)
         
         # Setup AI models (Gemini + Bedrock)
-        self._setup_gemini()
-        self._setup_bedrock()
+        if shared is not None:
+            self.model = shared.model
+            self.bedrock_client = shared.bedrock_client
+            self.use_bedrock = shared.use_bedrock
+        else:
+            self._setup_gemini()
+            self._setup_bedrock()
         
-        # Setup RAG search system
-        self.rag_search = None
-        if RAG_SEARCH_AVAILABLE:
-            try:
-                self.rag_search = RAGProductSearch()
-                if self.rag_search.is_available():
-                    logger.info("✅ RAG search system initialized successfully")
-                else:
-                    logger.warning("⚠️ RAG search system not available")
-            except Exception as e:
-                logger.error(f"RAG search initialization failed: {e}")
-                self.rag_search = None
+        # Load data (products, RAG search, database analyzer)
+        self._set_catalog(catalog or build_catalog(self.products_file, self.model))
+        self.business_info = business_info or self._load_business_info()
         
         # Initialize enhanced conversation handler
         self.conversation_handler = EnhancedConversationHandler()
@@ -94,45 +148,52 @@ class ImprovedFinalMVPChatbot:
         # Initialize smart cache system
         self.smart_cache = SmartCacheSystem(default_ttl=1800, max_size=500)  # 30 minutes, 500 entries
         
-        # Initialize database analyzer
-        self.db_analyzer = DatabaseAnalyzer()
-        
         # Initialize response templates
         self.fixed_responses = get_fixed_responses(self.business_info, self._get_whatsapp_support_text)
         
-        # Performance tracking
-        self.stats = {
-            'total_requests': 0,
-            'successful_requests': 0,
-            'gemini_calls': 0,
-            'fallback_calls': 0,
-            'cache_hits': 0,
-            'average_response_time': 0.0
-        }
+        # Performance tracking (lock-striped, bumped concurrently by request threads;
+        # registered per tenant so the metrics snapshot aggregates them)
+        self.metrics = get_metrics_registry()
+        self.stats = self.metrics.counters('chatbot', [
+            'total_requests',
+            'successful_requests',
+            'gemini_calls',
+            'fallback_calls',
+            'cache_hits',
+            'total_response_time'
+        ], tenant=self.tenant_id)
+        
+        # Intent cache for ultra-fast responses (shared by every session)
+        self.intent_cache = BoundedCache(max_size=1000)
+        
+        # Process-wide load shedding / degradation level
+        self.overload = get_overload_controller()
+        
+        # Per-tenant fair share and daily budget of LLM calls
+        self.llm_scheduler = get_llm_scheduler()
         
-        # Intent cache for ultra-fast responses
-        self.intent_cache = {}
+        # Rule-answerable messages run inline, LLM-bound ones on the bounded slow lane
+        self.lanes = get_chat_lanes()
         
         logger.info(f"✅ Improved MVP Chatbot initialized with {len(self.products)} products")
     
+    @timed_stage('intent_cache')
     def _check_intent_cache(self, message_lower: str) -> Optional[IntentResult]:
         """Check intent cache for exact matches"""
-        if message_lower in self.intent_cache:
-            self.stats['cache_hits'] += 1
-            return self.intent_cache[message_lower]
-        return None
+        result = self.intent_cache.get(message_lower)
+        if result is not None:
+            self.stats.add('cache_hits')
+        count_cache('intent', result is not None)
+        return result
     
     def _cache_intent_result(self, message_lower: str, result: IntentResult):
         """Cache intent result for future use"""
-        # Keep cache size manageable (max 1000 entries)
-        if len(self.intent_cache) > 1000:
-            # Remove oldest 200 entries
-            old_keys = list(self.intent_cache.keys())[:200]
-            for key in old_keys:
-                del self.intent_cache[key]
-        
-        self.intent_cache[message_lower] = result
+        # Follow-ups depend on this session's last products, never share them
+        if result.intent == 'followup':
+            return
+        self.intent_cache.put(message_lower, result)
     
+    @timed_stage('rules')
     def _ultra_fast_rules(self, message_lower: str) -> Optional[IntentResult]:
         """Ultra-fast rules for 100% certain cases"""
         # Exact matches for common phrases
@@ -283,10 +344,19 @@ class ImprovedFinalMVPChatbot:
             logger.error(f"❌ Bedrock setup error: {e}")
             self.use_bedrock = False
     
+    @timed_stage('llm_intent')
     def _bedrock_intent_detection(self, user_message: str, fallback_result: Optional[IntentResult]) -> Optional[IntentResult]:
         """Intent detection using AWS Bedrock Mistral"""
+        grant = self.llm_scheduler.acquire(self.tenant_id, len(user_message) // 4 + 400)  # prompt + max_tokens
+        if grant is None:
+            return fallback_result
+        start_time = time.time()
+        failed = True
+        usage = {}
         try:
             intent_result = self.bedrock_client.intent_detection(user_message)
+            failed = not intent_result
+            usage = (intent_result or {}).get('usage') or {}
             
             if intent_result and intent_result.get('intent'):
                 return IntentResult(
@@ -300,30 +370,89 @@ class ImprovedFinalMVPChatbot:
         except Exception as e:
             logger.error(f"❌ Bedrock intent detection error: {e}")
             return fallback_result
+        finally:
+            model = getattr(self.bedrock_client, 'model_id', 'bedrock')
+            # Unknown usage (no response / no token headers) is charged at the estimate
+            input_tokens, output_tokens = usage.get('input_tokens') or None, usage.get('output_tokens') or None
+            self.llm_scheduler.release(grant, input_tokens, output_tokens, model)
+            record_llm_call(model, time.time() - start_time, input_tokens, output_tokens, error=failed)
     
-    def _load_products(self) -> List[Product]:
-        """Load products with error handling"""
+    def _generate_content(self, prompt: str, max_output_tokens: int, **kwargs):
+        """Gemini call admitted by the LLM scheduler; None if the tenant is over budget or no slot freed up"""
+        grant = self.llm_scheduler.acquire(self.tenant_id, len(prompt) // 4 + max_output_tokens)
+        if grant is None:
+            return None
+        usage = None
+        failed = True
+        start_time = time.time()
         try:
-            with open('data/products.json', 'r', encoding='utf-8') as f:
-                products_data = json.load(f)
-            
-            products = []
-            for item in products_data:
-                products.append(Product(
-                    name=item['name'],
-                    color=item['color'],
-                    price=item['price'],
-                    discount=item['discount'],
-                    final_price=item['final_price'],
-                    category=item['category'],
-                    stock=item['stock']
-                ))
-            
-            return products
-            
-        except Exception as e:
-            logger.error(f"❌ Error loading products: {e}")
-            return []
+            response = self.model.generate_content(prompt, **kwargs)
+            usage = getattr(response, 'usage_metadata', None)
+            failed = False
+            return response
+        finally:
+            input_tokens = getattr(usage, 'prompt_token_count', None)
+            output_tokens = getattr(usage, 'candidates_token_count', None)
+            self.llm_scheduler.release(grant, input_tokens, output_tokens)
+            record_llm_call(getattr(self.model, 'model_name', 'gemini'), time.time() - start_time,
+                            input_tokens, output_tokens, error=failed)
+    
+    def _set_catalog(self, catalog: ChatbotCatalog):
+        """Point the chatbot at a (possibly shared) catalog
+        
+        A single reference assignment, so readers see either the old or the
+        new catalog as a whole; requests pin `self.catalog` once.
+        """
+        self.catalog = catalog
+        self.catalog_generation = getattr(self, 'catalog_generation', 0) + 1
+    
+    @property
+    def products(self) -> Sequence[Product]:
+        return self.catalog.products
+    
+    @property
+    def catalog_version(self) -> str:
+        return self.catalog.version
+    
+    @property
+    def rag_search(self) -> Optional['RAGProductSearch']:
+        return self.catalog.rag_search
+    
+    @property
+    def db_analyzer(self) -> Optional[DatabaseAnalyzer]:
+        return self.catalog.db_analyzer
+    
+    def swap_catalog(self, catalog: ChatbotCatalog) -> bool:
+        """Atomically switch to a newly built catalog; returns True if it changed
+        
+        In-flight requests finish on the catalog they pinned. Everything cached
+        for the old catalog version is retired.
+        """
+        old_version = self.catalog_version
+        if catalog.version == old_version:
+            return False
+        
+        self._set_catalog(catalog)
+        self.smart_cache.retire()
+        self.conversation_handler.cache.clear()
+        logger.info(f"🔄 Catalog swapped for {self.tenant_id}: {old_version} → {catalog.version} "
+                    f"(generation {self.catalog_generation})")
+        return True
+    
+    def reload_products(self) -> bool:
+        """Rebuild the catalog from disk and swap it in; returns True if it changed"""
+        try:
+            catalog_data = get_catalog_service().load(self.products_file, strict=True)
+        except CatalogLoadError:
+            return False  # Keep the live catalog until the file is valid again
+        if catalog_data.version == self.catalog_version:
+            return False
+        return self.swap_catalog(build_catalog(self.products_file, self.model, catalog_data))
+    
+    @property
+    def cache_scope(self) -> str:
+        """Cache scope for per-tenant, per-catalog-version entries"""
+        return f"{self.tenant_id}:{self.catalog_version}"
     
     def _load_business_info(self) -> Dict:
         """Load business information with defaults"""
@@ -403,6 +532,11 @@ class ImprovedFinalMVPChatbot:
             self._cache_intent_result(message_lower, fast_result)
             return fast_result
         
+        # Overloaded or out of LLM budget: local rules only (not cached, the LLM
+        # decides again once load drops / the budget resets)
+        if self.overload.should_degrade(LOCAL_INTENT) or not self.llm_scheduler.within_budget(self.tenant_id):
+            return fast_result or self._enhanced_fallback_intent_detection(user_message)
+        
         # 3. LLM INTELLIGENCE (200ms, $0.001) - For everything else
         # Try Bedrock first, then Gemini fallback
         if self.use_bedrock and hasattr(self, 'bedrock_client'):
@@ -423,6 +557,7 @@ class ImprovedFinalMVPChatbot:
         self._cache_intent_result(message_lower, fallback_result)
         return fallback_result
     
+    @timed_stage('llm_intent')
     def _smart_llm_intent(self, user_message: str, fallback_result: Optional[IntentResult]) -> IntentResult:
         
         """Try Gemini for unclear cases only"""
@@ -489,8 +624,8 @@ MESAJ: "{user_message}"
         try:
             # Add timeout for performance
             start_time = time.time()
-            response = self.model.generate_content(
-                prompt,
+            response = self._generate_content(
+                prompt, 50,
                 tools=[{"function_declarations": [function_declaration]}],
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.1,  # Lower temperature for faster, more consistent responses
@@ -498,6 +633,9 @@ MESAJ: "{user_message}"
                 )
             )
             gemini_time = time.time() - start_time
+            if response is None:
+                self.stats.add('fallback_calls')
+                return fallback_result if fallback_result else self._enhanced_fallback_intent_detection(user_message)
             
             if gemini_time > 1.0:  # 1 second threshold
                 logger.warning(f"Gemini API slow ({gemini_time:.3f}s), consider fallback")
@@ -517,7 +655,7 @@ MESAJ: "{user_message}"
                                 for key, value in function_call.args.items():
                                     args[key] = value
                             
-                            self.stats['gemini_calls'] += 1
+                            self.stats.add('gemini_calls')
                             
                             return IntentResult(
                                 intent=args.get('intent', 'unclear'),
@@ -535,7 +673,7 @@ MESAJ: "{user_message}"
                 # If no function call, try to parse text response
                 if response.candidates[0].content.parts[0].text:
                     text_response = response.candidates[0].content.parts[0].text.lower()
-                    self.stats['gemini_calls'] += 1
+                    self.stats.add('gemini_calls')
                     
                     # Simple text parsing for intent
                     if 'greeting' in text_response:
@@ -555,7 +693,7 @@ MESAJ: "{user_message}"
                 
         except Exception as e:
             logger.error(f"Gemini intent extraction error: {e}")
-            self.stats['fallback_calls'] += 1
+            self.stats.add('fallback_calls')
             return fallback_result if fallback_result else self._enhanced_fallback_intent_detection(user_message)
     
     def _enhanced_fallback_intent_detection(self, message: str) -> IntentResult:
@@ -819,6 +957,7 @@ MESAJ: "{user_message}"
         
         return normalized
     
+    @timed_stage('llm_enhance')
     def _enhance_query_with_llm(self, query: str) -> str:
         """Enhance query with LLM for typo correction and expansion"""
         if not self.model or len(query) > 50:
@@ -840,15 +979,15 @@ GÖREVLER:
 
 ÇIKTI: Sadece düzeltilmiş sorgu"""
 
-            response = self.model.generate_content(
-                prompt,
+            response = self._generate_content(
+                prompt, 20,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.1,
                     max_output_tokens=20
                 )
             )
             
-            if response.candidates and response.candidates[0].content.parts:
+            if response and response.candidates and response.candidates[0].content.parts:
                 enhanced = response.candidates[0].content.parts[0].text.strip()
                 # Basic validation
                 if len(enhanced) > 0 and len(enhanced) < 100:
@@ -890,26 +1029,84 @@ GÖREVLER:
         # Default to uncertain
         return 'uncertain'
     
-    def search_products(self, query: str, features: List[str] = None, color: str = None, session_id: str = None) -> List[Product]:
-        """Enhanced product search with better Turkish handling"""
+    def search_products(self, query: str, features: List[str] = None, color: str = None, session_id: str = None,
+                        on_event: Callable = None) -> List[Product]:
+        """Enhanced product search with better Turkish handling
+        
+        `on_event` (streaming chats) gets a 'products' event as soon as
+        retrieval finishes, before the reply is formatted.
+        """
         if not query and not features and not color:
             return []
         
         # Check smart cache first (session-aware)
-        cache_key = f"{query}_{features}_{color}"
+        conversation_history = self.conversation_handler.context.conversation_history
         cached_result = self.smart_cache.get_session(
-            query, session_id, features, color, 
-            self.conversation_handler.context.conversation_history
+            query, session_id, features, color, conversation_history
         )
         if cached_result and len(cached_result) > 0:
             # Strict cache validation
             if self._validate_cache_result(query, cached_result):
-                self.stats['cache_hits'] += 1
+                self.stats.add('cache_hits')
+                self._emit_products(on_event, cached_result)
                 return cached_result
             else:
                 logger.info(f"Cache result not relevant for '{query}', searching again")
         
-        # SMART EXACT MATCHING for specific product queries
+        # Pin the catalog for this request: a hot reload swapping it meanwhile
+        # does not mix old row ids with the new index, and results computed on
+        # the old catalog are not cached (cache generation check). The
+        # generation is read first: swap_catalog sets the catalog before it
+        # retires the cache, so this order never pairs an old catalog with a
+        # new generation.
+        generation = self.smart_cache.generation
+        catalog = self.catalog
+        
+        # Shared cache with stale-while-revalidate: concurrent misses for the same
+        # query wait for a single pipeline run instead of each repeating it.
+        # Zero-hit queries are negatively cached per tenant + catalog version.
+        # Results computed while the overload controller switched a step off
+        # are served but not cached, so they don't outlive the overload.
+        degraded = []
+        
+        def compute():
+            with self.overload.track_degradation() as degradation:
+                result = self._search_products_uncached(query, features, color, catalog)
+            if degradation.steps:
+                degraded.append(degradation.steps)
+                return Uncached(result)
+            return result
+        
+        products = self.smart_cache.get_or_compute(
+            query, compute, features, color, conversation_history,
+            negative_scope=f"{self.tenant_id}:{catalog.version}", generation=generation
+        )
+        
+        if products and not degraded:
+            self.smart_cache.put_session(
+                query, products, session_id, features, color, conversation_history,
+                store_global=False, generation=generation
+            )
+        
+        self._emit_products(on_event, products)
+        return products
+    
+    @staticmethod
+    def _emit_products(on_event: Optional[Callable], products: List[Product]):
+        if on_event and products:
+            on_event('products', {'products': [product_to_dict(product) for product in products]})
+    
+    def _search_products_uncached(self, query: str, features: List[str] = None, color: str = None,
+                                  catalog: ChatbotCatalog = None) -> List[Product]:
+        """Run the full search pipeline (exact match → RAG → fuzzy) without caching"""
+        catalog = catalog or self.catalog
+        return (self._exact_match_search(query, catalog.products)
+                or self._rag_search(query, features, color, catalog)
+                or self._fuzzy_search(query, features, color, catalog.products))
+    
+    @timed_stage('exact_match')
+    def _exact_match_search(self, query: str, products_index: Sequence[Product]) -> List[Product]:
+        """SMART EXACT MATCHING for specific product queries"""
         clean_query = query
         stop_words = ['var mı', 'arıyorum', 'istiyorum', 'lazım', 'gerek', 'bulunur mu', 'var mıydı', 'ne kadar', 'kaç para']
         for remove_word in stop_words:
@@ -925,7 +1122,7 @@ GÖREVLER:
             query_words = [word for word in query_normalized.split() if len(word) > 2]
             
             # ULTRA-STRICT matching for very specific queries
-            for product in self.products:
+            for product in products_index:
                 product_text = self._normalize_turkish(f"{product.name} {product.color}".lower())
                 
                 if is_very_specific:
@@ -940,8 +1137,6 @@ GÖREVLER:
                         exact_matches.append(product)
                         # For very specific queries, return immediately with exact match
                         if len(exact_matches) >= 1:
-                            # Cache the result
-                            self.smart_cache.set(query, exact_matches[:1])
                             logger.info(f"Exact specific match found for '{query}': {exact_matches[0].name}")
                             return exact_matches[:1]
                 else:
@@ -986,15 +1181,19 @@ GÖREVLER:
                     # Single word search - can show more
                     result_count = min(3, len(exact_matches))
                 
-                self.smart_cache.put_session(
-                    query, exact_matches[:result_count], session_id, features, color,
-                    self.conversation_handler.context.conversation_history
-                )
                 logger.info(f"Exact match search returned {len(exact_matches[:result_count])} products for '{clean_query}' (original: '{query}')")
                 return exact_matches[:result_count]
         
+        return []
+    
+    @timed_stage('rag')
+    def _rag_search(self, query: str, features: List[str], color: str, catalog: ChatbotCatalog) -> List[Product]:
+        """Semantic search over the catalog's RAG index"""
+        products_index = catalog.products
+        rag_search = catalog.rag_search
+        
         # Try RAG search first (with timeout for performance)
-        if self.rag_search and self.rag_search.is_available():
+        if rag_search and rag_search.is_available():
             try:
                 start_time = time.time()
                 search_query = query
@@ -1003,10 +1202,10 @@ GÖREVLER:
                 if color:
                     search_query += f" {color} renk"
                 
-                rag_results = self.rag_search.search(search_query, 5)
+                rag_hits = rag_search.search_ids(search_query, 5)
                 
                 # If no results and query might have typos, try enhancement
-                if not rag_results and len(query.split()) <= 3:
+                if not rag_hits and len(query.split()) <= 3 and not self.overload.should_degrade(SKIP_ENHANCEMENT):
                     enhanced_query = self._enhance_query_with_llm(query)
                     if enhanced_query != query:
                         logger.info(f"Query enhanced: '{query}' → '{enhanced_query}'")
@@ -1015,7 +1214,7 @@ GÖREVLER:
                             enhanced_search += " " + " ".join(features)
                         if color:
                             enhanced_search += f" {color} renk"
-                        rag_results = self.rag_search.search(enhanced_search, 5)
+                        rag_hits = rag_search.search_ids(enhanced_search, 5)
                 
                 rag_time = time.time() - start_time
                 
@@ -1023,127 +1222,61 @@ GÖREVLER:
                 if rag_time > 0.5:  # 500ms threshold
                     logger.warning(f"RAG search slow ({rag_time:.3f}s), consider optimization")
                 
-                if rag_results:
+                if rag_hits:
                     # Calculate overall search confidence
-                    search_confidence = self._calculate_search_confidence(query, rag_results)
+                    search_confidence = self._calculate_search_confidence(query, rag_hits, products_index)
                     
                     # If confidence is low, use LLM validation
-                    if search_confidence < 0.6 and self.model:
-                        validated_results = self._validate_results_with_llm(query, rag_results)
-                        if validated_results:
-                            rag_results = validated_results
+                    if search_confidence < 0.6 and self.model and not self.overload.should_degrade(SKIP_VALIDATION):
+                        validated_hits = self._validate_results_with_llm(query, rag_hits, products_index)
+                        if validated_hits:
+                            rag_hits = validated_hits
                     
-                    # Convert RAG results to Product objects with color filtering
+                    # RAG hits are (row_id, score) pairs into the shared catalog
                     products = []
-                    for result in rag_results:
-                        # Dynamic similarity threshold based on search confidence
-                        similarity_threshold = 0.15 if search_confidence > 0.7 else 0.25
-                        
-                        if result.get('similarity', 0) > similarity_threshold:
+                    # Dynamic similarity threshold based on search confidence
+                    similarity_threshold = 0.15 if search_confidence > 0.7 else 0.25
+                    for row_id, similarity in rag_hits:
+                        if similarity > similarity_threshold:
+                            product = products_index[row_id]
                             # CRITICAL: Color filtering for RAG results
                             if color:
-                                product_color = result.get('color', '').lower()
+                                product_color = product.color.lower()
                                 if color.lower() not in product_color and not any(
                                     color_variant in product_color 
                                     for color_variant in [color.lower(), color.lower() + 'ı', color.lower() + 'i']
                                 ):
                                     continue  # Skip products that don't match the requested color
-                            # Calculate discount from price difference
-                            discount = 0.0
-                            if result['price'] > result['final_price']:
-                                discount = ((result['price'] - result['final_price']) / result['price']) * 100
-                            
-                            products.append(Product(
-                                name=result['name'],
-                                color=result['color'],
-                                price=result['price'],
-                                discount=discount,
-                                final_price=result['final_price'],
-                                category=result['category'],
-                                stock=result['stock']
-                            ))
+                            products.append(product)
                     
                     if products:
-                        # Cache the result
-                        self.smart_cache.put_session(
-                            query, products, session_id, features, color,
-                            self.conversation_handler.context.conversation_history
-                        )
                         logger.info(f"RAG search returned {len(products)} products in {rag_time:.3f}s")
                         return products
                         
             except Exception as e:
                 logger.error(f"RAG search failed, falling back to fuzzy: {e}")
         
-        # Enhanced fuzzy matching with better Turkish support
-        scored_products = []
+        return []
+    
+    @timed_stage('fuzzy')
+    def _fuzzy_search(self, query: str, features: List[str], color: str,
+                      products_index: Sequence[Product]) -> List[Product]:
+        """Enhanced fuzzy matching with better Turkish support"""
+        # Use normalized text for better Turkish matching
+        query_lower = self._normalize_turkish(query) if query else ""
+        text_scores = [self._fuzzy_text_score(product, query_lower, features, color)
+                       for product in products_index]
+        
+        columns = getattr(products_index, 'columns', None)  # ProductRows over a ColumnarCatalog
+        if columns is not None:
+            # 6-7. Stock / discount bonuses, threshold and ranking run vectorized on the columns
+            scores = columns.mask(in_stock=True) * 10.0 + text_scores
+            scores = scores + columns.mask(discounted=True) * 5.0
+            candidates = (scores > 30).nonzero()[0]  # Minimum threshold
+            return columns.rows(columns.sort_ids(scores, candidates, descending=True)[:5])
         
-        for product in self.products:
-            score = 0
-            # Use normalized text for better Turkish matching
-            product_text = self._normalize_turkish(f"{product.name} {product.color}")
-            query_lower = self._normalize_turkish(query) if query else ""
-            
-            # 1. Exact name match (highest score)
-            if query_lower and query_lower in product_text:
-                score += 100
-            
-            # 1.5. Word-by-word exact matching (for multi-word queries)
-            if query_lower:
-                query_words = query_lower.split()
-                word_matches = 0
-                for word in query_words:
-                    if len(word) > 2 and word in product_text:  # Skip very short words
-                        word_matches += 1
-                if word_matches > 0:
-                    score += (word_matches / len(query_words)) * 120  # Higher than exact match for multi-word
-            
-            # 2. Enhanced fuzzy string matching
-            if query_lower:
-                fuzzy_score = fuzz.partial_ratio(query_lower, product_text)
-                score += fuzzy_score * 0.8
-            
-            # 3. Feature matching (high weight for extracted features)
-            if features:
-                for feature in features:
-                    feature_normalized = self._normalize_turkish(feature)
-                    if feature_normalized in product_text:
-                        score += 60
-            
-            # 4. Enhanced color matching with Turkish normalization
-            if color:
-                color_lower = self._normalize_turkish(color)
-                product_color_lower = self._normalize_turkish(product.color)
-                
-                # Direct exact match (highest priority)
-                if color_lower == product_color_lower:
-                    score += 80
-                elif color_lower in product_color_lower or product_color_lower in color_lower:
-                    score += 60
-                
-                # Turkish color mappings with exact database values
-                color_mappings = {
-                    'siyah': ['siyah', 'black'],
-                    'beyaz': ['beyaz', 'white', 'ekru'],
-                    'kırmızı': ['kirmizi', 'red', 'kırmızı'],
-                    'mavi': ['mavi', 'blue', 'lacivert'],
-                    'yeşil': ['yesil', 'green', 'haki', 'açik yeşil', 'yeşil'],
-                    'mor': ['mor', 'purple', 'lila'],
-                    'vizon': ['vizon', 'beige'],
-                    'bordo': ['bordo', 'burgundy']
-                }
-                
-                for turkish_color, variations in color_mappings.items():
-                    if color_lower == turkish_color or any(var == color_lower for var in variations):
-                        for variation in variations:
-                            if variation in product_color_lower:
-                                score += 70
-                                break
-            
-            # 5. Category and type bonuses
-            if any(word in product_text for word in ['takım', 'gecelik', 'pijama', 'sabahlık']):
-                score += 15
-            
+        scored_products = []
+        for product, score in zip(products_index, text_scores):
             # 6. Stock availability bonus
             try:
                 if int(product.stock) > 0:
@@ -1165,14 +1298,76 @@ GÖREVLER:
         scored_products.sort(key=lambda x: x[1], reverse=True)
         products = [product for product, score in scored_products[:5]]
         
-        # Cache the result
-        self.smart_cache.put_session(
-            query, products, session_id, features, color,
-            self.conversation_handler.context.conversation_history
-        )
-        
         return products
     
+    def _fuzzy_text_score(self, product: Product, query_lower: str, features: List[str], color: str) -> float:
+        """Name, feature, color and category score of one product (fuzzy steps 1-5)"""
+        score = 0
+        product_text = self._normalize_turkish(f"{product.name} {product.color}")
+        
+        # 1. Exact name match (highest score)
+        if query_lower and query_lower in product_text:
+            score += 100
+        
+        # 1.5. Word-by-word exact matching (for multi-word queries)
+        if query_lower:
+            query_words = query_lower.split()
+            word_matches = 0
+            for word in query_words:
+                if len(word) > 2 and word in product_text:  # Skip very short words
+                    word_matches += 1
+            if word_matches > 0:
+                score += (word_matches / len(query_words)) * 120  # Higher than exact match for multi-word
+        
+        # 2. Enhanced fuzzy string matching
+        if query_lower:
+            fuzzy_score = fuzz.partial_ratio(query_lower, product_text)
+            score += fuzzy_score * 0.8
+        
+        # 3. Feature matching (high weight for extracted features)
+        if features:
+            for feature in features:
+                feature_normalized = self._normalize_turkish(feature)
+                if feature_normalized in product_text:
+                    score += 60
+        
+        # 4. Enhanced color matching with Turkish normalization
+        if color:
+            color_lower = self._normalize_turkish(color)
+            product_color_lower = self._normalize_turkish(product.color)
+            
+            # Direct exact match (highest priority)
+            if color_lower == product_color_lower:
+                score += 80
+            elif color_lower in product_color_lower or product_color_lower in color_lower:
+                score += 60
+            
+            # Turkish color mappings with exact database values
+            color_mappings = {
+                'siyah': ['siyah', 'black'],
+                'beyaz': ['beyaz', 'white', 'ekru'],
+                'kırmızı': ['kirmizi', 'red', 'kırmızı'],
+                'mavi': ['mavi', 'blue', 'lacivert'],
+                'yeşil': ['yesil', 'green', 'haki', 'açik yeşil', 'yeşil'],
+                'mor': ['mor', 'purple', 'lila'],
+                'vizon': ['vizon', 'beige'],
+                'bordo': ['bordo', 'burgundy']
+            }
+            
+            for turkish_color, variations in color_mappings.items():
+                if color_lower == turkish_color or any(var == color_lower for var in variations):
+                    for variation in variations:
+                        if variation in product_color_lower:
+                            score += 70
+                            break
+        
+        # 5. Category and type bonuses
+        if any(word in product_text for word in ['takım', 'gecelik', 'pijama', 'sabahlık']):
+            score += 15
+        
+        return score
+    
+    @timed_stage('format')
     def format_product_response(self, products: List[Product]) -> str:
         """Enhanced product formatting with beautiful presentation"""
         if not products:
@@ -1266,7 +1461,8 @@ GÖREVLER:
                 
                 return response
     
-    def route_and_respond(self, intent_result: IntentResult, original_message: str, session_id: str = None) -> ChatResponse:
+    def route_and_respond(self, intent_result: IntentResult, original_message: str, session_id: str = None,
+                          on_event: Callable = None) -> ChatResponse:
         """Enhanced routing with better context handling"""
         intent = intent_result.intent
         entities = intent_result.entities
@@ -1511,14 +1707,15 @@ GÖREVLER:
             features = entities.get('product_features', [])
             color = entities.get('color', '')
             
-            products = self.search_products(query, features, color, session_id)
+            products = self.search_products(query, features, color, session_id, on_event=on_event)
             response_message = self.format_product_response(products)
             
             return ChatResponse(
                 message=response_message,
                 intent=intent,
                 confidence=intent_result.confidence,
-                products_found=len(products)
+                products_found=len(products),
+                products=products
             )
         
         # Enhanced price inquiry
@@ -1646,13 +1843,158 @@ GÖREVLER:
                     confidence=intent_result.confidence
                 )
     
+    def _shed_response(self, user_message: str) -> ChatResponse:
+        """Overload reply: fixed answers for cached/rule intents, a fast 'busy' message otherwise"""
+        message_lower = user_message.lower().strip()
+        intent_result = self._check_intent_cache(message_lower) or self._ultra_fast_rules(message_lower)
+        if intent_result and intent_result.intent in self.fixed_responses:
+            return ChatResponse(
+                message=self.fixed_responses[intent_result.intent],
+                intent=intent_result.intent,
+                confidence=intent_result.confidence
+            )
+        return ChatResponse(
+            message="⏳ Şu anda yoğunluk nedeniyle mesajınızı yanıtlayamıyoruz. Lütfen birkaç dakika sonra tekrar yazın.\n\n📞 Acil durumlar için: " + self.business_info.get('phone', '0212 123 45 67'),
+            intent="busy",
+            confidence=0.0
+        )
+    
+    def _is_rule_answerable(self, user_message: str) -> bool:
+        """Cheap up-front check: answered by cache/rules + fixed responses, no search or LLM"""
+        if not user_message or not user_message.strip():
+            return True
+        message_lower = user_message.lower().strip()
+        intent_result = self.intent_cache.get(message_lower) or self._ultra_fast_rules(message_lower)
+        return intent_result is not None and (
+            intent_result.intent in self.fixed_responses or intent_result.intent == 'clarification_needed'
+        )
+    
+    def _dispatch(self, user_message: str, session_id: str = None,
+                  on_event: Callable = None) -> Union[ChatResponse, Future]:
+        """Run on the fast lane (inline) or queue on the slow lane (returns its Future)"""
+        with self.conversation_handler.session(session_id):
+            if self._is_rule_answerable(user_message):
+                return self.lanes.run_fast(self._chat, user_message, session_id, on_event)
+            
+            future = self.lanes.submit_slow(self._chat, user_message, session_id, on_event)
+            # Slow lane full: do not hold this web thread waiting for LLM capacity
+            return future if future is not None else self._timed_shed_response(user_message)
+    
+    def _dispatch_async(self, user_message: str, session_id: str = None,
+                        on_event: Callable = None) -> Union[ChatResponse, Future]:
+        """_dispatch for async callers: the slow lane's own (much larger) async queue
+        
+        A waiting coroutine holds no thread, so only work that is actually
+        running counts as in flight for the overload controller; time spent
+        queued is reported as queue wait instead.
+        """
+        with self.conversation_handler.session(session_id):
+            if self._is_rule_answerable(user_message):
+                with self.overload.track():
+                    return self.lanes.run_fast(self._chat, user_message, session_id, on_event)
+            
+            future = self.lanes.submit_slow_async(self._chat_tracked, time.time(), user_message,
+                                                  session_id, on_event)
+            return future if future is not None else self._timed_shed_response(user_message)
+    
+    def _timed_shed_response(self, user_message: str) -> ChatResponse:
+        start_time = time.time()
+        response = self._shed_response(user_message)
+        response.processing_time = time.time() - start_time
+        return response
+    
+    def _chat_tracked(self, queued_at: float, user_message: str, session_id: str = None,
+                      on_event: Callable = None) -> ChatResponse:
+        self.overload.observe_queue_wait(time.time() - queued_at)
+        with self.overload.track():
+            return self._chat(user_message, session_id, on_event)
+    
     def chat(self, user_message: str, session_id: str = None) -> ChatResponse:
         """Enhanced main chat function with comprehensive error handling"""
+        with self.overload.track():
+            result = self._dispatch(user_message, session_id)
+            return result.result() if isinstance(result, Future) else result
+    
+    def chat_stream(self, user_message: str, session_id: str = None) -> Iterator[Tuple[str, Dict]]:
+        """Chat as (event, data) steps as soon as each is known: ack → intent → products → message"""
+        yield 'ack', {'timestamp': time.time()}
+        
+        events = queue.Queue()
+        with self.overload.track():
+            result = self._dispatch(user_message, session_id, lambda event, data: events.put((event, data)))
+            if isinstance(result, Future):
+                result.add_done_callback(lambda _: events.put(None))
+                for item in iter(events.get, None):
+                    yield item
+                result = result.result()
+        
+        while not events.empty():
+            yield events.get_nowait()
+        yield 'message', self._message_event(result)
+    
+    @staticmethod
+    def _message_event(response: ChatResponse) -> Dict:
+        return {
+            'response': response.message,
+            'intent': response.intent,
+            'confidence': round(response.confidence, 2),
+            'products_found': response.products_found,
+            'processing_time': round(response.processing_time, 3)
+        }
+    
+    async def achat(self, user_message: str, session_id: str = None) -> ChatResponse:
+        """Asyncio entry point: rule answers inline on the event loop, the rest awaited on the slow lane
+        
+        A waiting conversation holds only a coroutine, not a thread; LLM calls and
+        CPU-bound search run on the slow lane's thread pool.
+        """
+        result = self._dispatch_async(user_message, session_id)
+        return await asyncio.wrap_future(result) if isinstance(result, Future) else result
+    
+    async def achat_stream(self, user_message: str, session_id: str = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """Async version of chat_stream (ack → intent → products → message)"""
+        yield 'ack', {'timestamp': time.time()}
+        
+        loop = asyncio.get_running_loop()
+        events = queue.Queue()
+        wake = asyncio.Event()
+        
+        def on_event(event, data):
+            events.put((event, data))
+            loop.call_soon_threadsafe(wake.set)
+        
+        result = self._dispatch_async(user_message, session_id, on_event)
+        if isinstance(result, Future):
+            result.add_done_callback(lambda _: on_event(None, None))
+            finished = False
+            while not finished:
+                await wake.wait()
+                wake.clear()
+                while not events.empty():
+                    event, data = events.get_nowait()
+                    if event is None:
+                        finished = True
+                        break
+                    yield event, data
+            result = result.result()
+        
+        while not events.empty():
+            yield events.get_nowait()
+        yield 'message', self._message_event(result)
+    
+    def _chat(self, user_message: str, session_id: str = None, on_event: Callable = None) -> ChatResponse:
+        # Runs on a web or slow-lane thread: bind this conversation's context here
+        with self.conversation_handler.session(session_id):
+            response = self._chat_in_session(user_message, session_id, on_event)
+        self.metrics.observe(CHAT_HISTOGRAM, response.processing_time, intent=response.intent)
+        return response
+    
+    def _chat_in_session(self, user_message: str, session_id: str = None, on_event: Callable = None) -> ChatResponse:
         start_time = time.time()
         
         try:
             # Update stats
-            self.stats['total_requests'] += 1
+            self.stats.add('total_requests')
             
             # Validate input
             if not user_message or not user_message.strip():
@@ -1668,35 +2010,25 @@ GÖREVLER:
                 user_message = user_message[:500] + "..."
                 logger.warning("Message truncated due to length")
             
-
+            # Shedding load: no search or LLM work for this message
+            if self.overload.should_degrade(SHED):
+                response = self._shed_response(user_message)
+                response.processing_time = time.time() - start_time
+                return response
             
             # Extract intent and entities
             intent_result = self.extract_intent_with_gemini(user_message.strip())
+            if on_event:
+                on_event('intent', {'intent': intent_result.intent, 'confidence': round(intent_result.confidence, 2)})
             
             # Generate response
-            response = self.route_and_respond(intent_result, user_message, session_id)
+            response = self.route_and_respond(intent_result, user_message, session_id, on_event)
             
-            # Update conversation context
+            # Update conversation context (the products the answer was built from;
+            # materialized to dicts only here, at the context boundary)
             products = []
-            if response.products_found > 0 and intent_result.intent == "product_search":
-                # Get the products that were found
-                query = intent_result.entities.get('product_name', user_message)
-                features = intent_result.entities.get('product_features', [])
-                color = intent_result.entities.get('color', '')
-                found_products = self.search_products(query, features, color, session_id)
-                
-                # Convert Product objects to dictionaries for context storage
-                products = []
-                for product in found_products:
-                    products.append({
-                        'name': product.name,
-                        'color': product.color,
-                        'price': product.price,
-                        'final_price': product.final_price,
-                        'discount': product.discount,
-                        'category': product.category,
-                        'stock': product.stock
-                    })
+            if response.products and intent_result.intent == "product_search":
+                products = [product_to_dict(product) for product in response.products]
             
             self.conversation_handler.update_context(
                 user_message, intent_result.intent, products
@@ -1707,11 +2039,8 @@ GÖREVLER:
             response.processing_time = processing_time
             
             # Update stats
-            self.stats['successful_requests'] += 1
-            self.stats['average_response_time'] = (
-                (self.stats['average_response_time'] * (self.stats['successful_requests'] - 1) + processing_time) 
-                / self.stats['successful_requests']
-            )
+            self.stats.add('successful_requests')
+            self.stats.add('total_response_time', processing_time)
             
             logger.info(f"✅ Request processed: intent={response.intent}, confidence={response.confidence:.2f}, time={processing_time:.3f}s")
             
@@ -1728,25 +2057,52 @@ GÖREVLER:
     
     def get_stats(self) -> Dict:
         """Get enhanced system statistics"""
+        stats = self.stats.snapshot()
         return {
-            **self.stats,
+            **stats,
+            'average_response_time': stats['total_response_time'] / max(1, stats['successful_requests']),
             'products_loaded': len(self.products),
             'gemini_available': self.model is not None,
-            'success_rate': (self.stats['successful_requests'] / max(1, self.stats['total_requests'])) * 100,
-            'cache_hit_rate': (self.stats['cache_hits'] / max(1, self.stats['total_requests'])) * 100,
+            'success_rate': (stats['successful_requests'] / max(1, stats['total_requests'])) * 100,
+            'cache_hit_rate': (stats['cache_hits'] / max(1, stats['total_requests'])) * 100,
             'conversation_stats': self.conversation_handler.get_conversation_stats(),
-            'smart_cache_stats': self.smart_cache.get_stats()
+            'smart_cache_stats': self.smart_cache.get_stats(),
+            'lanes': self.lanes.get_stats(),
+            'latency': self.latency_stats()
+        }
+    
+    def stats_summary(self) -> Dict:
+        """Short stats block for chat replies, read from the metrics snapshot (no aggregation per request)"""
+        snapshot = self.metrics.snapshot()
+        stats = snapshot['counters'].get('chatbot', {}).get(f"tenant={self.tenant_id}")
+        if not stats:
+            return {'total_requests': 0, 'cache_hit_rate': 0.0, 'average_response_time': 0.0}
+        return {
+            'total_requests': stats['total_requests'],
+            'cache_hit_rate': (stats['cache_hits'] / max(1, stats['total_requests'])) * 100,
+            'average_response_time': stats['total_response_time'] / max(1, stats['successful_requests'])
+        }
+    
+    def latency_stats(self) -> Dict:
+        """p50/p95/p99 (rolling window) per intent and per pipeline stage, process-wide"""
+        histograms = self.metrics.snapshot()['histograms']
+        return {
+            'intents': {labels.split('=', 1)[1]: summary for labels, summary in histograms.get(CHAT_HISTOGRAM, {}).items()},
+            'stages': {labels.split('=', 1)[1]: summary for labels, summary in histograms.get(STAGE_HISTOGRAM, {}).items()}
         }
     
     def health_check(self) -> Dict:
         """Enhanced system health check"""
+        overload = self.overload.get_stats()
         return {
-            'status': 'healthy',
+            'status': 'healthy' if overload['level'] == 0 else 'degraded',
             'products_loaded': len(self.products) > 0,
             'gemini_available': self.model is not None,
             'business_info_loaded': bool(self.business_info),
             'rag_search_available': self.rag_search is not None and self.rag_search.is_available(),
             'conversation_handler_ready': self.conversation_handler is not None,
+            'degradation_level': overload['level_name'],
+            'overload': overload,
             'total_requests': self.stats['total_requests'],
             'cache_size': len(self.smart_cache.cache) if self.smart_cache else 0
         }
@@ -1784,24 +2140,23 @@ GÖREVLER:
         # If no specific brand mentioned, allow all products
         return True
 
-    def _calculate_search_confidence(self, query: str, results: List[Dict]) -> float:
-        """Calculate confidence score for search results"""
+    def _calculate_search_confidence(self, query: str, results: List[Tuple[int, float]],
+                                     products: Sequence[Product] = None) -> float:
+        """Calculate confidence score for (row_id, similarity) search results"""
         if not results:
             return 0.0
+        products = products if products is not None else self.products
         
         query_words = set(query.lower().split())
         total_confidence = 0.0
         
-        for result in results[:3]:  # Check top 3 results
-            name_words = set(result['name'].lower().split())
+        for row_id, similarity_score in results[:3]:  # Check top 3 results
+            name_words = set(products[row_id].name.lower().split())
             
             # Word overlap score
             overlap = len(query_words.intersection(name_words))
             overlap_score = overlap / len(query_words) if query_words else 0
             
-            # Similarity score from RAG
-            similarity_score = result.get('similarity', 0)
-            
             # Combined confidence
             result_confidence = (overlap_score * 0.6) + (similarity_score * 0.4)
             total_confidence += result_confidence
@@ -1810,20 +2165,23 @@ GÖREVLER:
         avg_confidence = total_confidence / min(3, len(results))
         
         # Boost confidence for exact matches
-        for result in results[:1]:
-            if query.lower() in result['name'].lower():
+        for row_id, _ in results[:1]:
+            if query.lower() in products[row_id].name.lower():
                 avg_confidence = min(1.0, avg_confidence + 0.3)
         
         return avg_confidence
 
-    def _validate_results_with_llm(self, query: str, results: List[Dict]) -> List[Dict]:
-        """Use LLM to validate search results when confidence is low"""
+    @timed_stage('llm_validate')
+    def _validate_results_with_llm(self, query: str, results: List[Tuple[int, float]],
+                                   products: Sequence[Product] = None) -> List[Tuple[int, float]]:
+        """Use LLM to validate (row_id, similarity) search results when confidence is low"""
         if not self.model or not results:
             return results
+        products = products if products is not None else self.products
         
         try:
             # Prepare results for LLM validation
-            result_names = [r['name'] for r in results[:5]]
+            result_names = [products[row_id].name for row_id, _ in results[:5]]
             
             prompt = f"""Türkçe iç giyim ürün arama sonuçlarını değerlendir.
 
@@ -1842,15 +2200,15 @@ KURALLAR:
 
 ÇIKTI: Sadece uygun ürün numaraları (örnek: 1,3,5)"""
 
-            response = self.model.generate_content(
-                prompt,
+            response = self._generate_content(
+                prompt, 50,
                 generation_config={
                     'temperature': 0.1,
                     'max_output_tokens': 50
                 }
             )
             
-            if response.text:
+            if response and response.text:
                 # Parse LLM response
                 valid_indices = []
                 for char in response.text:
@@ -1906,6 +2264,21 @@ KURALLAR:
         # Cache is valid if at least 50% of products are relevant
         return relevant_products / min(3, len(cached_result)) >= 0.5
 
+    def _update_business_responses(self, chatbot_config: Dict):
+        """Update chatbot responses for specific business"""
+        business_info = chatbot_config.get("business_info", {})
+        
+        # Update business info
+        self.business_info.update(business_info)
+        
+        # Update fixed responses with business-specific info
+        self.fixed_responses = get_fixed_responses(self.business_info, self._get_whatsapp_support_text)
+        
+        # Update greeting message if customized
+        welcome_message = chatbot_config.get("welcome_message")
+        if welcome_message:
+            self.fixed_responses["greeting"] = welcome_message
+
 def main():
     """Test the improved MVP system"""
     print("🚀 Improved Final MVP Chatbot System")
@@ -1936,21 +2309,5 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}")
 
-    def _update_business_responses(self, chatbot_config: Dict):
-        """Update chatbot responses for specific business"""
-        business_info = chatbot_config.get("business_info", {})
-        
-        # Update business info
-        self.business_info.update(business_info)
-        
-        # Update fixed responses with business-specific info
-        from fixed_responses import get_fixed_responses
-        self.fixed_responses = get_fixed_responses(self.business_info, self._get_whatsapp_support_text)
-        
-        # Update greeting message if customized
-        welcome_message = chatbot_config.get("welcome_message")
-        if welcome_message:
-            self.fixed_responses["greeting"] = welcome_message
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Keyed Lane Executor
+Runs work for the same key strictly in order, different keys in parallel
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Lane:
+    """One FIFO queue drained by one thread, with its own counters"""
+
+    __slots__ = ('index', 'queue', 'thread', 'lock', 'submitted', 'completed', 'failed',
+                 'rejected', 'total_wait', 'max_wait', 'max_depth')
+
+    def __init__(self, index: int, max_depth: int):
+        self.index = index
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_depth)
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self.total_wait = self.max_wait = 0.0
+        self.max_depth = 0
+
+class KeyedLaneExecutor:
+    """Hash-partitioned single-thread lanes
+
+    A key (e.g. session_id `whatsapp_{from_number}`) always maps to the same
+    lane, so one conversation's work runs in submission order and never
+    concurrently with itself, while different conversations spread over
+    all lanes. Counters are kept per lane (no global lock on the hot path).
+    """
+
+    _STOP = object()
+
+    def __init__(self, lanes: int = None, max_depth: int = 0, name: str = "lane"):
+        self.name = name
+        lanes = lanes if lanes is not None else int(os.getenv('LANE_COUNT', '16'))
+        self._lanes = [_Lane(i, max_depth) for i in range(max(1, lanes))]
+        self._accepting = True
+        for lane in self._lanes:
+            lane.thread = threading.Thread(target=self._run_lane, args=(lane,),
+                                           name=f"{name}-{lane.index}", daemon=True)
+            lane.thread.start()
+        atexit.register(self.shutdown)
+
+    @property
+    def accepting(self) -> bool:
+        """False once shutdown started"""
+        return self._accepting
+
+    def lane_index(self, key: str) -> int:
+        return zlib.crc32(key.encode('utf-8')) % len(self._lanes)
+
+    def submit(self, key: str, fn: Callable, *args, **kwargs) -> Optional[Future]:
+        """Queue fn on the key's lane; None if the lane is full or shutting down"""
+        lane = self._lanes[self.lane_index(key)]
+        future: Future = Future()
+        with lane.lock:
+            if not self._accepting:
+                lane.rejected += 1
+                return None
+            try:
+                lane.queue.put_nowait((future, fn, args, kwargs, time.time()))
+            except queue.Full:
+                lane.rejected += 1
+                return None
+            lane.submitted += 1
+            lane.max_depth = max(lane.max_depth, lane.queue.qsize())
+        return future
+
+    def _run_lane(self, lane: _Lane):
+        while True:
+            item = lane.queue.get()
+            if item is self._STOP:
+                return
+            future, fn, args, kwargs, enqueued_at = item
+            wait = time.time() - enqueued_at
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+                ok = True
+            except BaseException as e:
+                future.set_exception(e)
+                ok = False
+            with lane.lock:
+                if ok:
+                    lane.completed += 1
+                else:
+                    lane.failed += 1
+                lane.total_wait += wait
+                lane.max_wait = max(lane.max_wait, wait)
+
+    def shutdown(self, timeout: float = 30.0) -> bool:
+        """Stop intake, run what is queued and stop the lanes; False if timed out"""
+        self._accepting = False
+        deadline = time.time() + timeout
+        for lane in self._lanes:
+            if lane.thread.is_alive():
+                try:
+                    lane.queue.put(self._STOP, timeout=max(0.0, deadline - time.time()))
+                except queue.Full:
+                    pass
+        for lane in self._lanes:
+            lane.thread.join(max(0.0, deadline - time.time()))
+        drained = not any(lane.thread.is_alive() for lane in self._lanes)
+        if not drained:
+            logger.warning(f"⚠️ {self.name} lanes did not drain in {timeout}s")
+        return drained
+
+    def get_stats(self) -> Dict:
+        """Lane depth and wait-time metrics"""
+        depths = []
+        totals = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        total_wait = max_wait = 0.0
+        max_depth = 0
+        for lane in self._lanes:
+            with lane.lock:
+                depths.append(lane.queue.qsize())
+                for key in totals:
+                    totals[key] += getattr(lane, key)
+                total_wait += lane.total_wait
+                max_wait = max(max_wait, lane.max_wait)
+                max_depth = max(max_depth, lane.max_depth)
+        finished = totals['completed'] + totals['failed']
+        return {
+            **totals,
+            'lanes': len(self._lanes),
+            'depth': sum(depths),
+            'max_lane_depth': max(depths),
+            'busiest_lane': depths.index(max(depths)),
+            'max_depth_seen': max_depth,
+            'avg_wait_time': total_wait / finished if finished else 0.0,
+            'max_wait_time': max_wait
+        }
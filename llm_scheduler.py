@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+LLM Scheduler
+Per-tenant fair admission, concurrency caps and daily token/cost budgets for LLM calls
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+
+from technical_cost_calculator import llm_call_cost_usd
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TenantPolicy:
+    """LLM share and limits of one business"""
+    weight: float = 1.0
+    max_concurrency: int = 2
+    daily_tokens: int = 200_000
+    daily_cost_usd: float = 1.0
+
+@dataclass
+class LLMGrant:
+    """An admitted LLM call; hand it back to `release`"""
+    tenant_id: str
+    estimated_tokens: int
+
+class _Waiter:
+    __slots__ = ('tokens', 'granted')
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.granted = False
+
+class _TenantState:
+    __slots__ = ('policy', 'in_flight', 'finish_tag', 'waiting', 'day', 'tokens', 'reserved', 'cost',
+                 'calls', 'budget_denials', 'timeouts')
+
+    def __init__(self, policy: TenantPolicy, day: date):
+        self.policy = policy
+        self.in_flight = 0
+        self.finish_tag = 0.0
+        self.waiting: "deque[_Waiter]" = deque()
+        self.day = day
+        self.tokens = self.reserved = 0
+        self.cost = 0.0
+        self.calls = self.budget_denials = self.timeouts = 0
+
+class LLMScheduler:
+    """Weighted fair queuing of LLM calls across business_ids
+
+    At most `max_concurrency` LLM calls run in the process and at most the
+    tenant's `max_concurrency` per business. When slots are contended the
+    waiting tenant with the smallest virtual start tag goes next (start-time
+    fair queuing weighted by the policy weight, charged by estimated
+    tokens), so a campaign on one business cannot starve the others.
+    A tenant over its daily token or cost budget is refused immediately,
+    as is a call that waited longer than `wait_timeout`; callers then use
+    their local (rules / RAG / fuzzy) path instead.
+    """
+
+    def __init__(self, max_concurrency: int = None, default_policy: TenantPolicy = None,
+                 wait_timeout: float = None, today: Callable[[], date] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+        self.default_policy = default_policy or TenantPolicy(
+            max_concurrency=int(os.getenv('LLM_TENANT_CONCURRENCY', '2')),
+            daily_tokens=int(os.getenv('LLM_TENANT_DAILY_TOKENS', '200000')),
+            daily_cost_usd=float(os.getenv('LLM_TENANT_DAILY_COST_USD', '1.0'))
+        )
+        self.wait_timeout = wait_timeout if wait_timeout is not None else float(os.getenv('LLM_QUEUE_TIMEOUT', '2'))
+        self._today = today or (lambda: datetime.now().date())
+
+        self._cond = threading.Condition()
+        self._tenants: Dict[str, _TenantState] = {}
+        self._policies: Dict[str, TenantPolicy] = {}
+        self._in_flight = 0
+        self._virtual_time = 0.0
+
+        self.stats = {
+            'granted': 0,
+            'queued': 0,
+            'budget_denied': 0,
+            'timed_out': 0
+        }
+
+    def set_policy(self, tenant_id: str, **overrides):
+        """Override weight / max_concurrency / daily_tokens / daily_cost_usd for a tenant"""
+        policy = replace(self.default_policy, **overrides)
+        with self._cond:
+            self._policies[tenant_id] = policy
+            if tenant_id in self._tenants:
+                self._tenants[tenant_id].policy = policy
+            self._dispatch()
+
+    def _tenant(self, tenant_id: str) -> _TenantState:
+        today = self._today()
+        state = self._tenants.get(tenant_id)
+        if state is None:
+            policy = self._policies.get(tenant_id, self.default_policy)
+            state = self._tenants[tenant_id] = _TenantState(policy, today)
+        elif state.day != today:
+            # Yeni gün - bütçeyi sıfırla
+            state.day = today
+            state.tokens = 0
+            state.cost = 0.0
+            state.calls = state.budget_denials = state.timeouts = 0
+        return state
+
+    @staticmethod
+    def _over_budget(state: _TenantState) -> bool:
+        return (state.tokens + state.reserved >= state.policy.daily_tokens
+                or state.cost >= state.policy.daily_cost_usd)
+
+    def within_budget(self, tenant_id: str) -> bool:
+        """False once the tenant used up today's LLM tokens or cost"""
+        with self._cond:
+            return not self._over_budget(self._tenant(tenant_id))
+
+    def acquire(self, tenant_id: str, estimated_tokens: int, timeout: float = None) -> Optional[LLMGrant]:
+        """Wait for an LLM slot; None means use the local path (over budget or no slot in time)"""
+        timeout = self.wait_timeout if timeout is None else timeout
+        with self._cond:
+            state = self._tenant(tenant_id)
+            if self._over_budget(state):
+                state.budget_denials += 1
+                self.stats['budget_denied'] += 1
+                return None
+
+            waiter = _Waiter(estimated_tokens)
+            state.waiting.append(waiter)
+            self._dispatch()
+            if not waiter.granted:
+                self.stats['queued'] += 1
+                self._cond.wait_for(lambda: waiter.granted, timeout)
+            if not waiter.granted:
+                state.waiting.remove(waiter)
+                state.timeouts += 1
+                self.stats['timed_out'] += 1
+                return None
+            return LLMGrant(tenant_id, estimated_tokens)
+
+    def _dispatch(self):
+        """Hand free slots to waiting tenants, smallest virtual start tag first"""
+        granted = False
+        while self._in_flight < self.max_concurrency:
+            best, best_start = None, None
+            for state in self._tenants.values():
+                if state.waiting and state.in_flight < state.policy.max_concurrency:
+                    start = max(self._virtual_time, state.finish_tag)
+                    if best is None or start < best_start:
+                        best, best_start = state, start
+            if best is None:
+                break
+            waiter = best.waiting.popleft()
+            waiter.granted = True
+            best.in_flight += 1
+            best.reserved += waiter.tokens
+            best.finish_tag = best_start + waiter.tokens / max(best.policy.weight, 1e-6)
+            self._virtual_time = best_start
+            self._in_flight += 1
+            self.stats['granted'] += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def release(self, grant: LLMGrant, input_tokens: int = None, output_tokens: int = None,
+                model: str = None):
+        """Free the slot and charge the tenant at `model`'s price (estimate when usage is unknown)"""
+        if input_tokens is None and output_tokens is None:
+            input_tokens, output_tokens = grant.estimated_tokens, 0
+        input_tokens, output_tokens = input_tokens or 0, output_tokens or 0
+        with self._cond:
+            state = self._tenant(grant.tenant_id)
+            state.in_flight -= 1
+            state.reserved = max(0, state.reserved - grant.estimated_tokens)
+            state.tokens += input_tokens + output_tokens
+            state.cost += llm_call_cost_usd(input_tokens, output_tokens, model)
+            state.calls += 1
+            self._in_flight -= 1
+            if self._over_budget(state):
+                logger.warning(f"💸 LLM budget exhausted for {grant.tenant_id} "
+                               f"({state.tokens} tokens, ${state.cost:.4f}), using local paths")
+            self._dispatch()
+
+    def get_stats(self) -> Dict:
+        """Scheduler totals and per-tenant usage for today"""
+        with self._cond:
+            return {
+                **self.stats,
+                'in_flight': self._in_flight,
+                'max_concurrency': self.max_concurrency,
+                'waiting': sum(len(state.waiting) for state in self._tenants.values()),
+                'tenants': {
+                    tenant_id: {
+                        'in_flight': state.in_flight,
+                        'waiting': len(state.waiting),
+                        'calls_today': state.calls,
+                        'tokens_today': state.tokens,
+                        'cost_today_usd': round(state.cost, 6),
+                        'over_budget': self._over_budget(state),
+                        'budget_denials': state.budget_denials,
+                        'timeouts': state.timeouts,
+                        'weight': state.policy.weight
+                    }
+                    for tenant_id, state in self._tenants.items()
+                }
+            }
+
+# Global instance
+_llm_scheduler = None
+_llm_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get global LLM scheduler (shared by every tenant chatbot in the process)"""
+    global _llm_scheduler
+    with _llm_scheduler_lock:
+        if _llm_scheduler is None:
+            _llm_scheduler = LLMScheduler()
+        return _llm_scheduler
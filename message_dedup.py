@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Message Deduplication
+Drops webhook redeliveries by message id (bounded memory window + optional SQLite tier)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class MessageDeduplicator:
+    """Remembers processed message ids
+
+    The memory tier is an LRU window of the most recent ids. When
+    `db_path` is set, ids are also recorded in SQLite (INSERT OR IGNORE on
+    the primary key) so redeliveries are caught across restarts and across
+    processes; rows older than `ttl` seconds are pruned.
+    """
+
+    PRUNE_EVERY = 1000  # inserts between SQLite prunes
+
+    def __init__(self, window_size: int = None, ttl: float = None, db_path: Optional[str] = None):
+        self.window_size = window_size if window_size is not None else int(os.getenv('DEDUP_WINDOW', '10000'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('DEDUP_TTL', '86400'))
+        self.db_path = db_path
+
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._inserts = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS seen_messages "
+                               "(message_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_messages_seen_at ON seen_messages(seen_at)")
+            self._conn.commit()
+
+        self.stats = {
+            'checks': 0,
+            'duplicates': 0,
+            'memory_hits': 0,
+            'store_hits': 0,
+            'store_errors': 0,
+            'duplicates_by_channel': {}
+        }
+
+    def seen(self, message_id: str, channel: str = 'whatsapp') -> bool:
+        """Mark a message id as processed; True if it was already seen (drop it)"""
+        if not message_id:
+            return False
+        key = f"{channel}:{message_id}"
+        now = time.time()
+
+        with self._lock:
+            self.stats['checks'] += 1
+            seen_at = self._recent.get(key)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._recent.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._count_duplicate(channel)
+
+            self._recent[key] = now
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.window_size:
+                self._recent.popitem(last=False)
+
+            if self._conn is not None and self._seen_in_store(key, now):
+                self.stats['store_hits'] += 1
+                return self._count_duplicate(channel)
+        return False
+
+    def _count_duplicate(self, channel: str) -> bool:
+        self.stats['duplicates'] += 1
+        by_channel = self.stats['duplicates_by_channel']
+        by_channel[channel] = by_channel.get(channel, 0) + 1
+        return True
+
+    def _seen_in_store(self, key: str, now: float) -> bool:
+        try:
+            with self._conn:
+                self._conn.execute("DELETE FROM seen_messages WHERE message_id = ? AND seen_at < ?",
+                                   (key, now - self.ttl))
+                inserted = self._conn.execute("INSERT OR IGNORE INTO seen_messages (message_id, seen_at) "
+                                              "VALUES (?, ?)", (key, now)).rowcount
+                self._inserts += inserted
+                if self._inserts >= self.PRUNE_EVERY:
+                    self._conn.execute("DELETE FROM seen_messages WHERE seen_at < ?", (now - self.ttl,))
+                    self._inserts = 0
+            return inserted == 0
+        except sqlite3.Error as e:
+            # Store unavailable: fall back to the memory window rather than dropping messages
+            logger.error(f"❌ Dedup store error: {e}")
+            self.stats['store_errors'] += 1
+            return False
+
+    def get_stats(self) -> Dict:
+        """Deduplication statistics"""
+        with self._lock:
+            return {
+                **self.stats,
+                'duplicates_by_channel': dict(self.stats['duplicates_by_channel']),
+                'window_entries': len(self._recent),
+                'persistent': self._conn is not None
+            }
+
+# Global instance
+_message_deduplicator = None
+_message_deduplicator_lock = threading.Lock()
+
+def get_message_deduplicator() -> MessageDeduplicator:
+    """Get global deduplicator (SQLite tier enabled by DEDUP_DB_PATH)"""
+    global _message_deduplicator
+    with _message_deduplicator_lock:
+        if _message_deduplicator is None:
+            _message_deduplicator = MessageDeduplicator(db_path=os.getenv('DEDUP_DB_PATH') or None)
+        return _message_deduplicator
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry
+Lock-striped latency histograms (HDR-style buckets, rolling window) and a cached stats snapshot
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from concurrent_state import StripedCounters, stripe_index
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTOGRAM = 'chat_latency_seconds'    # label: intent
+STAGE_HISTOGRAM = 'stage_latency_seconds'  # label: stage
+LLM_HISTOGRAM = 'llm_latency_seconds'      # label: model
+
+CACHE_FIELDS = ('hits', 'misses')                                        # group 'cache', label: layer
+LLM_FIELDS = ('calls', 'errors', 'input_tokens', 'output_tokens')       # group 'llm', label: model
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def format_labels(labels: LabelKey) -> str:
+    """'intent=greeting,tenant=x' (empty for no labels)"""
+    return ','.join(f"{name}={value}" for name, value in labels)
+
+class _Shard:
+    __slots__ = ('lock', 'totals', 'count', 'sum', 'slot_counts', 'slot_epochs')
+
+    def __init__(self, size: int, slots: int):
+        self.lock = threading.Lock()
+        self.totals = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.slot_counts: List[Optional[List[int]]] = [None] * slots
+        self.slot_epochs = [-1] * slots
+
+class LatencyHistogram:
+    """Latency histogram with HDR-style log-linear buckets
+
+    Every power of two above `min_value` is split into `sub_buckets` equal
+    buckets, so a percentile is off by at most 1/sub_buckets of its value
+    at any magnitude (100µs .. ~100s by default). Samples go to a fixed set
+    of lock stripes (one per thread, modulo `stripes`, like StripedCounters),
+    so request threads rarely contend and short-lived threads (one per
+    request under the threaded dev server) do not grow memory; readers sum
+    the stripes. Percentiles come
+    from the last `window` seconds (kept in `slots` slices); bucket totals,
+    count and sum since start are kept for cumulative export.
+    """
+
+    def __init__(self, min_value: float = 1e-4, octaves: int = 20, sub_buckets: int = 8,
+                 window: float = None, slots: int = 6, clock: Callable[[], float] = time.monotonic,
+                 stripes: int = None):
+        self.min_value = min_value
+        self.octaves = octaves
+        self.sub_buckets = sub_buckets
+        self.size = octaves * sub_buckets + 2  # + underflow and overflow buckets
+        self.window = window or float(os.getenv('METRICS_WINDOW_SECONDS', '60'))
+        self.slots = slots
+        self._slot_seconds = self.window / slots
+        self._clock = clock
+        stripes = stripes or int(os.getenv('STATS_STRIPES', '16'))
+        self._shards: List[_Shard] = [_Shard(self.size, slots) for _ in range(stripes)]
+
+    def bucket_index(self, value: float) -> int:
+        if value < self.min_value:
+            return 0
+        mantissa, exponent = math.frexp(value / self.min_value)  # mantissa in [0.5, 1)
+        octave = exponent - 1
+        if octave >= self.octaves:
+            return self.size - 1
+        return 1 + octave * self.sub_buckets + int((mantissa * 2 - 1) * self.sub_buckets)
+
+    def upper_bound(self, index: int) -> float:
+        """Largest value counted in bucket `index` (inf for the overflow bucket)"""
+        if index == 0:
+            return self.min_value
+        if index == self.size - 1:
+            return math.inf
+        octave, sub = divmod(index - 1, self.sub_buckets)
+        return self.min_value * 2 ** octave * (1 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value: float):
+        shard = self._shards[stripe_index(len(self._shards))]
+        index = self.bucket_index(value)
+        epoch = int(self._clock() / self._slot_seconds)
+        slot = epoch % self.slots
+        with shard.lock:
+            shard.totals[index] += 1
+            shard.count += 1
+            shard.sum += value
+            if shard.slot_epochs[slot] != epoch:
+                shard.slot_counts[slot] = [0] * self.size
+                shard.slot_epochs[slot] = epoch
+            shard.slot_counts[slot][index] += 1
+
+    def window_counts(self) -> List[int]:
+        """Bucket counts of the rolling window"""
+        oldest = int(self._clock() / self._slot_seconds) - self.slots + 1
+        counts = [0] * self.size
+        for shard in self._shards:
+            with shard.lock:
+                for slot in range(self.slots):
+                    slot_counts = shard.slot_counts[slot]
+                    if slot_counts is not None and shard.slot_epochs[slot] >= oldest:
+                        for index, count in enumerate(slot_counts):
+                            counts[index] += count
+        return counts
+
+    def totals(self) -> Tuple[List[int], int, float]:
+        """Bucket counts, count and sum since start"""
+        counts = [0] * self.size
+        count, total = 0, 0.0
+        for shard in self._shards:
+            with shard.lock:
+                for index, bucket_count in enumerate(shard.totals):
+                    counts[index] += bucket_count
+                count += shard.count
+                total += shard.sum
+        return counts, count, total
+
+    def octave_buckets(self) -> Tuple[List[Tuple[float, int]], int, float]:
+        """Cumulative counts at every power-of-two bound (+inf last), count and sum since start
+
+        Octave bounds are bucket edges, so these counts are exact.
+        """
+        counts, _, total = self.totals()
+        buckets, seen = [], 0
+        for index, count in enumerate(counts):
+            seen += count
+            if index == 0 or (index < self.size - 1 and index % self.sub_buckets == 0):
+                buckets.append((self.upper_bound(index), seen))
+        buckets.append((math.inf, seen))
+        return buckets, seen, total
+
+    def percentiles(self, counts: List[int], quantiles: Iterable[float]) -> List[float]:
+        """Upper bucket bound at each quantile of `counts` (0.0 when empty)"""
+        total = sum(counts)
+        results = []
+        for quantile in quantiles:
+            if not total:
+                results.append(0.0)
+                continue
+            target, seen = max(1, math.ceil(quantile * total)), 0
+            for index, count in enumerate(counts):
+                seen += count
+                if seen >= target:
+                    bound = self.upper_bound(index)
+                    results.append(bound if bound != math.inf else self.min_value * 2 ** self.octaves)
+                    break
+        return results
+
+    def summary(self) -> Dict:
+        """Rolling-window count and p50/p95/p99, plus count/mean since start"""
+        counts = self.window_counts()
+        p50, p95, p99 = self.percentiles(counts, (0.5, 0.95, 0.99))
+        _, count, total = self.totals()
+        return {
+            'window_count': sum(counts),
+            'p50': round(p50, 6),
+            'p95': round(p95, 6),
+            'p99': round(p99, 6),
+            'count': count,
+            'mean': round(total / count, 6) if count else 0.0
+        }
+
+class MetricsRegistry:
+    """Named, labelled counters and latency histograms of the process
+
+    Recording never takes the registry lock: instruments are looked up in a
+    dict and only created under the lock. `snapshot()` aggregates every
+    instrument at most once per `snapshot_interval` seconds (one thread
+    rebuilds, the others keep reading the previous snapshot), so hot paths
+    such as /chat can show stats without aggregating anything themselves.
+    """
+
+    def __init__(self, snapshot_interval: float = None, clock: Callable[[], float] = time.monotonic):
+        self.snapshot_interval = (snapshot_interval if snapshot_interval is not None
+                                  else float(os.getenv('METRICS_SNAPSHOT_INTERVAL', '1.0')))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], StripedCounters] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], LatencyHistogram] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], Callable[[], float]] = {}
+        self._snapshot: Optional[Dict] = None
+        self._snapshot_at = 0.0
+
+    def counters(self, name: str, fields: Iterable[str], **labels) -> StripedCounters:
+        """Counter group `name` with the given labels (created on first use)"""
+        key = (name, _label_key(labels))
+        counters = self._counters.get(key)
+        if counters is None:
+            with self._lock:
+                counters = self._counters.get(key)
+                if counters is None:
+                    counters = self._counters[key] = StripedCounters(fields)
+        return counters
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        """Latency histogram `name` with the given labels (created on first use)"""
+        key = (name, _label_key(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram(clock=self._clock)
+        return histogram
+
+    def gauge(self, name: str, read: Callable[[], float], **labels):
+        """Register a value read only when metrics are exported (e.g. a queue depth)"""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = read
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).record(seconds)
+
+    def collect(self) -> Tuple[Dict, Dict, Dict]:
+        """Current counter groups, histograms and gauge readers, keyed by (name, labels)"""
+        return dict(self._counters), dict(self._histograms), dict(self._gauges)
+
+    def snapshot(self) -> Dict:
+        """Aggregated counters and histogram summaries, at most `snapshot_interval` old"""
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() - self._snapshot_at < self.snapshot_interval:
+            return snapshot
+        # First caller rebuilds; concurrent callers keep the previous snapshot
+        if not self._refresh_lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is snapshot:
+                self._snapshot = self._build_snapshot()
+                self._snapshot_at = self._clock()
+            return self._snapshot
+        finally:
+            self._refresh_lock.release()
+
+    def _build_snapshot(self) -> Dict:
+        counters: Dict[str, Dict] = {}
+        for (name, labels), group in list(self._counters.items()):
+            counters.setdefault(name, {})[format_labels(labels)] = group.snapshot()
+        histograms: Dict[str, Dict] = {}
+        for (name, labels), histogram in list(self._histograms.items()):
+            histograms.setdefault(name, {})[format_labels(labels)] = histogram.summary()
+        return {'timestamp': time.time(), 'counters': counters, 'histograms': histograms}
+
+# Global instance
+_metrics_registry = None
+_metrics_registry_lock = threading.Lock()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get global metrics registry (no lock once created, it is read on hot paths)"""
+    global _metrics_registry
+    if _metrics_registry is None:
+        with _metrics_registry_lock:
+            if _metrics_registry is None:
+                _metrics_registry = MetricsRegistry()
+    return _metrics_registry
+
+def count_cache(layer: str, hit: bool):
+    """Count a lookup of one cache layer (intent / smart / negative)"""
+    get_metrics_registry().counters('cache', CACHE_FIELDS, layer=layer).add('hits' if hit else 'misses')
+
+def record_llm_call(model: str, seconds: float, input_tokens: int = None, output_tokens: int = None,
+                    error: bool = False):
+    """Count an LLM call with its latency and token usage"""
+    registry = get_metrics_registry()
+    registry.observe(LLM_HISTOGRAM, seconds, model=model)
+    counters = registry.counters('llm', LLM_FIELDS, model=model)
+    counters.add('calls')
+    if error:
+        counters.add('errors')
+    if input_tokens:
+        counters.add('input_tokens', input_tokens)
+    if output_tokens:
+        counters.add('output_tokens', output_tokens)
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record the duration of a pipeline stage (context manager or decorator)"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics_registry().observe(STAGE_HISTOGRAM, time.perf_counter() - start_time, stage=stage)
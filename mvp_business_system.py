@@ -7,10 +7,16 @@ Manuel süreçlerle başlayıp sonra otomatikleştirme
 import json
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict, replace
 import hashlib
 import os
+import tempfile
+import threading
+import time
+
+from business_store import SQLiteBusinessStore, phone_key
+from catalog_service import journal_path
 
 @dataclass
 class Business:
@@ -30,6 +36,7 @@ class Business:
     instagram_access_token: str = ""
     registration_source: str = "admin"
     registration_date: str = ""
+    whatsapp_phone_number_id: str = ""  # Meta Cloud API phone_number_id
     
 @dataclass
 class BusinessProduct:
@@ -46,11 +53,175 @@ class BusinessProduct:
     stock: int
     created_at: str
 
+class BusinessRoutingIndex:
+    """Webhook yönlendirme indeksi: telefon / phone_number_id / Instagram id -> business_id
+    
+    Mesaj başına çözümleme sadece dict okumasıdır. Bu process'teki
+    create/update indeksi anında günceller; başka bir process'in (admin
+    paneli) yazdıkları `refresh_interval` saniyede bir yapılan ucuz imza
+    kontrolüyle fark edilip indeks yeniden kurulur.
+    """
+    
+    def __init__(self, manager: 'MVPBusinessManager', refresh_interval: float = None):
+        self.manager = manager
+        self.refresh_interval = (refresh_interval if refresh_interval is not None
+                                 else float(os.getenv('ROUTING_INDEX_REFRESH', '5')))
+        self._by_phone: Dict[str, str] = {}
+        self._by_phone_number_id: Dict[str, str] = {}
+        self._by_instagram_id: Dict[str, str] = {}
+        self._businesses: Dict[str, Tuple[str, str]] = {}  # business_id -> (created_at, status)
+        self._default_active: Optional[str] = None
+        self._default_any: Optional[str] = None
+        self._shadowed = False  # bir anahtar birden fazla işletmede (en eskisi kazanıyor)
+        self._signature = None
+        self._checked_at = 0.0
+        self._built = False
+        self._lock = threading.RLock()
+        self.stats = {
+            'lookups': 0,
+            'hits': 0,
+            'rebuilds': 0,
+            'updates': 0
+        }
+    
+    @staticmethod
+    def _keys(business: Business):
+        """(indeks adı, anahtar) çiftleri"""
+        key = phone_key(business.phone)
+        if key:
+            yield '_by_phone', key
+        if business.whatsapp_phone_number_id:
+            yield '_by_phone_number_id', business.whatsapp_phone_number_id
+        if business.instagram_user_id:
+            yield '_by_instagram_id', business.instagram_user_id
+    
+    def _add(self, business: Business):
+        self._remove(business.business_id)
+        self._businesses[business.business_id] = (business.created_at, business.status)
+        for index_name, key in self._keys(business):
+            getattr(self, index_name)[key] = business.business_id
+    
+    def _conflicts(self, business: Business) -> bool:
+        """Anahtarlarından biri başka bir işletmeye mi ait"""
+        return any(getattr(self, index_name).get(key, business.business_id) != business.business_id
+                   for index_name, key in self._keys(business))
+    
+    def _remove(self, business_id: str):
+        if self._businesses.pop(business_id, None) is None:
+            return
+        for index in (self._by_phone, self._by_phone_number_id, self._by_instagram_id):
+            for key in [k for k, v in index.items() if v == business_id]:
+                del index[key]
+    
+    def _update_defaults(self):
+        ordered = sorted(self._businesses.items(), key=lambda item: item[1][0])
+        self._default_any = ordered[0][0] if ordered else None
+        self._default_active = next((business_id for business_id, (_, status) in ordered
+                                     if status == 'active'), None)
+    
+    def rebuild(self):
+        """İndeksi tüm işletmelerden yeniden kur (okuyucular eski indeksi görmeye devam eder)"""
+        with self._lock:
+            signature = self.manager._routing_signature()
+            indexes = {'_by_phone': {}, '_by_phone_number_id': {}, '_by_instagram_id': {}}
+            businesses = {}
+            shadowed = False
+            # Aynı anahtar birden fazla işletmedeyse en eskisi kazanır
+            for business in sorted(self.manager._iter_businesses(), key=lambda b: b.created_at):
+                businesses[business.business_id] = (business.created_at, business.status)
+                for index_name, key in self._keys(business):
+                    if indexes[index_name].setdefault(key, business.business_id) != business.business_id:
+                        shadowed = True
+            
+            self._by_phone = indexes['_by_phone']
+            self._by_phone_number_id = indexes['_by_phone_number_id']
+            self._by_instagram_id = indexes['_by_instagram_id']
+            self._businesses = businesses
+            self._shadowed = shadowed
+            self._update_defaults()
+            self._signature = signature
+            self._checked_at = time.time()
+            self._built = True
+            self.stats['rebuilds'] += 1
+    
+    def update(self, business: Business):
+        """Oluşturulan/güncellenen işletmeyi indekse yansıt"""
+        with self._lock:
+            if not self._built:
+                return  # İlk lookup'ta zaten kurulacak
+            if self._shadowed or self._conflicts(business):
+                # Paylaşılan anahtarda öncelik (en eski kazanır) yalnızca tam kurulumla korunur
+                self.rebuild()
+            else:
+                self._add(business)
+                self._update_defaults()
+                self._signature = self.manager._routing_signature()
+            self.stats['updates'] += 1
+    
+    def _ensure_fresh(self):
+        now = time.time()
+        if self._built and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if not self._built or self.manager._routing_signature() != self._signature:
+                self.rebuild()
+            self._checked_at = now
+    
+    def _lookup(self, index_name: str, key: str) -> Optional[str]:
+        self._ensure_fresh()
+        business_id = getattr(self, index_name).get(key) if key else None
+        self.stats['lookups'] += 1
+        if business_id:
+            self.stats['hits'] += 1
+        return business_id
+    
+    def by_phone(self, phone: str) -> Optional[str]:
+        return self._lookup('_by_phone', phone_key(phone))
+    
+    def by_phone_number_id(self, phone_number_id: str) -> Optional[str]:
+        return self._lookup('_by_phone_number_id', phone_number_id)
+    
+    def by_instagram_id(self, instagram_id: str) -> Optional[str]:
+        return self._lookup('_by_instagram_id', instagram_id)
+    
+    def default_business(self, active_only: bool = False) -> Optional[str]:
+        self._ensure_fresh()
+        if active_only:
+            return self._default_active
+        return self._default_active or self._default_any
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'businesses': len(self._businesses),
+                'phones': len(self._by_phone),
+                'phone_number_ids': len(self._by_phone_number_id),
+                'instagram_ids': len(self._by_instagram_id)
+            }
+
 class MVPBusinessManager:
     """MVP İşletme yöneticisi"""
     
-    def __init__(self):
-        self.data_dir = "business_data"
+    def __init__(self, data_dir: str = "business_data", backend: str = None, db_path: str = None):
+        self.data_dir = data_dir
+        
+        # Depolama: "json" (dosya düzeni) veya "sqlite" (indeksli sorgular)
+        self.backend = backend or os.getenv('BUSINESS_STORE', 'json')
+        self.store = None
+        if self.backend == 'sqlite':
+            self.store = SQLiteBusinessStore(db_path or os.getenv('BUSINESS_DB_PATH', f"{data_dir}/business.db"))
+        
+        # Ürünler: snapshot (products.json) + append-only journal (products.journal);
+        # katalog servisi (chatbot'lar, tenant havuzu) journal'ı snapshot üzerine uygular
+        self.journal_compact_threshold = int(os.getenv('PRODUCT_JOURNAL_COMPACT_THRESHOLD', '500'))
+        self._products: Dict[str, Dict[str, BusinessProduct]] = {}  # business_id -> product_id -> ürün
+        self._products_stat: Dict[str, Tuple] = {}  # dosya imzası (başka process yazdıysa yeniden yükle)
+        self._journal_counts: Dict[str, int] = {}
+        self._products_lock = threading.RLock()
+        
+        self.routing = BusinessRoutingIndex(self)
+        
         self.ensure_directories()
     
     def ensure_directories(self):
@@ -96,7 +267,8 @@ class MVPBusinessManager:
             instagram_user_id=business_data.get("instagram_user_id", ""),
             instagram_access_token=business_data.get("instagram_access_token", ""),
             registration_source=business_data.get("registration_source", "admin"),
-            registration_date=business_data.get("registration_date", datetime.now().isoformat())
+            registration_date=business_data.get("registration_date", datetime.now().isoformat()),
+            whatsapp_phone_number_id=business_data.get("whatsapp_phone_number_id", "")
         )
         
         # Dosyaya kaydet
@@ -108,6 +280,17 @@ class MVPBusinessManager:
         
         return business_id
     
+    def update_business(self, business_id: str, updates: Dict) -> bool:
+        """İşletme alanlarını güncelle (routing indeksi de güncellenir)"""
+        business = self._load_business(business_id)
+        if not business:
+            return False
+        
+        fields = set(Business.__dataclass_fields__) - {'business_id', 'created_at'}
+        business = replace(business, **{k: v for k, v in updates.items() if k in fields})
+        self._save_business(business)
+        return True
+    
     def load_business_products(self, business_id: str, file_path: str) -> int:
         """İşletme ürünlerini dosyadan yükle (Manuel süreç)"""
         
@@ -193,37 +376,14 @@ class MVPBusinessManager:
         )
     
     def get_business_chatbot_instance(self, business_id: str):
-        """İşletmeye özel chatbot instance'ı oluştur"""
-        
-        business = self._load_business(business_id)
-        if not business:
-            return None
-        
-        products = self._load_products(business_id)
-        
-        # Mevcut chatbot sistemini business-specific hale getir
-        from improved_final_mvp_system import ImprovedFinalMVPChatbot
-        
-        # Business-specific chatbot (normal init)
-        chatbot = ImprovedFinalMVPChatbot()
-        
-        # İşletme bilgilerini güncelle
-        chatbot.business_info = {
-            'name': business.name,
-            'phone': business.phone,
-            'email': business.email,
-            'website': business.website,
-            'instagram': business.instagram_handle
-        }
-        
-        # Sektör bilgisini ekle
-        chatbot.sector = business.sector
+        """İşletmeye özel chatbot instance'ı (process-wide havuzdan)"""
+        from tenant_pool import get_tenant_pool
         
-        return chatbot
+        return get_tenant_pool().get(business_id)
     
     def _convert_to_product_object(self, business_product: BusinessProduct):
         """BusinessProduct'ı Product object'e dönüştür"""
-        from improved_final_mvp_system import Product
+        from catalog_service import Product
         
         return Product(
             name=business_product.name,
@@ -238,12 +398,19 @@ class MVPBusinessManager:
     
     def _save_business(self, business: Business):
         """İşletmeyi dosyaya kaydet"""
-        file_path = f"{self.data_dir}/businesses/{business.business_id}.json"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(asdict(business), f, ensure_ascii=False, indent=2)
+        if self.store is not None:
+            self.store.save_business(business)
+        else:
+            file_path = f"{self.data_dir}/businesses/{business.business_id}.json"
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(asdict(business), f, ensure_ascii=False, indent=2)
+        self.routing.update(business)
     
     def _load_business(self, business_id: str) -> Optional[Business]:
         """İşletmeyi dosyadan yükle"""
+        if self.store is not None:
+            data = self.store.load_business(business_id)
+            return Business(**data) if data else None
         file_path = f"{self.data_dir}/businesses/{business_id}.json"
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -252,25 +419,124 @@ class MVPBusinessManager:
         except FileNotFoundError:
             return None
     
+    def _products_path(self, business_id: str) -> str:
+        return f"{self.data_dir}/products/{business_id}/products.json"
+    
+    def _journal_path(self, business_id: str) -> str:
+        return journal_path(self._products_path(business_id))
+    
+    def _products_signature(self, business_id: str) -> Tuple:
+        signature = []
+        for path in (self._products_path(business_id), self._journal_path(business_id)):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _product_state(self, business_id: str) -> Dict[str, BusinessProduct]:
+        """Bellekteki ürün durumu (snapshot + journal replay), gerekirse diskten yükle"""
+        with self._products_lock:
+            signature = self._products_signature(business_id)
+            state = self._products.get(business_id)
+            if state is not None and self._products_stat.get(business_id) == signature:
+                return state
+            
+            state = {}
+            try:
+                with open(self._products_path(business_id), 'r', encoding='utf-8') as f:
+                    for item in json.load(f):
+                        product = BusinessProduct(**item)
+                        state[product.product_id] = product
+            except FileNotFoundError:
+                pass
+            
+            journal_count = 0
+            try:
+                with open(self._journal_path(business_id), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue  # Yarım kalmış son satır (crash)
+                        product = BusinessProduct(**record['product'])
+                        state[product.product_id] = product
+                        journal_count += 1
+            except FileNotFoundError:
+                pass
+            
+            self._products[business_id] = state
+            self._products_stat[business_id] = signature
+            self._journal_counts[business_id] = journal_count
+            return state
+    
+    def _write_snapshot(self, business_id: str, products: List[BusinessProduct]):
+        """Snapshot'ı atomik yaz (temp dosya + rename), journal'ı sıfırla"""
+        file_path = self._products_path(business_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        
+        # Aynı klasörde benzersiz temp dosya: eşzamanlı yazanlar çakışmaz
+        fd, tmp_path = tempfile.mkstemp(prefix='.products_', suffix='.tmp', dir=os.path.dirname(file_path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump([asdict(p) for p in products], f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        
+        # Journal'daki her kayıt artık snapshot'ta
+        if os.path.exists(self._journal_path(business_id)):
+            os.remove(self._journal_path(business_id))
+        self._journal_counts[business_id] = 0
+    
+    def _append_journal(self, business_id: str, products: List[BusinessProduct]):
+        """Değişen ürünleri tek seferde journal'a ekle"""
+        journal_path = self._journal_path(business_id)
+        os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+        
+        lines = [json.dumps({"op": "upsert", "product": asdict(p)}, ensure_ascii=False) + "\n"
+                 for p in products]
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_counts[business_id] = self._journal_counts.get(business_id, 0) + len(products)
+    
+    def _needs_compaction(self, business_id: str, compact: bool) -> bool:
+        """Snapshot yeniden yazılmalı mı (istendi, henüz yok veya journal eşiği doldu)"""
+        return (compact or not os.path.exists(self._products_path(business_id))
+                or self._journal_counts.get(business_id, 0) >= self.journal_compact_threshold)
+    
     def _save_products(self, business_id: str, products: List[BusinessProduct]):
-        """Ürünleri dosyaya kaydet"""
-        file_path = f"{self.data_dir}/products/{business_id}/products.json"
-        products_data = [asdict(p) for p in products]
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(products_data, f, ensure_ascii=False, indent=2)
+        """Ürünleri dosyaya kaydet (tüm listeyi değiştirir)"""
+        with self._products_lock:
+            if self.store is not None:
+                self.store.replace_products(business_id, products)
+            self._write_snapshot(business_id, products)
+            self._products[business_id] = {p.product_id: p for p in products}
+            self._products_stat[business_id] = self._products_signature(business_id)
     
     def _load_products(self, business_id: str) -> List[BusinessProduct]:
-        """Ürünleri dosyadan yükle"""
-        file_path = f"{self.data_dir}/products/{business_id}/products.json"
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [BusinessProduct(**item) for item in data]
-        except FileNotFoundError:
-            return []
+        """Ürünleri yükle"""
+        if self.store is not None:
+            return [BusinessProduct(**item) for item in self.store.load_products(business_id)]
+        return list(self._product_state(business_id).values())
+    
+    def compact_products(self, business_id: str):
+        """Journal'ı snapshot'a katla (sqlite'ta katalog dosyasını yeniden üret)"""
+        with self._products_lock:
+            self._write_snapshot(business_id, self._load_products(business_id))
+            self._products_stat[business_id] = self._products_signature(business_id)
     
     def list_businesses(self) -> List[Dict]:
         """Tüm işletmeleri listele"""
+        if self.store is not None:
+            return self.store.list_businesses()
+        
         businesses = []
         business_dir = f"{self.data_dir}/businesses"
         
@@ -299,11 +565,19 @@ class MVPBusinessManager:
     def get_business_stats(self, business_id: str) -> Dict:
         """İşletme istatistikleri"""
         business = self._load_business(business_id)
-        products = self._load_products(business_id)
-        
         if not business:
             return {}
         
+        if self.store is not None:
+            return {
+                "business_name": business.name,
+                "status": business.status,
+                **self.store.product_stats(business_id),
+                "created_at": business.created_at
+            }
+        
+        products = self._load_products(business_id)
+        
         return {
             "business_name": business.name,
             "status": business.status,
@@ -327,7 +601,10 @@ class MVPBusinessManager:
         if not business:
             return None
         
-        products = self._load_products(business_id)
+        if self.store is not None:
+            product_count = self.store.count_products(business_id)
+        else:
+            product_count = len(self._load_products(business_id))
         return {
             "business_id": business.business_id,
             "name": business.name,
@@ -338,44 +615,170 @@ class MVPBusinessManager:
             "sector": business.sector,
             "status": business.status,
             "created_at": business.created_at,
-            "product_count": len(products)
+            "product_count": product_count
         }
     
+    def count_businesses(self) -> int:
+        """İşletme sayısı"""
+        if self.store is not None:
+            return self.store.count_businesses()
+        return len(self.list_businesses())
+    
+    def find_business_by_phone(self, phone: str) -> Optional[str]:
+        """Telefon numarasına kayıtlı işletme"""
+        return self.routing.by_phone(phone)
+    
+    def find_business_by_phone_number_id(self, phone_number_id: str) -> Optional[str]:
+        """Meta phone_number_id'ye bağlı işletme"""
+        return self.routing.by_phone_number_id(phone_number_id)
+    
+    def find_business_by_instagram_id(self, instagram_id: str) -> Optional[str]:
+        """Instagram hesap id'sine bağlı işletme"""
+        return self.routing.by_instagram_id(instagram_id)
+    
+    def get_default_business_id(self, active_only: bool = False) -> Optional[str]:
+        """İlk aktif işletme, yoksa (active_only=False ise) ilk işletme"""
+        return self.routing.default_business(active_only)
+    
+    def _iter_businesses(self) -> List[Business]:
+        """Tüm işletme kayıtları (ürünler yüklenmeden)"""
+        if self.store is not None:
+            return [Business(**data) for data in self.store.iter_businesses()]
+        
+        businesses = []
+        business_dir = f"{self.data_dir}/businesses"
+        for filename in os.listdir(business_dir):
+            if filename.endswith('.json'):
+                business = self._load_business(filename[:-len('.json')])
+                if business:
+                    businesses.append(business)
+        return businesses
+    
+    def _routing_signature(self):
+        """İşletme kayıtlarının ucuz değişim imzası"""
+        if self.store is not None:
+            return self.store.businesses_signature()
+        with os.scandir(f"{self.data_dir}/businesses") as entries:
+            return frozenset((entry.name, entry.stat().st_mtime_ns) for entry in entries
+                             if entry.name.endswith('.json'))
+    
+    def business_signature(self, business_id: str):
+        """İşletme ayarlarının değişim imzası (başka process'in yazdıklarını fark etmek için)"""
+        if self.store is not None:
+            return self.store.business_version(business_id)
+        try:
+            stat = os.stat(f"{self.data_dir}/businesses/{business_id}.json")
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
     def get_products(self, business_id: str) -> List[Dict]:
         """İşletme ürünlerini döndür"""
         products = self._load_products(business_id)
         return [asdict(p) for p in products]
     
-    def add_product(self, business_id: str, product_data: Dict) -> str:
-        """Tek ürün ekle"""
-        # Mevcut ürünleri yükle
-        products = self._load_products(business_id)
-        
-        # Yeni ürün oluştur
-        new_product = BusinessProduct(
+    def _product_from_data(self, business_id: str, product_data: Dict, created_at: str) -> BusinessProduct:
+        price = float(product_data.get('price', 0))
+        return BusinessProduct(
             product_id=str(uuid.uuid4())[:8],
             business_id=business_id,
             name=product_data.get('name', ''),
             description=product_data.get('description', ''),
-            price=float(product_data.get('price', 0)),
-            final_price=float(product_data.get('price', 0)),
-            discount=0.0,
+            price=price,
+            final_price=float(product_data.get('final_price', price)),
+            discount=float(product_data.get('discount', 0.0)),
             color=product_data.get('color', ''),
             category=product_data.get('category', ''),
             stock=int(product_data.get('stock', 0)),
-            created_at=datetime.now().isoformat()
+            created_at=created_at
         )
-        
-        # Listeye ekle
-        products.append(new_product)
-        
-        # Kaydet
-        self._save_products(business_id, products)
+    
+    @staticmethod
+    def _natural_key(product: BusinessProduct) -> Tuple[str, str]:
+        return (product.name.strip().lower(), product.color.strip().lower())
+    
+    def upsert_products(self, business_id: str, items: List[Dict], compact: bool = False) -> Dict:
+        """Toplu ürün ekle/güncelle (tek lineer geçiş)
+        
+        Eşleşme product_id, yoksa (isim, renk) ile yapılır. Değişiklikler tek
+        bir journal append'i ile kalıcı olur; snapshot yalnızca compact=True
+        ise, henüz yoksa veya journal eşiği dolduysa atomik olarak yeniden yazılır.
+        """
+        with self._products_lock:
+            if self.store is not None:
+                state = {p.product_id: p for p in self._load_products(business_id)}
+            else:
+                state = self._product_state(business_id)
+            by_key = {self._natural_key(p): product_id for product_id, p in state.items()}
+            now = datetime.now().isoformat()
+            
+            changed = []
+            inserted = updated = skipped = 0
+            for item in items:
+                try:
+                    product = self._product_from_data(business_id, item, now)
+                except (ValueError, TypeError):
+                    skipped += 1  # Geçersiz fiyat/stok
+                    continue
+                existing_id = item.get('product_id')
+                if existing_id not in state:
+                    existing_id = by_key.get(self._natural_key(product))
+                
+                if existing_id:
+                    product = replace(product, product_id=existing_id,
+                                      created_at=state[existing_id].created_at)
+                    updated += 1
+                else:
+                    inserted += 1
+                
+                state[product.product_id] = product
+                by_key[self._natural_key(product)] = product.product_id
+                changed.append(product)
+            
+            if changed and self.store is not None:
+                # SQLite tek transaction; katalog dosyası (chatbot'un kaynağı) yeniden üretilir
+                self.store.upsert_products(changed)
+                self._write_snapshot(business_id, list(state.values()))
+            elif changed:
+                self._append_journal(business_id, changed)
+                if self._needs_compaction(business_id, compact):
+                    self._write_snapshot(business_id, list(state.values()))
+                self._products_stat[business_id] = self._products_signature(business_id)
+            
+            return {
+                'inserted': inserted,
+                'updated': updated,
+                'skipped': skipped,
+                'total': len(state)
+            }
+    
+    def add_product(self, business_id: str, product_data: Dict, compact: bool = False) -> str:
+        """Tek ürün ekle
+        
+        Ürün sadece journal'a eklenir (katalog servisi journal'ı okur); eşik
+        dolunca veya compact=True ise snapshot yeniden yazılır.
+        """
+        new_product = self._product_from_data(business_id, product_data, datetime.now().isoformat())
+        if self.store is not None:
+            with self._products_lock:
+                self.store.upsert_products([new_product])
+                self._write_snapshot(business_id, self._load_products(business_id))
+            return new_product.product_id
+        
+        with self._products_lock:
+            state = self._product_state(business_id)
+            state[new_product.product_id] = new_product
+            
+            self._append_journal(business_id, [new_product])
+            if self._needs_compaction(business_id, compact):
+                self._write_snapshot(business_id, list(state.values()))
+            self._products_stat[business_id] = self._products_signature(business_id)
         
         return new_product.product_id
     
     def create_business_from_params(self, name: str, email: str, phone: str, website: str = '', 
-                                   instagram_handle: str = '', sector: str = 'general') -> str:
+                                   instagram_handle: str = '', sector: str = 'general',
+                                   whatsapp_phone_number_id: str = '', instagram_user_id: str = '') -> str:
         """Yeni işletme oluştur (admin paneli için)"""
         business_data = {
             'name': name,
@@ -383,7 +786,9 @@ class MVPBusinessManager:
             'phone': phone,
             'website': website,
             'instagram_handle': instagram_handle,
-            'sector': sector
+            'sector': sector,
+            'whatsapp_phone_number_id': whatsapp_phone_number_id,
+            'instagram_user_id': instagram_user_id
         }
         return self.create_business(business_data)
 
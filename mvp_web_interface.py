@@ -8,6 +8,8 @@ from flask import Flask, render_template, request, jsonify, send_from_directory,
 from flask_cors import CORS
 from mvp_business_system import get_business_manager
 from improved_final_mvp_system import ImprovedFinalMVPChatbot
+from overload_controller import get_overload_controller
+from prometheus_exporter import add_metrics_route
 import logging
 import os
 import time
@@ -21,6 +23,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'mvp-secret-key-change-in-production')
 CORS(app)  # Enable CORS for all routes
+add_metrics_route(app)  # Prometheus /metrics
 
 # Initialize business manager
 business_manager = get_business_manager()
@@ -90,8 +93,8 @@ def chat():
         chat_response = chatbot.chat(user_message, session_id=session_id)
         processing_time = time.time() - start_time
         
-        # Get system stats
-        stats = chatbot.get_stats()
+        # Get system stats (precomputed snapshot)
+        stats = chatbot.stats_summary()
         
         return jsonify({
             'response': chat_response.message,
@@ -265,12 +268,15 @@ def health():
     """Enhanced health check endpoint"""
     try:
         businesses = business_manager.list_businesses()
+        overload = get_overload_controller().get_stats()
         
         return jsonify({
-            'status': 'healthy',
+            'status': 'healthy' if overload['level'] == 0 else 'degraded',
             'timestamp': time.time(),
             'demo_chatbot_available': demo_chatbot is not None,
             'total_businesses': len(businesses),
+            'degradation_level': overload['level'],
+            'overload': overload,
             'uptime': 'Running'
         })
     except Exception as e:
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Overload Controller
+Watches in-flight requests and latency and degrades the chat pipeline step by step
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Degradation levels (each level includes the ones below it)
+NORMAL = 0
+SKIP_VALIDATION = 1   # no LLM validation of low-confidence search results
+SKIP_ENHANCEMENT = 2  # no LLM query rewriting
+LOCAL_INTENT = 3      # rules / local classifier only, no LLM intent calls
+SHED = 4              # only cached/fixed answers, everything else gets a busy reply
+
+LEVEL_NAMES = ['normal', 'skip_validation', 'skip_enhancement', 'local_intent', 'shedding']
+
+class DegradationScope:
+    """Pipeline steps that were switched off while the scope was active"""
+    __slots__ = ('steps',)
+
+    def __init__(self):
+        self.steps: Set[int] = set()
+
+_current_scope: ContextVar[Optional[DegradationScope]] = ContextVar('degradation_scope', default=None)
+
+def _levels_from_env(name: str, default: str) -> List[float]:
+    values = [float(v) for v in os.getenv(name, default).split(',') if v.strip()]
+    if len(values) != SHED:
+        raise ValueError(f"{name} needs {SHED} comma separated thresholds")
+    return values
+
+class OverloadController:
+    """Process-wide degradation level with hysteresis
+
+    Pressure is the in-flight chat count and an EWMA of request latency and
+    webhook queue wait. A level is entered as soon as either signal crosses
+    its threshold; it is left one step at a time, only after both signals
+    stayed below `exit_ratio` x the level's thresholds for `cooldown`
+    seconds. Latency with no new samples fades out (`idle_decay`), so an
+    idle process returns to normal.
+    """
+
+    def __init__(self, inflight_levels: List[float] = None, latency_levels: List[float] = None,
+                 exit_ratio: float = None, cooldown: float = None, alpha: float = 0.2,
+                 idle_decay: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.inflight_levels = inflight_levels or _levels_from_env('OVERLOAD_INFLIGHT_LEVELS', '16,32,48,64')
+        self.latency_levels = latency_levels or _levels_from_env('OVERLOAD_LATENCY_LEVELS', '3,5,8,12')
+        self.exit_ratio = exit_ratio if exit_ratio is not None else float(os.getenv('OVERLOAD_EXIT_RATIO', '0.7'))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('OVERLOAD_COOLDOWN', '10'))
+        self.alpha = alpha
+        self.idle_decay = idle_decay
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._level = NORMAL
+        self._in_flight = 0
+        self._signals = {'latency': (0.0, clock()), 'queue_wait': (0.0, clock())}  # (ewma, sampled at)
+        self._calm_since = None
+
+        self.stats = {
+            'level_changes': 0,
+            'max_level': NORMAL,
+            'validations_skipped': 0,
+            'enhancements_skipped': 0,
+            'llm_intents_skipped': 0,
+            'shed': 0
+        }
+
+    # Signals
+
+    def begin(self):
+        with self._lock:
+            self._in_flight += 1
+            self._evaluate()
+
+    def end(self, latency: float):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._sample('latency', latency)
+            self._evaluate()
+
+    @contextmanager
+    def track(self):
+        """Count a request as in flight and record its latency"""
+        start_time = time.time()
+        self.begin()
+        try:
+            yield
+        finally:
+            self.end(time.time() - start_time)
+
+    @contextmanager
+    def track_degradation(self) -> Iterator[DegradationScope]:
+        """Collect the steps switched off during a block (e.g. to keep its result out of caches)"""
+        scope = DegradationScope()
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+
+    def observe_queue_wait(self, seconds: float):
+        """Time a job spent queued before a worker picked it up"""
+        with self._lock:
+            self._sample('queue_wait', seconds)
+            self._evaluate()
+
+    def _sample(self, signal: str, value: float):
+        current = self._signal(signal)
+        self._signals[signal] = (current + self.alpha * (value - current), self._clock())
+
+    def _signal(self, signal: str) -> float:
+        value, sampled_at = self._signals[signal]
+        if self.idle_decay <= 0:
+            return value
+        return value * math.exp(-(self._clock() - sampled_at) / self.idle_decay)
+
+    # Level
+
+    def _pressure_level(self, ratio: float) -> int:
+        """Highest level whose thresholds (scaled by ratio) are reached"""
+        latency = max(self._signal('latency'), self._signal('queue_wait'))
+        level = NORMAL
+        for i in range(SHED):
+            if self._in_flight >= self.inflight_levels[i] * ratio or latency >= self.latency_levels[i] * ratio:
+                level = i + 1
+        return level
+
+    def _evaluate(self):
+        target = self._pressure_level(1.0)
+        now = self._clock()
+        if target > self._level:
+            self._set_level(target)
+            self._calm_since = None
+        elif self._level > NORMAL and self._pressure_level(self.exit_ratio) < self._level:
+            # Below the exit thresholds: step down once it has stayed calm long enough
+            if self._calm_since is None:
+                self._calm_since = now
+            if now - self._calm_since >= self.cooldown:
+                self._set_level(self._level - 1)
+                self._calm_since = now
+        else:
+            self._calm_since = None
+
+    def _set_level(self, level: int):
+        if level > self._level:
+            logger.warning(f"🔥 Overload: degrading to level {level} ({LEVEL_NAMES[level]}), "
+                           f"in_flight={self._in_flight}, latency={self._signal('latency'):.2f}s, "
+                           f"queue_wait={self._signal('queue_wait'):.2f}s")
+        else:
+            logger.info(f"✅ Overload: recovering to level {level} ({LEVEL_NAMES[level]})")
+        self._level = level
+        self.stats['level_changes'] += 1
+        self.stats['max_level'] = max(self.stats['max_level'], level)
+
+    @property
+    def level(self) -> int:
+        with self._lock:
+            self._evaluate()
+            return self._level
+
+    def should_degrade(self, step: int) -> bool:
+        """True if the pipeline step is switched off at the current level (counted)"""
+        if self.level < step:
+            return False
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.steps.add(step)
+        counter = {
+            SKIP_VALIDATION: 'validations_skipped',
+            SKIP_ENHANCEMENT: 'enhancements_skipped',
+            LOCAL_INTENT: 'llm_intents_skipped',
+            SHED: 'shed'
+        }[step]
+        with self._lock:
+            self.stats[counter] += 1
+        return True
+
+    def get_stats(self) -> Dict:
+        """Current level and the signals behind it"""
+        level = self.level
+        with self._lock:
+            return {
+                **self.stats,
+                'level': level,
+                'level_name': LEVEL_NAMES[level],
+                'in_flight': self._in_flight,
+                'latency_ewma': round(self._signal('latency'), 3),
+                'queue_wait_ewma': round(self._signal('queue_wait'), 3)
+            }
+
+# Global instance
+_overload_controller = None
+_overload_controller_lock = threading.Lock()
+
+def get_overload_controller() -> OverloadController:
+    """Get global overload controller (shared by every chatbot in the process)"""
+    global _overload_controller
+    with _overload_controller_lock:
+        if _overload_controller is None:
+            _overload_controller = OverloadController()
+        return _overload_controller
@@ -4,10 +4,16 @@ Production Web Interface for Improved Chatbot
 Flask web interface with enhanced features
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory, session
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, session, stream_with_context
 from flask_cors import CORS
 from improved_final_mvp_system import ImprovedFinalMVPChatbot
 from mvp_business_system import get_business_manager
+from cache_snapshot import CacheSnapshotManager
+from metrics_registry import get_metrics_registry
+from catalog_reloader import get_catalog_reloader
+from asgi_bridge import AsgiApp, json_response, run_app, stream_response
+from prometheus_exporter import add_metrics_route
+import json
 import logging
 import os
 import time
@@ -20,6 +26,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 CORS(app)  # Enable CORS for all routes
+add_metrics_route(app)  # Prometheus /metrics
 
 # Initialize business manager
 business_manager = get_business_manager()
@@ -32,6 +39,22 @@ except Exception as e:
     logger.error(f"❌ Failed to initialize chatbot: {e}")
     chatbot = None
 
+# Warm caches from the last snapshot (written on shutdown and periodically)
+cache_snapshot = None
+if chatbot:
+    cache_snapshot = CacheSnapshotManager(chatbot)
+    cache_snapshot.restore()
+    cache_snapshot.start_periodic()
+    cache_snapshot.install_shutdown_hooks()
+    get_metrics_registry().gauge('cache_post_deploy_hit_rate',
+                                 lambda: cache_snapshot.get_stats().get('post_deploy_hit_rate', 0), scope='web')
+
+# Pick up data/products.json edits without a restart (background rebuild + swap)
+catalog_reloader = get_catalog_reloader()
+if chatbot:
+    catalog_reloader.register(chatbot)
+    catalog_reloader.start()
+
 @app.route('/')
 def index():
     """Main landing page with demo chat"""
@@ -53,6 +76,26 @@ def admin_panel():
     from flask import redirect
     return redirect('https://admin.kobibot.com', code=302)
 
+def _stats_summary() -> dict:
+    """Short stats block returned with every chat reply"""
+    stats = chatbot.stats_summary()
+    return {
+        'total_requests': stats['total_requests'],
+        'cache_hit_rate': round(stats['cache_hit_rate'], 1),
+        'average_response_time': round(stats['average_response_time'], 3)
+    }
+
+def _chat_result(chat_response, processing_time: float) -> dict:
+    return {
+        'response': chat_response.message,
+        'intent': chat_response.intent,
+        'confidence': round(chat_response.confidence, 2),
+        'products_found': chat_response.products_found,
+        'processing_time': round(processing_time, 3),
+        'success': True,
+        'stats': _stats_summary()
+    }
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages with session management"""
@@ -89,24 +132,8 @@ def chat():
         # Get response from chatbot with session ID
         start_time = time.time()
         chat_response = chatbot.chat(user_message, session_id=session_id)
-        processing_time = time.time() - start_time
         
-        # Get system stats
-        stats = chatbot.get_stats()
-        
-        return jsonify({
-            'response': chat_response.message,
-            'intent': chat_response.intent,
-            'confidence': round(chat_response.confidence, 2),
-            'products_found': chat_response.products_found,
-            'processing_time': round(processing_time, 3),
-            'success': True,
-            'stats': {
-                'total_requests': stats['total_requests'],
-                'cache_hit_rate': round(stats['cache_hit_rate'], 1),
-                'average_response_time': round(stats['average_response_time'], 3)
-            }
-        })
+        return jsonify(_chat_result(chat_response, time.time() - start_time))
         
     except Exception as e:
         logger.error(f"❌ Chat error: {e}")
@@ -116,6 +143,52 @@ def chat():
             'success': False
         }), 500
 
+STREAM_ERROR = {
+    'response': 'Üzgünüm, bir hata oluştu. Lütfen tekrar deneyin.',
+    'success': False
+}
+
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream a chat reply as Server-Sent Events: ack → intent → products → message → done"""
+    if not chatbot:
+        return jsonify({
+            'error': 'Chatbot not available',
+            'response': 'Üzgünüm, sistem şu anda kullanılamıyor. Lütfen daha sonra tekrar deneyin.',
+            'success': False
+        }), 500
+    
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    session_id = session['session_id']
+    
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return jsonify({
+            'error': 'Empty message',
+            'response': 'Lütfen bir mesaj yazın.',
+            'success': False
+        }), 400
+    
+    def generate():
+        try:
+            for event, payload in chatbot.chat_stream(user_message, session_id=session_id):
+                yield _sse(event, payload)
+            yield _sse('done', {'success': True, 'stats': _stats_summary()})
+        except Exception as e:
+            logger.error(f"❌ Chat stream error: {e}")
+            yield _sse('error', STREAM_ERROR)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx: do not buffer the stream
+    })
+
 @app.route('/health')
 def health():
     """Enhanced health check endpoint"""
@@ -131,9 +204,10 @@ def health():
         stats = chatbot.get_stats()
         
         return jsonify({
-            'status': 'healthy',
+            'status': health_check['status'],
             'timestamp': time.time(),
             'chatbot_available': True,
+            'degradation_level': health_check['overload']['level'],
             'health_check': health_check,
             'stats': stats,
             'uptime': 'Running'
@@ -158,6 +232,9 @@ def get_stats():
         return jsonify({
             'system_stats': stats,
             'cache_info': cache_info,
+            'cache_snapshot': cache_snapshot.get_stats() if cache_snapshot else None,
+            'catalog_reloader': catalog_reloader.get_stats(),
+            'llm_scheduler': chatbot.llm_scheduler.get_stats(),
             'timestamp': time.time()
         })
     except Exception as e:
@@ -171,8 +248,8 @@ def reset_conversation():
         return jsonify({'error': 'Chatbot not available'}), 500
     
     try:
-        # Reset conversation context
-        chatbot.conversation_handler.reset_context()
+        # Reset this visitor's conversation context (other sessions keep theirs)
+        chatbot.conversation_handler.reset_context(session.get('session_id', ''))
         
         # Clear session cache if session exists
         if 'session_id' in session:
@@ -288,6 +365,74 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+# ASGI serving mode (SERVER_MODE=asgi or `uvicorn production_web_interface:asgi_app`):
+# chat endpoints run natively on the event loop, everything else through the Flask app
+asgi_app = AsgiApp(app)
+
+def _asgi_session(request):
+    """Session id from the Flask session cookie; (session_id, Set-Cookie header or None)"""
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    serializer = app.session_interface.get_signing_serializer(app)
+    data = {}
+    cookie = request.cookie(cookie_name)
+    if cookie:
+        try:
+            data = serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except Exception:
+            data = {}
+    if data.get('session_id'):
+        return data['session_id'], None
+    data['session_id'] = str(uuid.uuid4())
+    return data['session_id'], f"{cookie_name}={serializer.dumps(data)}; HttpOnly; Path=/"
+
+def _asgi_message(request):
+    """(session_id, cookie headers, message) or an error response"""
+    if not chatbot:
+        return json_response({
+            'error': 'Chatbot not available',
+            'response': 'Üzgünüm, sistem şu anda kullanılamıyor. Lütfen daha sonra tekrar deneyin.',
+            'success': False
+        }, 500)
+    user_message = ((request.json() or {}).get('message') or '').strip()
+    if not user_message:
+        return json_response({
+            'error': 'Empty message',
+            'response': 'Lütfen bir mesaj yazın.',
+            'success': False
+        }, 400)
+    session_id, set_cookie = _asgi_session(request)
+    return session_id, [('Set-Cookie', set_cookie)] if set_cookie else [], user_message
+
+@asgi_app.route('/chat', methods=('POST',))
+async def chat_async(request):
+    """Async /chat: awaits the chat pipeline without holding a thread"""
+    parsed = _asgi_message(request)
+    if not isinstance(parsed, tuple):
+        return parsed
+    session_id, headers, user_message = parsed
+    start_time = time.time()
+    chat_response = await chatbot.achat(user_message, session_id=session_id)
+    return json_response(_chat_result(chat_response, time.time() - start_time), headers=headers)
+
+@asgi_app.route('/chat/stream', methods=('POST',))
+async def chat_stream_async(request):
+    """Async /chat/stream (same SSE events as the Flask route)"""
+    parsed = _asgi_message(request)
+    if not isinstance(parsed, tuple):
+        return parsed
+    session_id, headers, user_message = parsed
+    
+    async def generate():
+        try:
+            async for event, payload in chatbot.achat_stream(user_message, session_id=session_id):
+                yield _sse(event, payload)
+            yield _sse('done', {'success': True, 'stats': _stats_summary()})
+        except Exception as e:
+            logger.error(f"❌ Chat stream error: {e}")
+            yield _sse('error', STREAM_ERROR)
+    
+    return stream_response(generate(), headers=headers + [('Cache-Control', 'no-cache'), ('X-Accel-Buffering', 'no')])
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5004))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -303,4 +448,4 @@ if __name__ == '__main__':
     else:
         print("❌ Chatbot başlatılamadı!")
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
+    run_app(app, asgi_app, port, debug)
\ No newline at end of file
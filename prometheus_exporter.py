@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Prometheus Exporter
+Renders the metrics registry in the Prometheus text exposition format (no client library needed)
+"""
+
+import hmac
+import ipaddress
+import logging
+import math
+import os
+import re
+from typing import Dict, List, Mapping
+
+from metrics_registry import MetricsRegistry, get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+def _metric_name(name: str) -> str:
+    return _INVALID_NAME_CHARS.sub('_', name)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(labels, extra: Dict[str, str] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{_metric_name(name)}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def render_metrics(registry: MetricsRegistry = None) -> str:
+    """Every counter group, latency histogram and gauge of the registry as exposition text
+
+    Histograms are exported with power-of-two `le` bounds (100µs .. ~100s),
+    which are exact edges of the underlying HDR buckets. Rendering locks one
+    histogram stripe at a time, so a scrape only briefly delays the request
+    threads that share that stripe.
+    """
+    registry = registry or get_metrics_registry()
+    counter_groups, histograms, gauges = registry.collect()
+    families: Dict[str, List[str]] = {}
+    types: Dict[str, str] = {}
+
+    for (group, labels), counters in sorted(counter_groups.items()):
+        for field, value in counters.snapshot().items():
+            name = _metric_name(f"{group}_{field}")
+            if not name.endswith('_total'):
+                name += '_total'
+            types[name] = 'counter'
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        name = _metric_name(name)
+        types[name] = 'histogram'
+        buckets, count, total = histogram.octave_buckets()
+        lines = families.setdefault(name, [])
+        for bound, cumulative in buckets:
+            le = '+Inf' if bound == math.inf else f"{bound:.6g}"
+            lines.append(f"{name}_bucket{_labels(labels, {'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    for (name, labels), read in sorted(gauges.items(), key=lambda item: item[0]):
+        try:
+            value = float(read())
+        except Exception as e:
+            logger.debug(f"Gauge {name} unavailable: {e}")
+            continue
+        name = _metric_name(name)
+        types[name] = 'gauge'
+        families.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+
+    output = []
+    for name, lines in families.items():
+        output.append(f"# TYPE {name} {types[name]}")
+        output.extend(lines)
+    return '\n'.join(output) + '\n'
+
+def _allowed_networks(value: str) -> List:
+    networks = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring invalid METRICS_ALLOWED_IPS entry: {item}")
+    return networks
+
+def is_scrape_allowed(headers: Mapping[str, str], remote_addr: str, token: str, networks: List) -> bool:
+    """A valid bearer token, or a direct (not reverse-proxied) request from an allowed address"""
+    if token:
+        authorization = headers.get('Authorization', '')
+        if authorization.startswith('Bearer ') and hmac.compare_digest(authorization[7:].strip(), token):
+            return True
+    # Behind nginx every public request arrives from localhost; only direct scrapes count
+    if headers.get('X-Forwarded-For') or headers.get('X-Real-IP'):
+        return False
+    try:
+        address = ipaddress.ip_address(remote_addr or '')
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+def add_metrics_route(app, registry: MetricsRegistry = None, token: str = None, allowed_ips: str = None):
+    """Serve GET /metrics on a Flask app; returns the view (e.g. for a rate limiter exemption)
+
+    Scrapes need `Authorization: Bearer <METRICS_TOKEN>` or a direct
+    connection from METRICS_ALLOWED_IPS (addresses / CIDRs, default
+    loopback). METRICS_ENABLED=false turns the endpoint off (404).
+    """
+    from flask import Response, abort, request
+
+    enabled = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+    token = token if token is not None else os.getenv('METRICS_TOKEN', '')
+    networks = _allowed_networks(allowed_ips if allowed_ips is not None
+                                 else os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1'))
+
+    def metrics():
+        if not enabled:
+            abort(404)
+        if not is_scrape_allowed(request.headers, request.remote_addr, token, networks):
+            abort(403)
+        return Response(render_metrics(registry), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'prometheus_metrics', metrics, methods=['GET'])
+    return metrics
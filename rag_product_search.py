@@ -4,7 +4,6 @@ RAG-based Product Search System
 Gerçek embeddings ile ürün arama sistemi
 """
 
-import json
 import logging
 import os
 import pickle
@@ -15,6 +14,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import google.generativeai as genai
 from dotenv import load_dotenv
+from catalog_service import CatalogData, get_catalog_service, product_to_dict
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -33,17 +33,28 @@ class ProductEmbedding:
     search_text: str
 
 class RAGProductSearch:
-    """RAG-based product search with real embeddings"""
+    """RAG-based product search with real embeddings
     
-    def __init__(self):
+    Row ids returned by `search_ids` index `catalog_data.products`; pass the
+    parse the caller serves from so both always refer to the same snapshot.
+    """
+    
+    def __init__(self, products_file: str = 'data/products.json', persist: bool = True, model=None,
+                 catalog_data: CatalogData = None):
+        self.products_file = products_file
+        self.catalog_data = catalog_data or get_catalog_service().load(products_file)
+        self.persist = persist  # Load/save the index under embeddings/ (default catalog only)
         self.embeddings_file = 'embeddings/rag_product_embeddings.pkl'
         self.vectorizer_file = 'embeddings/tfidf_vectorizer.pkl'
         self.product_embeddings: List[ProductEmbedding] = []
         self.vectorizer = None
         self.tfidf_matrix = None
         
-        # Setup Gemini for query enhancement (optional)
-        self._setup_gemini()
+        # Setup Gemini for query enhancement (optional, reuse a shared model if given)
+        if model is not None:
+            self.model = model
+        else:
+            self._setup_gemini()
         
         # Load or create embeddings
         self._load_or_create_embeddings()
@@ -137,7 +148,7 @@ class RAGProductSearch:
     
     def _load_or_create_embeddings(self):
         """Load existing embeddings or create new ones"""
-        if self._load_embeddings():
+        if self.persist and self._load_embeddings():
             logger.info(f"✅ Loaded {len(self.product_embeddings)} product embeddings")
         else:
             logger.info("Creating new RAG embeddings...")
@@ -153,6 +164,16 @@ class RAGProductSearch:
                 with open(self.vectorizer_file, 'rb') as f:
                     self.vectorizer = pickle.load(f)
                 
+                # Row ids returned by search_ids index the shared catalog,
+                # so a persisted index built from another catalog is rebuilt
+                if not self._matches_catalog():
+                    logger.info("Persisted embeddings do not match the catalog, rebuilding")
+                    return False
+                
+                # Older pickles carry a dense vector per product; drop them
+                for emb in self.product_embeddings:
+                    emb.embedding = None
+                
                 # Recreate TF-IDF matrix
                 search_texts = [emb.search_text for emb in self.product_embeddings]
                 self.tfidf_matrix = self.vectorizer.transform(search_texts)
@@ -163,12 +184,21 @@ class RAGProductSearch:
         
         return False
     
+    def _matches_catalog(self) -> bool:
+        """Embeddings are row-aligned with catalog_data"""
+        products = self.catalog_data.products
+        if len(products) != len(self.product_embeddings):
+            return False
+        return all(
+            emb.name == product.name and emb.color == product.color
+            for emb, product in zip(self.product_embeddings, products)
+        )
+    
     def _create_embeddings(self):
         """Create new embeddings using TF-IDF"""
         try:
-            # Load products
-            with open('data/products.json', 'r', encoding='utf-8') as f:
-                products = json.load(f)
+            # Products of the shared parse (the chatbot and analyzer use the same one)
+            products = [product_to_dict(product) for product in self.catalog_data.products]
             
             logger.info(f"Creating embeddings for {len(products)} products...")
             
@@ -210,12 +240,14 @@ class RAGProductSearch:
             # Fit and transform
             self.tfidf_matrix = self.vectorizer.fit_transform(search_texts)
             
-            # Set embeddings
-            for i, embedding in enumerate(embeddings):
-                embedding.embedding = self.tfidf_matrix[i].toarray()[0]
-            
+            # Vectors stay in the sparse TF-IDF matrix; a dense copy per product
+            # (max_features floats each) was never read
             self.product_embeddings = embeddings
             
+            if not self.persist:
+                logger.info(f"✅ Created {len(self.product_embeddings)} in-memory RAG embeddings")
+                return
+            
             # Save embeddings
             os.makedirs(os.path.dirname(self.embeddings_file), exist_ok=True)
             
@@ -267,8 +299,8 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
         
         return query
     
-    def search(self, query: str, limit: int = 5, enhance_query: bool = False) -> List[Dict]:
-        """Search products using RAG"""
+    def search_ids(self, query: str, limit: int = 5, enhance_query: bool = False) -> List[Tuple[int, float]]:
+        """Search products using RAG; returns (row_id, score) pairs into the catalog"""
         if not self.product_embeddings or not self.vectorizer:
             return []
         
@@ -291,20 +323,11 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
             # Get top results with better threshold
             top_indices = np.argsort(similarities)[::-1][:limit * 3]  # Get more for filtering
             
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.01:  # Even lower threshold for better recall
-                    embedding = self.product_embeddings[idx]
-                    results.append({
-                        'name': embedding.name,
-                        'color': embedding.color,
-                        'price': embedding.price,
-                        'final_price': embedding.final_price,
-                        'category': embedding.category,
-                        'stock': embedding.stock,
-                        'features': embedding.features,
-                        'similarity': float(similarities[idx])
-                    })
+            results = [
+                (int(idx), float(similarities[idx]))
+                for idx in top_indices
+                if similarities[idx] > 0.01  # Even lower threshold for better recall
+            ]
             
             # Additional filtering for better results
             filtered_results = self._filter_results(results, query)
@@ -316,6 +339,23 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
             logger.error(f"RAG search error: {e}")
             return []
     
+    def search(self, query: str, limit: int = 5, enhance_query: bool = False) -> List[Dict]:
+        """Search products using RAG (materialized result dicts)"""
+        results = []
+        for row_id, similarity in self.search_ids(query, limit, enhance_query):
+            embedding = self.product_embeddings[row_id]
+            results.append({
+                'name': embedding.name,
+                'color': embedding.color,
+                'price': embedding.price,
+                'final_price': embedding.final_price,
+                'category': embedding.category,
+                'stock': embedding.stock,
+                'features': embedding.features,
+                'similarity': similarity
+            })
+        return results
+    
     def _clean_query(self, query: str) -> str:
         """Clean and normalize query for better search"""
         # Remove common words that don't help with search
@@ -333,49 +373,54 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
         
         return ' '.join(cleaned_words) if cleaned_words else query
     
-    def _filter_results(self, results: List[Dict], query: str) -> List[Dict]:
+    def _filter_results(self, results: List[Tuple[int, float]], query: str) -> List[Tuple[int, float]]:
         """Additional filtering for better results with brand filtering"""
         query_lower = query.lower()
+        query_words = query_lower.split()
+        has_color = any(color in query_lower for color in ['siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil'])
         
         # Generic brand filtering
         results = self._apply_brand_filtering(query_lower, results)
         
         # Boost exact matches
-        for result in results:
-            name_lower = result['name'].lower()
+        boosted = []
+        for row_id, similarity in results:
+            embedding = self.product_embeddings[row_id]
+            name_lower = embedding.name.lower()
             
             # Exact word matches get higher score
-            query_words = query_lower.split()
             matches = sum(1 for word in query_words if len(word) > 2 and word in name_lower)
             if matches > 0:
-                result['similarity'] += matches * 0.1
+                similarity += matches * 0.1
             
             # Product type specific boosts
             if 'sabahlık' in query_lower and 'sabahlık' in name_lower:
-                result['similarity'] += 0.3
+                similarity += 0.3
             elif 'gecelik' in query_lower and 'gecelik' in name_lower:
-                result['similarity'] += 0.3
+                similarity += 0.3
             elif 'pijama' in query_lower and 'pijama' in name_lower:
-                result['similarity'] += 0.3
+                similarity += 0.3
             elif 'takım' in query_lower and 'takım' in name_lower:
-                result['similarity'] += 0.2
+                similarity += 0.2
             
             # Color matches
-            if any(color in query_lower for color in ['siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil']):
-                color_lower = result['color'].lower()
-                if any(color in color_lower for color in query_lower.split()):
-                    result['similarity'] += 0.15
+            if has_color:
+                color_lower = embedding.color.lower()
+                if any(color in color_lower for color in query_words):
+                    similarity += 0.15
+            
+            boosted.append((row_id, similarity))
         
         # Sort by enhanced similarity
-        results.sort(key=lambda x: x['similarity'], reverse=True)
+        boosted.sort(key=lambda x: x[1], reverse=True)
         
-        return results
+        return boosted
     
     def is_available(self) -> bool:
         """Check if RAG search is available"""
         return bool(self.product_embeddings and self.vectorizer)
 
-    def _apply_brand_filtering(self, query_lower: str, results: List[Dict]) -> List[Dict]:
+    def _apply_brand_filtering(self, query_lower: str, results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
         """Generic brand filtering for RAG search results"""
         brand_patterns = {
             'stay strong': ['stay strong', 'stay', 'strong'],
@@ -392,7 +437,7 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
         for brand_name, variations in brand_patterns.items():
             # Check for exact brand match
             if brand_name in query_lower:
-                return [r for r in results if brand_name in r['name'].lower()]
+                return [r for r in results if brand_name in self.product_embeddings[r[0]].name.lower()]
             
             # Check for multi-word brand components
             if len(variations) > 1:
@@ -400,7 +445,7 @@ Sadece genişletilmiş sorguyu döndür, açıklama yapma.
                 if len(brand_words) == 2:
                     word1, word2 = brand_words
                     if word1 in query_lower and word2 in query_lower:
-                        return [r for r in results if brand_name in r['name'].lower()]
+                        return [r for r in results if brand_name in self.product_embeddings[r[0]].name.lower()]
         
         # If no specific brand mentioned, return all results
         return results
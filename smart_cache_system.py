@@ -5,14 +5,26 @@ Handles intelligent caching with context awareness
 """
 
 import json
+import math
+import random
+import threading
 import time
 import hashlib
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 import logging
 
+from metrics_registry import CACHE_FIELDS, get_metrics_registry
+
 logger = logging.getLogger(__name__)
 
+class Uncached:
+    """Wraps a computed value that is returned to the caller but never stored"""
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
 @dataclass
 class CacheEntry:
     """Cache entry with metadata"""
@@ -21,22 +33,82 @@ class CacheEntry:
     timestamp: float
     access_count: int
     context_hash: str
-    ttl: float
+    ttl: float  # Hard TTL: entry is unusable after this age
+    soft_ttl: float = 0.0  # Soft TTL: entry is stale (served while refreshing) after this age
+    created_at: float = 0.0  # Freshness reference, not touched on access
+    compute_time: float = 0.0  # Seconds the value took to compute (for early expiration)
+    
+    def __post_init__(self):
+        if not self.created_at:
+            self.created_at = self.timestamp
+        if not self.soft_ttl or self.soft_ttl > self.ttl:
+            self.soft_ttl = self.ttl
+    
+    def age(self, now: float = None) -> float:
+        return (now or time.time()) - self.created_at
+    
+    def is_fresh(self, now: float = None) -> bool:
+        return self.age(now) < self.soft_ttl
+    
+    def is_expired(self, now: float = None) -> bool:
+        return self.age(now) > self.ttl
 
 class SmartCacheSystem:
     """Intelligent caching system with context awareness"""
     
-    def __init__(self, default_ttl: float = 300, max_size: int = 1000):
+    def __init__(self, default_ttl: float = 300, max_size: int = 1000,
+                 soft_ttl_ratio: float = 0.8, early_expiration_beta: float = 1.0,
+                 negative_ttl: float = 120, random_fn: Callable[[], float] = random.random):
         self.cache: Dict[str, CacheEntry] = {}
         self.session_cache: Dict[str, Dict[str, CacheEntry]] = {}  # session_id -> cache
-        self.default_ttl = default_ttl  # 5 minutes
+        self.default_ttl = default_ttl  # 5 minutes (hard TTL)
+        self.soft_ttl_ratio = soft_ttl_ratio  # Stale-while-revalidate window starts here
+        self.early_expiration_beta = early_expiration_beta  # 0 disables probabilistic early refresh
+        self._random = random_fn  # Uniform [0, 1) source of the early refresh decision
         self.max_size = max_size
         self.stats = {
             'hits': 0,
             'misses': 0,
             'evictions': 0,
-            'total_requests': 0
+            'total_requests': 0,
+            'stale_serves': 0,
+            'coalesced_recomputes': 0,
+            'background_refreshes': 0,
+            'early_refreshes': 0,
+            'negative_hits': 0,
+            'negative_stores': 0,
+            'negative_invalidations': 0,
+            'retirements': 0,
+            'retired_entries': 0,
+            'discarded_results': 0,
+            'uncached_results': 0
         }
+        
+        # Bumped when the catalog behind cached values changes; computations
+        # started under an older generation are returned but not stored
+        self.generation = 0
+        
+        # Negative cache for zero-result queries: "scope|key" -> expires_at
+        # Scope is "<tenant_id>:<catalog_version>" so a catalog change never
+        # serves an outdated "yok" answer.
+        self.negative_cache: Dict[str, float] = {}
+        self.negative_ttl = negative_ttl  # 2 minutes, shorter than positive entries
+        
+        # Stampede protection
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._key_lock_waiters: Dict[str, int] = {}
+        self._refreshing: set = set()
+        
+        # Process-wide hit/miss counters (exported on /metrics)
+        registry = get_metrics_registry()
+        self._metrics = registry.counters('cache', CACHE_FIELDS, layer='smart')
+        self._negative_metrics = registry.counters('cache', CACHE_FIELDS, layer='negative')
+    
+    def _count(self, result: str) -> None:
+        """Count a hit or miss here and in the process-wide metrics"""
+        self.stats[result] += 1
+        self._metrics.add(result)
     
     def _generate_key(self, query: str, features: List[str] = None, color: str = None, context: str = None) -> str:
         """Generate cache key from query parameters"""
@@ -70,65 +142,285 @@ class SmartCacheSystem:
     def get(self, query: str, features: List[str] = None, color: str = None, 
             conversation_history: List[Dict] = None) -> Optional[Any]:
         """Get cached result with context awareness"""
-        self.stats['total_requests'] += 1
+        with self._lock:
+            self.stats['total_requests'] += 1
         
-        key = self._generate_key(query, features, color)
-        context_hash = self._generate_context_hash(conversation_history or [])
+            key = self._generate_key(query, features, color)
+            context_hash = self._generate_context_hash(conversation_history or [])
         
-        if key in self.cache:
-            entry = self.cache[key]
+            if key in self.cache:
+                entry = self.cache[key]
             
-            # Check if expired
-            if time.time() - entry.timestamp > entry.ttl:
-                del self.cache[key]
-                self.stats['misses'] += 1
-                return None
-            
-            # Context-aware cache hit
-            # If context has changed significantly, consider it a miss
-            if entry.context_hash and context_hash and entry.context_hash != context_hash:
-                # But still return if query is exactly the same (user repeated query)
-                if query.lower().strip() == key.split('_')[0]:
-                    entry.access_count += 1
-                    entry.timestamp = time.time()  # Refresh timestamp
-                    self.stats['hits'] += 1
-                    logger.info(f"Context-aware cache hit: {key}")
-                    return entry.data
-                else:
-                    self.stats['misses'] += 1
+                # Check if expired (stale entries are only served through get_or_compute)
+                if entry.is_expired():
+                    del self.cache[key]
+                    self._count('misses')
+                    return None
+                if not entry.is_fresh():
+                    self._count('misses')
                     return None
             
-            # Regular cache hit
-            entry.access_count += 1
-            entry.timestamp = time.time()  # Refresh timestamp
-            self.stats['hits'] += 1
-            logger.info(f"Cache hit: {key}")
-            return entry.data
+                # Context-aware cache hit
+                # If context has changed significantly, consider it a miss
+                if entry.context_hash and context_hash and entry.context_hash != context_hash:
+                    # But still return if query is exactly the same (user repeated query)
+                    if query.lower().strip() == key.split('_')[0]:
+                        entry.access_count += 1
+                        entry.timestamp = time.time()  # Refresh access time (LRU)
+                        self._count('hits')
+                        logger.info(f"Context-aware cache hit: {key}")
+                        return entry.data
+                    else:
+                        self._count('misses')
+                        return None
+            
+                # Regular cache hit
+                entry.access_count += 1
+                entry.timestamp = time.time()  # Refresh access time (LRU)
+                self._count('hits')
+                logger.info(f"Cache hit: {key}")
+                return entry.data
         
-        self.stats['misses'] += 1
-        return None
+            self._count('misses')
+            return None
     
     def put(self, query: str, data: Any, features: List[str] = None, color: str = None,
-            conversation_history: List[Dict] = None, ttl: float = None) -> None:
+            conversation_history: List[Dict] = None, ttl: float = None,
+            compute_time: float = 0.0) -> None:
         """Store data in cache with context"""
         key = self._generate_key(query, features, color)
         context_hash = self._generate_context_hash(conversation_history or [])
         
-        # Evict if cache is full
-        if len(self.cache) >= self.max_size:
-            self._evict_lru()
-        
-        entry = CacheEntry(
+        with self._lock:
+            # Evict if cache is full
+            if key not in self.cache and len(self.cache) >= self.max_size:
+                self._evict_lru()
+            
+            self.cache[key] = self._new_entry(key, data, context_hash, ttl, compute_time)
+        logger.info(f"Cached: {key}")
+    
+    def _new_entry(self, key: str, data: Any, context_hash: str, ttl: float = None,
+                   compute_time: float = 0.0) -> CacheEntry:
+        """Build a cache entry with hard and soft TTLs"""
+        hard_ttl = ttl or self.default_ttl
+        now = time.time()
+        return CacheEntry(
             key=key,
             data=data,
-            timestamp=time.time(),
+            timestamp=now,
             access_count=1,
             context_hash=context_hash,
-            ttl=ttl or self.default_ttl
+            ttl=hard_ttl,
+            soft_ttl=hard_ttl * self.soft_ttl_ratio,
+            created_at=now,
+            compute_time=compute_time
         )
+    
+    def _should_refresh_early(self, entry: CacheEntry, now: float) -> bool:
+        """Probabilistic early expiration (XFetch)
         
-        self.cache[key] = entry
-        logger.info(f"Cached: {key}")
+        Entries that took longer to compute are refreshed a little earlier, and
+        the random factor spreads refreshes of a hot key over time instead of
+        all callers noticing the expiry at the same instant.
+        """
+        if self.early_expiration_beta <= 0 or entry.compute_time <= 0:
+            return False
+        gap = entry.compute_time * self.early_expiration_beta * -math.log(1.0 - self._random())
+        return entry.age(now) + gap >= entry.soft_ttl
+    
+    def get_or_compute(self, query: str, compute_fn: Callable[[], Any], features: List[str] = None,
+                       color: str = None, conversation_history: List[Dict] = None,
+                       ttl: float = None, negative_scope: str = None, generation: int = None) -> Any:
+        """Get cached result or compute it with stampede protection
+        
+        - Fresh entry: returned directly.
+        - Stale entry (past soft TTL, before hard TTL) or probabilistically
+          early: returned as-is while exactly one background refresh runs.
+        - Missing/expired entry: recomputed under a per-key lock so concurrent
+          callers wait for the single computation instead of repeating it.
+        
+        Only truthy results are cached. When negative_scope is given, empty
+        results are remembered in the negative cache for that scope and
+        returned as [] without recomputing. Context hashes are not compared
+        here since computed values (search results) do not depend on history.
+        
+        Callers whose compute_fn closes over versioned data (a pinned catalog)
+        pass the generation they read *before* pinning it, so a result built
+        from data retired meanwhile is returned but never stored. compute_fn
+        may also return `Uncached(value)` for a result that must not be
+        stored, positively or negatively (e.g. computed in degraded mode).
+        """
+        key = self._generate_key(query, features, color)
+        now = time.time()
+        
+        with self._lock:
+            if generation is None:
+                generation = self.generation
+            self.stats['total_requests'] += 1
+            if negative_scope is not None and self._negative_hit(negative_scope, key, now):
+                return []
+            
+            entry = self.cache.get(key)
+            if entry and not entry.is_expired(now):
+                entry.access_count += 1
+                entry.timestamp = now
+                
+                if entry.is_fresh(now) and not self._should_refresh_early(entry, now):
+                    self._count('hits')
+                    return entry.data
+                
+                # Stale-while-revalidate: serve old value, refresh once in background
+                if entry.is_fresh(now):
+                    self.stats['early_refreshes'] += 1
+                    self._count('hits')
+                else:
+                    self.stats['stale_serves'] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._background_refresh,
+                        args=(key, query, compute_fn, features, color, conversation_history, ttl,
+                              negative_scope, generation),
+                        daemon=True
+                    ).start()
+                return entry.data
+            
+            self._count('misses')
+            key_lock = self._acquire_key_lock_ref(key)
+        
+        try:
+            with key_lock:
+                # Another caller may have filled the entry while we waited
+                with self._lock:
+                    entry = self.cache.get(key)
+                    if entry and not entry.is_expired():
+                        self.stats['coalesced_recomputes'] += 1
+                        return entry.data
+                    if negative_scope is not None and self._negative_hit(negative_scope, key, time.time()):
+                        self.stats['coalesced_recomputes'] += 1
+                        return []
+                
+                return self._compute_and_store(query, compute_fn, features, color,
+                                               conversation_history, ttl, negative_scope, generation)
+        finally:
+            self._release_key_lock_ref(key)
+    
+    def _compute_and_store(self, query: str, compute_fn: Callable[[], Any], features: List[str],
+                           color: str, conversation_history: List[Dict], ttl: float,
+                           negative_scope: str = None, generation: int = None) -> Any:
+        """Run the computation and cache a truthy result (or a negative entry)"""
+        start_time = time.time()
+        value = compute_fn()
+        compute_time = time.time() - start_time
+        
+        with self._lock:
+            if isinstance(value, Uncached):
+                self.stats['uncached_results'] += 1
+                return value.value
+            if generation is not None and generation != self.generation:
+                # Computed against a retired catalog: hand it to the caller only
+                self.stats['discarded_results'] += 1
+                return value
+            if value:
+                self.put(query, value, features, color, conversation_history, ttl, compute_time)
+            elif negative_scope is not None:
+                key = self._generate_key(query, features, color)
+                # A refresh that now finds nothing must not keep serving the old hits
+                self.cache.pop(key, None)
+                self._store_negative(negative_scope, key)
+        return value
+    
+    def _negative_hit(self, scope: str, key: str, now: float) -> bool:
+        """Check the negative cache (hold self._lock)"""
+        negative_key = f"{scope}|{key}"
+        expires_at = self.negative_cache.get(negative_key)
+        if expires_at is not None and now > expires_at:
+            del self.negative_cache[negative_key]
+            expires_at = None
+        if expires_at is None:
+            self._negative_metrics.add('misses')
+            return False
+        self.stats['negative_hits'] += 1
+        self._negative_metrics.add('hits')
+        return True
+    
+    def _store_negative(self, scope: str, key: str) -> None:
+        """Remember a zero-result query for this scope (hold self._lock)"""
+        if len(self.negative_cache) >= self.max_size:
+            # Drop the entry closest to expiry
+            oldest = min(self.negative_cache, key=self.negative_cache.get)
+            del self.negative_cache[oldest]
+        self.negative_cache[f"{scope}|{key}"] = time.time() + self.negative_ttl
+        self.stats['negative_stores'] += 1
+    
+    def is_negative(self, query: str, scope: str, features: List[str] = None, color: str = None) -> bool:
+        """Check whether a query is known to return no results in this scope"""
+        key = self._generate_key(query, features, color)
+        with self._lock:
+            return self._negative_hit(scope, key, time.time())
+    
+    def put_negative(self, query: str, scope: str, features: List[str] = None, color: str = None) -> None:
+        """Remember that a query returned no results in this scope"""
+        key = self._generate_key(query, features, color)
+        with self._lock:
+            self._store_negative(scope, key)
+    
+    def invalidate_negative(self, tenant_id: str = None) -> int:
+        """Drop negative entries for one tenant (or all tenants)
+        
+        Called when a catalog changes: products that were missing may exist now.
+        """
+        with self._lock:
+            if tenant_id is None:
+                keys_to_remove = list(self.negative_cache)
+            else:
+                prefix = f"{tenant_id}:"
+                keys_to_remove = [k for k in self.negative_cache if k.startswith(prefix)]
+            for negative_key in keys_to_remove:
+                del self.negative_cache[negative_key]
+            self.stats['negative_invalidations'] += len(keys_to_remove)
+        
+        logger.info(f"Invalidated {len(keys_to_remove)} negative cache entries for tenant: {tenant_id or 'all'}")
+        return len(keys_to_remove)
+    
+    def _background_refresh(self, key: str, query: str, compute_fn: Callable[[], Any],
+                            features: List[str], color: str, conversation_history: List[Dict],
+                            ttl: float, negative_scope: str = None, generation: int = None) -> None:
+        """Refresh a stale entry without blocking the caller that served it"""
+        key_lock = None
+        try:
+            with self._lock:
+                key_lock = self._acquire_key_lock_ref(key)
+            with key_lock:
+                self._compute_and_store(query, compute_fn, features, color, conversation_history, ttl,
+                                        negative_scope, generation)
+                with self._lock:
+                    self.stats['background_refreshes'] += 1
+        except Exception as e:
+            logger.error(f"Background cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+            if key_lock is not None:
+                self._release_key_lock_ref(key)
+    
+    def _acquire_key_lock_ref(self, key: str) -> threading.Lock:
+        """Return the per-key lock, registering the caller as a waiter (hold self._lock)"""
+        key_lock = self._key_locks.get(key)
+        if key_lock is None:
+            key_lock = self._key_locks[key] = threading.Lock()
+        self._key_lock_waiters[key] = self._key_lock_waiters.get(key, 0) + 1
+        return key_lock
+    
+    def _release_key_lock_ref(self, key: str) -> None:
+        """Drop a waiter reference and forget the lock once nobody uses it"""
+        with self._lock:
+            remaining = self._key_lock_waiters.get(key, 1) - 1
+            if remaining <= 0:
+                self._key_lock_waiters.pop(key, None)
+                self._key_locks.pop(key, None)
+            else:
+                self._key_lock_waiters[key] = remaining
     
     def _evict_lru(self) -> None:
         """Evict least recently used entry"""
@@ -146,145 +438,185 @@ class SmartCacheSystem:
     def invalidate_pattern(self, pattern: str) -> int:
         """Invalidate cache entries matching pattern"""
         pattern_lower = pattern.lower()
-        keys_to_remove = []
-        
-        for key in self.cache.keys():
-            if pattern_lower in key.lower():
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.cache[key]
+        with self._lock:
+            keys_to_remove = [key for key in self.cache if pattern_lower in key.lower()]
+            for key in keys_to_remove:
+                self.cache.pop(key, None)
         
         logger.info(f"Invalidated {len(keys_to_remove)} entries matching pattern: {pattern}")
         return len(keys_to_remove)
     
     def clear(self) -> None:
         """Clear all cache entries"""
-        count = len(self.cache)
-        self.cache.clear()
+        with self._lock:
+            count = len(self.cache)
+            self.cache.clear()
+            self.negative_cache.clear()
+            self.generation += 1
         logger.info(f"Cleared {count} cache entries")
     
+    def retire(self) -> int:
+        """Retire everything computed for the previous catalog version
+        
+        Drops global, session and negative entries and bumps the generation so
+        in-flight computations that started on the old catalog are not stored.
+        """
+        with self._lock:
+            count = (len(self.cache) + len(self.negative_cache) +
+                     sum(len(entries) for entries in self.session_cache.values()))
+            self.cache.clear()
+            self.session_cache.clear()
+            self.negative_cache.clear()
+            self.generation += 1
+            self.stats['retirements'] += 1
+            self.stats['retired_entries'] += count
+        logger.info(f"♻️ Retired {count} cache entries (generation {self.generation})")
+        return count
+    
     def get_stats(self) -> Dict:
         """Get cache statistics"""
-        total_requests = self.stats['total_requests']
-        hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
-        
-        return {
-            'size': len(self.cache),
-            'max_size': self.max_size,
-            'hit_rate': hit_rate,
-            'hits': self.stats['hits'],
-            'misses': self.stats['misses'],
-            'evictions': self.stats['evictions'],
-            'total_requests': total_requests
-        }
+        with self._lock:
+            total_requests = self.stats['total_requests']
+            hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+        
+            return {
+                'size': len(self.cache),
+                'max_size': self.max_size,
+                'hit_rate': hit_rate,
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'evictions': self.stats['evictions'],
+                'total_requests': total_requests,
+                'stale_serves': self.stats['stale_serves'],
+                'coalesced_recomputes': self.stats['coalesced_recomputes'],
+                'background_refreshes': self.stats['background_refreshes'],
+                'early_refreshes': self.stats['early_refreshes'],
+                'refreshes_in_flight': len(self._refreshing),
+                'negative_size': len(self.negative_cache),
+                'negative_hits': self.stats['negative_hits'],
+                'negative_stores': self.stats['negative_stores'],
+                'negative_invalidations': self.stats['negative_invalidations'],
+                'generation': self.generation,
+                'retirements': self.stats['retirements'],
+                'retired_entries': self.stats['retired_entries'],
+                'discarded_results': self.stats['discarded_results'],
+                'uncached_results': self.stats['uncached_results']
+            }
     
     def get_cache_info(self) -> List[Dict]:
         """Get detailed cache information"""
-        info = []
-        for key, entry in self.cache.items():
-            age = time.time() - entry.timestamp
-            info.append({
-                'key': key,
-                'age_seconds': age,
-                'access_count': entry.access_count,
-                'context_hash': entry.context_hash,
-                'ttl': entry.ttl,
-                'expires_in': entry.ttl - age
-            })
-        
-        # Sort by access count (most accessed first)
-        info.sort(key=lambda x: x['access_count'], reverse=True)
-        return info
+        with self._lock:
+            info = []
+            for key, entry in list(self.cache.items()):
+                age = entry.age()
+                info.append({
+                    'key': key,
+                    'age_seconds': age,
+                    'access_count': entry.access_count,
+                    'context_hash': entry.context_hash,
+                    'ttl': entry.ttl,
+                    'soft_ttl': entry.soft_ttl,
+                    'stale': not entry.is_fresh(),
+                    'expires_in': entry.ttl - age
+                })
+        
+            # Sort by access count (most accessed first)
+            info.sort(key=lambda x: x['access_count'], reverse=True)
+            return info
     
     def get_session(self, query: str, session_id: str, features: List[str] = None, 
                    color: str = None, conversation_history: List[Dict] = None) -> Optional[Any]:
         """Get data from session-specific cache"""
-        if not session_id or session_id not in self.session_cache:
-            return self.get(query, features, color, conversation_history)
+        with self._lock:
+            if not session_id or session_id not in self.session_cache:
+                return self.get(query, features, color, conversation_history)
         
-        session_cache = self.session_cache[session_id]
-        key = self._generate_key(query, features, color)
+            session_cache = self.session_cache[session_id]
+            key = self._generate_key(query, features, color)
         
-        if key in session_cache:
-            entry = session_cache[key]
+            if key in session_cache:
+                entry = session_cache[key]
             
-            # Check if expired
-            if time.time() - entry.timestamp > entry.ttl:
-                del session_cache[key]
-                return None
+                # Check if expired
+                if entry.is_expired():
+                    del session_cache[key]
+                    return None
+                if not entry.is_fresh():
+                    # Let the global cache decide (stale-while-revalidate lives there)
+                    return self.get(query, features, color, conversation_history)
             
-            entry.access_count += 1
-            entry.timestamp = time.time()
-            self.stats['hits'] += 1
-            logger.info(f"Session cache hit: {session_id}:{key}")
-            return entry.data
+                entry.access_count += 1
+                entry.timestamp = time.time()
+                self._count('hits')
+                logger.info(f"Session cache hit: {session_id}:{key}")
+                return entry.data
         
-        # Fallback to global cache
-        return self.get(query, features, color, conversation_history)
+            # Fallback to global cache
+            return self.get(query, features, color, conversation_history)
     
     def put_session(self, query: str, data: Any, session_id: str, features: List[str] = None,
-                   color: str = None, conversation_history: List[Dict] = None, ttl: float = None) -> None:
+                   color: str = None, conversation_history: List[Dict] = None, ttl: float = None,
+                   store_global: bool = True, generation: int = None) -> None:
         """Store data in session-specific cache"""
-        if not session_id:
-            return self.put(query, data, features, color, conversation_history, ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # Result belongs to a retired catalog
         
-        # Initialize session cache if needed
-        if session_id not in self.session_cache:
-            self.session_cache[session_id] = {}
+            if not session_id:
+                if store_global:
+                    self.put(query, data, features, color, conversation_history, ttl)
+                return
         
-        session_cache = self.session_cache[session_id]
-        key = self._generate_key(query, features, color)
-        context_hash = self._generate_context_hash(conversation_history or [])
+            # Initialize session cache if needed
+            if session_id not in self.session_cache:
+                self.session_cache[session_id] = {}
         
-        # Limit session cache size
-        if len(session_cache) >= 50:  # Max 50 entries per session
-            # Remove oldest entry
-            oldest_key = min(session_cache.keys(), 
-                           key=lambda k: session_cache[k].timestamp)
-            del session_cache[oldest_key]
+            session_cache = self.session_cache[session_id]
+            key = self._generate_key(query, features, color)
+            context_hash = self._generate_context_hash(conversation_history or [])
         
-        entry = CacheEntry(
-            key=key,
-            data=data,
-            timestamp=time.time(),
-            access_count=1,
-            context_hash=context_hash,
-            ttl=ttl or self.default_ttl
-        )
+            # Limit session cache size
+            if len(session_cache) >= 50:  # Max 50 entries per session
+                # Remove oldest entry
+                oldest_key = min(session_cache.keys(), 
+                               key=lambda k: session_cache[k].timestamp)
+                del session_cache[oldest_key]
         
-        session_cache[key] = entry
-        logger.info(f"Session cached: {session_id}:{key}")
+            session_cache[key] = self._new_entry(key, data, context_hash, ttl)
+            logger.info(f"Session cached: {session_id}:{key}")
         
-        # Also store in global cache
-        self.put(query, data, features, color, conversation_history, ttl)
+            # Also store in global cache
+            if store_global:
+                self.put(query, data, features, color, conversation_history, ttl)
     
     def clear_session(self, session_id: str) -> None:
         """Clear session-specific cache"""
-        if session_id in self.session_cache:
-            count = len(self.session_cache[session_id])
-            del self.session_cache[session_id]
-            logger.info(f"Cleared session cache for {session_id}: {count} entries")
+        with self._lock:
+            if session_id in self.session_cache:
+                count = len(self.session_cache[session_id])
+                del self.session_cache[session_id]
+                logger.info(f"Cleared session cache for {session_id}: {count} entries")
     
     def cleanup_expired_sessions(self, max_age: float = 1800) -> int:
         """Clean up expired sessions (default: 30 minutes)"""
-        current_time = time.time()
-        expired_sessions = []
+        with self._lock:
+            current_time = time.time()
+            expired_sessions = []
         
-        for session_id, session_cache in self.session_cache.items():
-            if not session_cache:
-                expired_sessions.append(session_id)
-                continue
+            for session_id, session_cache in self.session_cache.items():
+                if not session_cache:
+                    expired_sessions.append(session_id)
+                    continue
             
-            # Check if all entries in session are old
-            newest_timestamp = max(entry.timestamp for entry in session_cache.values())
-            if current_time - newest_timestamp > max_age:
-                expired_sessions.append(session_id)
+                # Check if all entries in session are old
+                newest_timestamp = max(entry.timestamp for entry in session_cache.values())
+                if current_time - newest_timestamp > max_age:
+                    expired_sessions.append(session_id)
         
-        for session_id in expired_sessions:
-            self.clear_session(session_id)
+            for session_id in expired_sessions:
+                self.clear_session(session_id)
         
-        return len(expired_sessions)
+            return len(expired_sessions)
 
 # Test the cache system
 def test_smart_cache():
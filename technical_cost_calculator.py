@@ -8,6 +8,35 @@ from dataclasses import dataclass
 from typing import Dict
 import json
 
+# Gemini 2.0 Flash fiyatları (Aralık 2024) - LLM bütçe takibi de bunları kullanır
+GEMINI_PRICING = {
+    "input_price_per_1m": 0.075,   # $0.075 per 1M input tokens
+    "output_price_per_1m": 0.30,   # $0.30 per 1M output tokens
+}
+
+# AWS Bedrock Mistral 7B Instruct fiyatları (on-demand, us-east-1)
+MISTRAL_7B_PRICING = {
+    "input_price_per_1m": 0.15,    # $0.15 per 1M input tokens
+    "output_price_per_1m": 0.20,   # $0.20 per 1M output tokens
+}
+
+# Model id -> fiyat; listede olmayan modeller Gemini fiyatıyla hesaplanır
+MODEL_PRICING = {
+    "mistral.mistral-7b-instruct-v0:2": MISTRAL_7B_PRICING,
+}
+
+# Ortalama token kullanımı (gerçek sistemimize göre)
+AVG_TOKENS_PER_QUERY = {
+    "input": 80,   # Intent detection prompt + user message
+    "output": 30,  # Function call response
+}
+
+def llm_call_cost_usd(input_tokens: int, output_tokens: int, model: str = None) -> float:
+    """Bir LLM çağrısının USD maliyeti (model verilmezse Gemini fiyatı)"""
+    pricing = MODEL_PRICING.get(model, GEMINI_PRICING)
+    return ((input_tokens / 1_000_000) * pricing["input_price_per_1m"]
+            + (output_tokens / 1_000_000) * pricing["output_price_per_1m"])
+
 class TechnicalCostCalculator:
     """Teknik maliyet hesaplayıcısı"""
     
@@ -50,17 +79,8 @@ class TechnicalCostCalculator:
         llm_queries = int(total_queries * 0.35)  # %35'i LLM'e gidiyor
         rule_based_queries = total_queries - llm_queries
         
-        # Gemini 2.0 Flash fiyatları (Aralık 2024)
-        gemini_pricing = {
-            "input_price_per_1m": 0.075,   # $0.075 per 1M input tokens
-            "output_price_per_1m": 0.30,   # $0.30 per 1M output tokens
-        }
-        
-        # Ortalama token kullanımı (gerçek sistemimize göre)
-        avg_tokens_per_query = {
-            "input": 80,   # Intent detection prompt + user message
-            "output": 30,  # Function call response
-        }
+        gemini_pricing = GEMINI_PRICING
+        avg_tokens_per_query = AVG_TOKENS_PER_QUERY
         
         # Token hesaplamaları
         total_input_tokens = llm_queries * avg_tokens_per_query["input"]
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Tenant Chatbot Pool
+Process-wide pool of per-business chatbots sharing LLM clients and catalogs
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from aws_bedrock_integration import get_bedrock_client
+from cache_snapshot import CacheSnapshotManager, exit_on_sigterm, post_deploy_hit_rate, snapshot_path
+from catalog_reloader import get_catalog_reloader
+from improved_final_mvp_system import (
+    DEFAULT_PRODUCTS_FILE, ChatbotCatalog, ImprovedFinalMVPChatbot, build_catalog
+)
+from llm_scheduler import get_llm_scheduler
+from metrics_registry import get_metrics_registry
+from mvp_business_system import get_business_manager
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SharedChatbotComponents:
+    """LLM clients shared by every pooled chatbot (one per process)"""
+    model: object = None
+    bedrock_client: object = None
+    use_bedrock: bool = False
+
+def create_shared_components() -> SharedChatbotComponents:
+    """Initialize Gemini and Bedrock clients once"""
+    shared = SharedChatbotComponents()
+
+    api_key = os.getenv('GEMINI_API_KEY')
+    if api_key:
+        try:
+            genai.configure(api_key=api_key)
+            shared.model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        except Exception as e:
+            logger.error(f"❌ Shared Gemini setup error: {e}")
+
+    try:
+        shared.bedrock_client = get_bedrock_client()
+        shared.use_bedrock = bool(shared.bedrock_client.bedrock_client)
+    except Exception as e:
+        logger.error(f"❌ Shared Bedrock setup error: {e}")
+
+    return shared
+
+class TenantChatbotPool:
+    """LRU-bounded pool of tenant chatbots
+
+    Each tenant keeps its own caches, business info and conversation state;
+    the LLM clients and the catalog (products, RAG index, analyzer) of a
+    products file are built once and shared by every tenant using it. With
+    cache snapshots enabled, a tenant's caches are saved when it leaves the
+    pool (eviction, invalidation, shutdown) and restored when it is built.
+    """
+
+    def __init__(self, max_size: int = None, business_manager=None, reloader=None):
+        self.max_size = max_size or int(os.getenv('TENANT_POOL_SIZE', '50'))
+        self.business_manager = business_manager or get_business_manager()
+        
+        # Product file edits are hot-swapped by the reloader; only settings
+        # changes (or a tenant switching catalogs) rebuild a pooled chatbot
+        self.reloader = reloader or get_catalog_reloader()
+        self.reloader.add_listener(self._on_catalog_swap)
+
+        self._shared: Optional[SharedChatbotComponents] = None
+        self._chatbots: "OrderedDict[str, ImprovedFinalMVPChatbot]" = OrderedDict()
+        self._catalogs: Dict[str, ChatbotCatalog] = {}
+        self._lock = threading.RLock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._catalog_locks: Dict[str, threading.Lock] = {}
+        self._signatures: Dict[str, Tuple] = {}  # business_id -> settings/products file stats
+        
+        # Warm cache snapshots per tenant (off until enable_cache_snapshots)
+        self.snapshot_dir: Optional[str] = None
+        self._snapshots: Dict[str, CacheSnapshotManager] = {}
+        self._retired_snapshots: List[CacheSnapshotManager] = []  # saved outside the lock
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'builds': 0,
+            'build_errors': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'change_invalidations': 0,
+            'catalog_builds': 0,
+            'prewarmed': 0,
+            'snapshot_restores': 0,
+            'snapshot_saves': 0
+        }
+
+    @property
+    def shared(self) -> SharedChatbotComponents:
+        with self._lock:
+            if self._shared is None:
+                self._shared = create_shared_components()
+            return self._shared
+
+    def _products_file(self, business_id: str) -> str:
+        """Tenant catalog; businesses without products use the default catalog"""
+        products_file = f"{self.business_manager.data_dir}/products/{business_id}/products.json"
+        if os.path.exists(products_file) and os.path.getsize(products_file) > 2:  # not "[]"
+            return products_file
+        return DEFAULT_PRODUCTS_FILE
+
+    def _signature(self, business_id: str) -> Tuple:
+        """Cheap change detector for a tenant's settings and catalog choice
+
+        Uses file stats (or the store's write time) so edits made by another
+        process (admin panel vs. webhook server) are noticed without any
+        messaging between them.
+        """
+        return (self.business_manager.business_signature(business_id), self._products_file(business_id))
+
+    def _get_catalog(self, products_file: str) -> ChatbotCatalog:
+        with self._lock:
+            catalog = self._catalogs.get(products_file)
+            if catalog is not None:
+                return catalog
+            build_lock = self._catalog_locks.setdefault(products_file, threading.Lock())
+
+        # One build per products file; tenants sharing it wait for it
+        with build_lock:
+            with self._lock:
+                catalog = self._catalogs.get(products_file)
+                if catalog is not None:
+                    return catalog
+
+            catalog = build_catalog(products_file, self.shared.model)
+            with self._lock:
+                self._catalogs[products_file] = catalog
+                self._catalog_locks.pop(products_file, None)
+                self.stats['catalog_builds'] += 1
+        return catalog
+
+    def _build_chatbot(self, business_id: str) -> Optional[ImprovedFinalMVPChatbot]:
+        business = self.business_manager._load_business(business_id)
+        if not business:
+            logger.warning(f"⚠️ Unknown business: {business_id}")
+            return None
+
+        catalog = self._get_catalog(self._products_file(business_id))
+        chatbot = ImprovedFinalMVPChatbot(
+            tenant_id=business_id,
+            business_info={
+                'name': business.name,
+                'phone': business.phone,
+                'email': business.email,
+                'website': business.website,
+                'instagram': business.instagram_handle
+            },
+            shared=self.shared,
+            catalog=catalog
+        )
+        chatbot._update_business_responses(business.chatbot_config or {})
+        chatbot.sector = business.sector
+
+        # Plan-specific LLM share/budget, e.g. {"weight": 2, "daily_tokens": 500000}
+        llm_policy = (business.chatbot_config or {}).get('llm_policy')
+        if llm_policy:
+            try:
+                get_llm_scheduler().set_policy(business_id, **llm_policy)
+            except TypeError as e:
+                logger.warning(f"⚠️ Invalid llm_policy for {business_id}: {e}")
+        return chatbot
+
+    def get(self, business_id: str) -> Optional[ImprovedFinalMVPChatbot]:
+        """Get the pooled chatbot for a business, building it on first use
+        
+        A pooled chatbot is rebuilt only when the tenant's settings or
+        products changed on disk.
+        """
+        signature = self._signature(business_id)
+        with self._lock:
+            chatbot = self._chatbots.get(business_id)
+            if chatbot is not None and self._signatures.get(business_id) != signature:
+                self._forget(business_id)
+                self.stats['change_invalidations'] += 1
+                chatbot = None
+            if chatbot is not None:
+                self._chatbots.move_to_end(business_id)
+                self.stats['hits'] += 1
+                return chatbot
+            self.stats['misses'] += 1
+            build_lock = self._build_locks.setdefault(business_id, threading.Lock())
+        # A rebuilt tenant restores the snapshot its old chatbot just wrote
+        self._save_retired_snapshots()
+
+        # One build per tenant; concurrent requests wait for it
+        with build_lock:
+            with self._lock:
+                chatbot = self._chatbots.get(business_id)
+                if chatbot is not None:
+                    self._chatbots.move_to_end(business_id)
+                    return chatbot
+
+            try:
+                chatbot = self._build_chatbot(business_id)
+            except Exception as e:
+                logger.error(f"❌ Failed to create chatbot for {business_id}: {e}")
+                self.stats['build_errors'] += 1
+                chatbot = None
+            snapshot = self._restore_snapshot(business_id, chatbot) if chatbot is not None else None
+
+            with self._lock:
+                self._build_locks.pop(business_id, None)
+                if chatbot is None:
+                    return None
+                self._chatbots[business_id] = chatbot
+                self._signatures[business_id] = signature
+                if snapshot is not None:
+                    self._snapshots[business_id] = snapshot
+                self.stats['builds'] += 1
+                self._evict()
+            self.reloader.register(chatbot)
+        self._save_retired_snapshots()
+
+        logger.info(f"✅ Pooled chatbot ready for business: {business_id}")
+        return chatbot
+
+    def _evict(self):
+        """Drop least recently used tenants and catalogs nobody uses (lock held)"""
+        while len(self._chatbots) > self.max_size:
+            evicted_id, _ = self._chatbots.popitem(last=False)
+            self._signatures.pop(evicted_id, None)
+            self._retire_snapshot(evicted_id)
+            self.stats['evictions'] += 1
+            logger.info(f"♻️ Evicted chatbot for business: {evicted_id}")
+        self._drop_unused_catalogs()
+
+    def enable_cache_snapshots(self, snapshot_dir: str = None):
+        """Snapshot tenant caches (restore on build, save on eviction and shutdown)
+
+        Only the process serving tenant traffic (webhook server) should
+        enable this: every process with snapshots on writes the same files.
+        """
+        self.snapshot_dir = snapshot_dir or os.getenv('CACHE_SNAPSHOT_DIR', 'cache_snapshots')
+        atexit.register(self.save_snapshots)
+        exit_on_sigterm()
+        get_metrics_registry().gauge('cache_post_deploy_hit_rate', self.post_deploy_hit_rate, scope='tenant_pool')
+
+    def _restore_snapshot(self, business_id: str, chatbot) -> Optional[CacheSnapshotManager]:
+        if self.snapshot_dir is None:
+            return None
+        snapshot = CacheSnapshotManager(chatbot, snapshot_file=snapshot_path(business_id, self.snapshot_dir))
+        snapshot.restore()
+        with self._lock:
+            self.stats['snapshot_restores'] += 1
+        return snapshot
+
+    def _retire_snapshot(self, business_id: str):
+        """Queue a leaving tenant's snapshot for saving (lock held)"""
+        snapshot = self._snapshots.pop(business_id, None)
+        if snapshot is not None:
+            self._retired_snapshots.append(snapshot)
+
+    def _save_retired_snapshots(self):
+        """Write snapshots of tenants that left the pool (file I/O outside the lock)"""
+        with self._lock:
+            if not self._retired_snapshots:
+                return
+            retired, self._retired_snapshots = self._retired_snapshots, []
+        self._save(retired)
+
+    def _save(self, snapshots: List[CacheSnapshotManager]):
+        for snapshot in snapshots:
+            snapshot.save()
+        with self._lock:
+            self.stats['snapshot_saves'] += len(snapshots)
+
+    def save_snapshots(self) -> int:
+        """Write every pooled tenant's snapshot (shutdown); returns snapshots written"""
+        with self._lock:
+            snapshots = self._retired_snapshots + list(self._snapshots.values())
+            self._retired_snapshots = []
+        self._save(snapshots)
+        return len(snapshots)
+
+    def post_deploy_hit_rate(self) -> float:
+        """Smart cache hit rate (%) of pooled tenants since their snapshots were restored"""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        return post_deploy_hit_rate(snapshots)
+
+    def _drop_unused_catalogs(self):
+        in_use = {chatbot.products_file for chatbot in self._chatbots.values()}
+        for products_file in list(self._catalogs):
+            if products_file not in in_use:
+                del self._catalogs[products_file]
+
+    def _on_catalog_swap(self, products_file: str, catalog: ChatbotCatalog):
+        """Tenants built after a hot reload get the new catalog too"""
+        with self._lock:
+            if products_file in self._catalogs:
+                self._catalogs[products_file] = catalog
+
+    def reload_catalog(self, business_id: str, wait: bool = False) -> bool:
+        """Pick up a tenant's product changes without dropping its chatbot"""
+        with self._lock:
+            chatbot = self._chatbots.get(business_id)
+        if chatbot is None:
+            return False
+        if chatbot.products_file != self._products_file(business_id):
+            # First products for a tenant on the default catalog: rebuild
+            return self.invalidate(business_id)
+        self.reloader.reload(chatbot.products_file, wait=wait)
+        return True
+
+    def invalidate(self, business_id: str) -> bool:
+        """Forget a tenant (e.g. after its settings or products changed)"""
+        with self._lock:
+            if not self._forget(business_id):
+                return False
+            self.stats['invalidations'] += 1
+        self._save_retired_snapshots()
+        return True
+
+    def _forget(self, business_id: str) -> bool:
+        """Drop a tenant and its private catalog (lock held)"""
+        chatbot = self._chatbots.pop(business_id, None)
+        self._signatures.pop(business_id, None)
+        self._retire_snapshot(business_id)
+        if chatbot is None:
+            return False
+        # A tenant-specific catalog must be rebuilt from disk next time
+        if chatbot.products_file != DEFAULT_PRODUCTS_FILE:
+            self._catalogs.pop(chatbot.products_file, None)
+        self._drop_unused_catalogs()
+        return True
+
+    def prewarm(self, business_ids: List[str] = None) -> int:
+        """Build chatbots ahead of traffic (defaults to TENANT_PREWARM env list)"""
+        if business_ids is None:
+            business_ids = [b.strip() for b in os.getenv('TENANT_PREWARM', '').split(',') if b.strip()]
+
+        warmed = 0
+        for business_id in business_ids[:self.max_size]:
+            if self.get(business_id) is not None:
+                warmed += 1
+        self.stats['prewarmed'] += warmed
+        return warmed
+
+    def __contains__(self, business_id: str) -> bool:
+        with self._lock:
+            return business_id in self._chatbots
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._chatbots)
+
+    def get_stats(self) -> Dict:
+        """Pool statistics"""
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._chatbots),
+                'max_size': self.max_size,
+                'shared_catalogs': len(self._catalogs),
+                'hit_rate': (self.stats['hits'] / total * 100) if total > 0 else 0,
+                'cache_snapshots': len(self._snapshots),
+                'tenants': list(self._chatbots.keys())
+            }
+
+# Global instance
+_tenant_pool = None
+_tenant_pool_lock = threading.Lock()
+
+def get_tenant_pool() -> TenantChatbotPool:
+    """Get global tenant chatbot pool"""
+    global _tenant_pool
+    with _tenant_pool_lock:
+        if _tenant_pool is None:
+            _tenant_pool = TenantChatbotPool()
+        return _tenant_pool
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+ASGI Bridge Unit Tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asgi_bridge import AsgiApp, json_response, stream_response
+
+def wsgi_app(environ, start_response):
+    """Flask yerine basit WSGI uygulaması"""
+    body = environ['wsgi.input'].read(int(environ['CONTENT_LENGTH'] or 0))
+    payload = {
+        'method': environ['REQUEST_METHOD'],
+        'path': environ['PATH_INFO'],
+        'query': environ['QUERY_STRING'],
+        'content_type': environ.get('CONTENT_TYPE'),
+        'cookie': environ.get('HTTP_COOKIE'),
+        'body': body.decode('utf-8')
+    }
+    start_response('201 Created', [('Content-Type', 'application/json')])
+    return [json.dumps(payload).encode('utf-8')]
+
+def call(app, method, path, body=b'', headers=()):
+    """ASGI uygulamasını tek istekle çalıştır; (status, headers, body)"""
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'a=1',
+        'headers': [(k.encode(), v.encode()) for k, v in headers], 'http_version': '1.1'
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), [m['body'] for m in sent[1:]]
+
+class TestAsgiBridge(unittest.TestCase):
+    """ASGI köprüsü testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.app = AsgiApp(wsgi_app, workers=2)
+
+        @self.app.route('/chat', methods=('POST',))
+        async def chat(request):
+            await asyncio.sleep(0)
+            return json_response({'echo': request.json()['message'], 'session': request.cookie('session')})
+
+        @self.app.route('/chat/stream', methods=('POST',))
+        async def chat_stream(request):
+            async def events():
+                for event in ('ack', 'intent', 'message'):
+                    yield f"event: {event}\n\n"
+            return stream_response(events())
+
+    def test_unrouted_requests_reach_wsgi_app(self):
+        """Native rota olmayan istekler Flask (WSGI) uygulamasına gitmeli"""
+        status, headers, body = call(self.app, 'POST', '/admin/api', b'{"x": 1}',
+                                     [('content-type', 'application/json'), ('cookie', 'session=abc')])
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        payload = json.loads(b''.join(body))
+        self.assertEqual((payload['path'], payload['query'], payload['body']), ('/admin/api', 'a=1', '{"x": 1}'))
+        self.assertEqual((payload['content_type'], payload['cookie']), ('application/json', 'session=abc'))
+
+    def test_native_route(self):
+        """Async rota event loop üzerinde çalışmalı"""
+        status, _, body = call(self.app, 'POST', '/chat', '{"message": "merhaba"}'.encode('utf-8'),
+                               [('cookie', 'session=xyz')])
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(b''.join(body)), {'echo': 'merhaba', 'session': 'xyz'})
+
+    def test_stream_sends_chunks(self):
+        """Akış yanıtı parça parça gönderilmeli"""
+        status, headers, body = call(self.app, 'POST', '/chat/stream')
+        self.assertEqual(headers[b'content-type'], b'text/event-stream')
+        self.assertEqual(body, [b'event: ack\n\n', b'event: intent\n\n', b'event: message\n\n', b''])
+
+    def test_many_concurrent_requests(self):
+        """Binlerce eşzamanlı istek thread tüketmeden beklemeli"""
+        app = AsgiApp(wsgi_app, workers=1)
+
+        @app.route('/slow', methods=('GET',))
+        async def slow(request):
+            await asyncio.sleep(0.05)
+            return json_response({'ok': True})
+
+        async def one():
+            messages = [{'type': 'http.request', 'body': b''}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/slow', 'query_string': b'', 'headers': []}
+            await app(scope, receive, send)
+            return sent[0]['status']
+
+        async def many():
+            return await asyncio.gather(*(one() for _ in range(2000)))
+
+        self.assertEqual(set(asyncio.run(many())), {200})
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
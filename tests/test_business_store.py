@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+SQLite Business Store Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business_store import migrate_from_json, phone_key
+from mvp_business_system import MVPBusinessManager
+
+def _business(name, phone, status="trial"):
+    return {"name": name, "email": f"{name.lower()}@example.com", "phone": phone, "status": status}
+
+class TestSQLiteBusinessStore(unittest.TestCase):
+    """SQLite depolama ve indeksli sorgu testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manager = MVPBusinessManager(data_dir=self.tmp_dir.name, backend='sqlite')
+
+    def tearDown(self):
+        self.manager.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_wal_mode_enabled(self):
+        """Veritabanı WAL modunda açılmalı"""
+        mode = self.manager.store._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_listing_and_stats_from_queries(self):
+        """Listeleme ürün sayısını, istatistikler fiyat aralığını SQL'den vermeli"""
+        business_id = self.manager.create_business(_business("Butik", "0555 123 45 67"))
+        self.manager.upsert_products(business_id, [
+            {"name": "Gecelik", "color": "SİYAH", "price": 300, "category": "gecelik"},
+            {"name": "Pijama", "color": "PEMBE", "price": 500, "category": "pijama"}
+        ])
+
+        listing = self.manager.list_businesses()
+        self.assertEqual([(b['business_id'], b['product_count']) for b in listing], [(business_id, 2)])
+
+        stats = self.manager.get_business_stats(business_id)
+        self.assertEqual(stats['price_range'], {"min": 300.0, "max": 500.0})
+        self.assertEqual(sorted(stats['categories']), ["gecelik", "pijama"])
+        self.assertEqual(self.manager.get_business(business_id)['product_count'], 2)
+
+    def test_phone_lookup_ignores_country_code(self):
+        """+90 / 0 farkı olan numara aynı işletmeye çözülmeli"""
+        self.manager.create_business(_business("Diğer", "0532 000 00 00"))
+        business_id = self.manager.create_business(_business("Butik", "0555 123 45 67"))
+
+        self.assertEqual(phone_key("+90 555 123 45 67"), "5551234567")
+        self.assertEqual(self.manager.find_business_by_phone("905551234567"), business_id)
+        self.assertIsNone(self.manager.find_business_by_phone("905559999999"))
+
+    def test_default_business_prefers_active(self):
+        """Varsayılan işletme ilk aktif işletme olmalı"""
+        self.manager.create_business(_business("Deneme", "1"))
+        active_id = self.manager.create_business(_business("Aktif", "2", status="active"))
+
+        self.assertEqual(self.manager.get_default_business_id(), active_id)
+        self.assertEqual(self.manager.count_businesses(), 2)
+
+    def test_upsert_exports_catalog_in_stable_order(self):
+        """Güncellenen ürün katalog dosyasında yerini korumalı"""
+        business_id = "butik01"
+        self.manager.upsert_products(business_id, [{"name": "A", "price": 1}, {"name": "B", "price": 2}])
+        self.manager.upsert_products(business_id, [{"name": "A", "price": 5}])
+
+        with open(self.manager._products_path(business_id), 'r', encoding='utf-8') as f:
+            exported = json.load(f)
+        self.assertEqual([(p['name'], p['price']) for p in exported], [("A", 5.0), ("B", 2.0)])
+
+class TestJSONMigration(unittest.TestCase):
+    """JSON düzeninden SQLite'a geçiş testleri"""
+
+    def test_migration_copies_businesses_and_journal(self):
+        """Snapshot + journal'daki tüm ürünler taşınmalı"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_manager = MVPBusinessManager(data_dir=tmp_dir, backend='json')
+            business_id = json_manager.create_business(_business("Butik", "0555 123 45 67", "active"))
+            json_manager.upsert_products(business_id, [{"name": "Sabahlık", "price": 900}])
+            json_manager.add_product(business_id, {"name": "Gecelik", "price": 300})
+
+            result = migrate_from_json(tmp_dir)
+            self.assertEqual(result, {'businesses': 1, 'products': 2})
+
+            sqlite_manager = MVPBusinessManager(data_dir=tmp_dir, backend='sqlite')
+            self.assertEqual(sqlite_manager.get_business(business_id)['product_count'], 2)
+            self.assertEqual(sqlite_manager.find_business_by_phone("+905551234567"), business_id)
+            sqlite_manager.store.close()
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
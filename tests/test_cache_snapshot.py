@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Cache Snapshot Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_snapshot import CacheSnapshotManager, post_deploy_hit_rate, snapshot_path
+from catalog_service import Product
+from enhanced_conversation_handler import EnhancedConversationHandler
+from smart_cache_system import SmartCacheSystem
+
+def make_chatbot(catalog_version: str = "v1"):
+    """Snapshot için gereken alanlara sahip hafif chatbot"""
+    return SimpleNamespace(
+        tenant_id="butik",
+        catalog_version=catalog_version,
+        smart_cache=SmartCacheSystem(default_ttl=600),
+        intent_cache={},
+        conversation_handler=EnhancedConversationHandler()
+    )
+
+class TestCacheSnapshot(unittest.TestCase):
+    """Snapshot/restore testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.tmp_dir.name, "warm_cache.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _warm(self, chatbot):
+        chatbot.smart_cache.put("gecelik", ["urun1"])
+        chatbot.smart_cache.put_negative("adidas", "butik:v1")
+        chatbot.intent_cache["merhaba"] = "greeting"
+        chatbot.conversation_handler.cache_response("iade", {"message": "14 gün"})
+
+    def test_restore_same_catalog(self):
+        """Aynı katalog sürümünde tüm katmanlar geri yüklenmeli"""
+        old_bot = make_chatbot()
+        self._warm(old_bot)
+        self.assertEqual(CacheSnapshotManager(old_bot, self.snapshot_file).save(), 4)
+
+        new_bot = make_chatbot()
+        manager = CacheSnapshotManager(new_bot, self.snapshot_file)
+        self.assertEqual(manager.restore(), 4)
+
+        self.assertEqual(new_bot.smart_cache.get("gecelik"), ["urun1"])
+        self.assertTrue(new_bot.smart_cache.is_negative("adidas", "butik:v1"))
+        self.assertEqual(new_bot.intent_cache["merhaba"], "greeting")
+        self.assertIsNotNone(new_bot.conversation_handler.get_cached_response("iade"))
+        self.assertEqual(manager.get_stats()['post_deploy_hit_rate'], 100)
+
+    def test_catalog_change_discards_catalog_entries(self):
+        """Katalog değiştiyse ürün cache'i atılmalı, intent cache korunmalı"""
+        old_bot = make_chatbot("v1")
+        self._warm(old_bot)
+        CacheSnapshotManager(old_bot, self.snapshot_file).save()
+
+        new_bot = make_chatbot("v2")
+        manager = CacheSnapshotManager(new_bot, self.snapshot_file)
+        self.assertEqual(manager.restore(), 1)
+
+        self.assertEqual(new_bot.smart_cache.cache, {})
+        self.assertEqual(new_bot.smart_cache.negative_cache, {})
+        self.assertEqual(new_bot.intent_cache["merhaba"], "greeting")
+        self.assertTrue(manager.get_stats()['catalog_changed'])
+
+    def test_hot_entries_ranked_by_access(self):
+        """Snapshot en çok erişilen girdileri tutmalı"""
+        bot = make_chatbot()
+        for query in ["a", "b", "c"]:
+            bot.smart_cache.put(query, [query])
+        for _ in range(3):
+            bot.smart_cache.get("c")
+        bot.smart_cache.get("b")
+
+        manager = CacheSnapshotManager(bot, self.snapshot_file, max_entries=2)
+        keys = [entry.key for entry in manager.build_snapshot()['smart_cache']]
+        self.assertEqual(keys, ["c", "b"])
+
+    def test_products_round_trip_as_json(self):
+        """Ürün listeleri JSON olarak yazılıp Product olarak geri okunmalı"""
+        product = Product(name="Dantelli Gecelik", color="SİYAH", price=1000.0, discount=10.0,
+                          final_price=900.0, category="gecelik", stock=5)
+        old_bot = make_chatbot()
+        old_bot.smart_cache.put("gecelik", [product])
+        CacheSnapshotManager(old_bot, self.snapshot_file).save()
+
+        with open(self.snapshot_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['smart_cache'][0]['__cache_entry__']['data'][0]['__product__']['name'], "Dantelli Gecelik")
+
+        new_bot = make_chatbot()
+        CacheSnapshotManager(new_bot, self.snapshot_file).restore()
+        self.assertEqual(new_bot.smart_cache.get("gecelik"), [product])
+
+    def test_concurrent_saves_use_unique_temp_files(self):
+        """Aynı dosyaya eşzamanlı kayıtlar çakışmamalı, geçici dosya kalmamalı"""
+        bot = make_chatbot()
+        self._warm(bot)
+        managers = [CacheSnapshotManager(bot, self.snapshot_file) for _ in range(8)]
+        results = []
+
+        threads = [threading.Thread(target=lambda m=manager: results.append(m.save())) for manager in managers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [4] * 8)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["warm_cache.json"])
+        self.assertEqual(CacheSnapshotManager(make_chatbot(), self.snapshot_file).restore(), 4)
+
+    def test_post_deploy_hit_rate_across_tenants(self):
+        """Birden fazla kiracının deploy sonrası isabet oranı toplam istek üzerinden hesaplanmalı"""
+        warm_bot, cold_bot = make_chatbot(), make_chatbot()
+        managers = [CacheSnapshotManager(bot, self.snapshot_file) for bot in (warm_bot, cold_bot)]
+        for manager in managers:
+            manager.restore()
+        warm_bot.smart_cache.put("gecelik", ["urun1"])
+        warm_bot.smart_cache.get("gecelik")
+        cold_bot.smart_cache.get("pijama")
+
+        self.assertEqual(post_deploy_hit_rate(managers), 50)
+        self.assertEqual(post_deploy_hit_rate([]), 0)
+
+    def test_snapshot_path_is_per_tenant(self):
+        """Her kiracının kendi snapshot dosyası olmalı"""
+        self.assertEqual(snapshot_path("butik01", "snapshots"), os.path.join("snapshots", "warm_cache_butik01.json"))
+        self.assertEqual(os.path.basename(snapshot_path("../x", "snapshots")), "warm_cache_.._x.json")
+
+    def test_missing_snapshot_starts_cold(self):
+        """Snapshot yoksa hata vermeden soğuk başlamalı"""
+        manager = CacheSnapshotManager(make_chatbot(), self.snapshot_file)
+        self.assertEqual(manager.restore(), 0)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
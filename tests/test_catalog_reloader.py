@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Catalog Hot Reload Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_reloader import CatalogReloader
+from catalog_service import get_catalog_service
+from improved_final_mvp_system import RAG_SEARCH_AVAILABLE, ImprovedFinalMVPChatbot, build_catalog
+from mvp_business_system import MVPBusinessManager
+from overload_controller import SKIP_VALIDATION, OverloadController
+from tenant_pool import SharedChatbotComponents, TenantChatbotPool
+
+OLD_PRODUCTS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 0.0,
+     "final_price": 1000.0, "category": "gecelik", "stock": 5}
+]
+NEW_PRODUCTS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 800.0, "discount": 0.0,
+     "final_price": 800.0, "category": "gecelik", "stock": 5}
+]
+
+def write_products(products_file: str, products):
+    os.makedirs(os.path.dirname(products_file), exist_ok=True)
+    with open(products_file, 'w', encoding='utf-8') as f:
+        json.dump(products, f, ensure_ascii=False)
+
+class FakeBusinessManager:
+    """Diskteki ürün dosyalarını kullanan en küçük işletme yöneticisi"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+
+    def business_signature(self, business_id: str):
+        return 1
+
+    def _load_business(self, business_id: str):
+        return types.SimpleNamespace(name=business_id, phone='', email='', website='', instagram_handle='',
+                                     chatbot_config={}, sector='fashion')
+
+class TestSwapCatalog(unittest.TestCase):
+    """Katalog takası sırasında cache tutarlılığı testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmp_dir.name, "products.json")
+        write_products(self.products_file, OLD_PRODUCTS)
+        self.chatbot = ImprovedFinalMVPChatbot(tenant_id='butik', products_file=self.products_file,
+                                               shared=SharedChatbotComponents())
+        write_products(self.products_file, NEW_PRODUCTS)
+        self.new_catalog = build_catalog(self.products_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_swap_during_compute_is_not_cached(self):
+        """Arama sürerken katalog değişirse eski sonuçlar cache'e yazılmamalı"""
+        search = self.chatbot._search_products_uncached
+
+        def search_then_swap(*args):
+            products = search(*args)
+            self.assertTrue(self.chatbot.swap_catalog(self.new_catalog))
+            return products
+
+        self.chatbot._search_products_uncached = search_then_swap
+        products = self.chatbot.search_products("dantelli gecelik", session_id="s1")
+
+        self.assertEqual(products[0].final_price, 1000.0)  # İstek sabitlediği katalogla biter
+        self.assertEqual(self.chatbot.smart_cache.cache, {})
+        self.assertEqual(self.chatbot.smart_cache.session_cache, {})
+
+    def test_swap_before_compute_is_not_cached(self):
+        """Katalog sabitlendikten sonra, hesaplamadan önce gelen takas da yazılmamalı"""
+        get_or_compute = self.chatbot.smart_cache.get_or_compute
+
+        def swap_then_compute(*args, **kwargs):
+            self.chatbot.swap_catalog(self.new_catalog)
+            return get_or_compute(*args, **kwargs)
+
+        self.chatbot.smart_cache.get_or_compute = swap_then_compute
+        self.chatbot.search_products("dantelli gecelik", session_id="s1")
+
+        self.assertEqual(self.chatbot.smart_cache.cache, {})
+        self.assertEqual(self.chatbot.catalog_version, self.new_catalog.version)
+
+    def test_degraded_results_are_not_cached(self):
+        """Aşırı yükte (adım kapalıyken) hesaplanan sonuçlar hiçbir cache'e yazılmamalı"""
+        self.chatbot.overload = OverloadController(inflight_levels=[1, 2, 3, 4])
+        self.chatbot.overload.begin()
+        search = self.chatbot._search_products_uncached
+
+        def degraded_search(query, *args):
+            self.chatbot.overload.should_degrade(SKIP_VALIDATION)
+            return search(query, *args) if query == "dantelli gecelik" else []  # Diğer sorgular sonuçsuz
+
+        self.chatbot._search_products_uncached = degraded_search
+        self.assertTrue(self.chatbot.search_products("dantelli gecelik", session_id="s1"))
+        self.assertEqual(self.chatbot.search_products("adidas ayakkabı", session_id="s1"), [])
+
+        self.assertEqual(self.chatbot.smart_cache.cache, {})
+        self.assertEqual(self.chatbot.smart_cache.session_cache, {})
+        self.assertEqual(self.chatbot.smart_cache.negative_cache, {})
+
+    def test_unchanged_version_is_not_swapped(self):
+        """Aynı sürüm tekrar takas edilmemeli"""
+        self.assertTrue(self.chatbot.swap_catalog(self.new_catalog))
+        self.assertFalse(self.chatbot.swap_catalog(self.new_catalog))
+
+    @unittest.skipUnless(RAG_SEARCH_AVAILABLE, "RAG bağımlılıkları (scikit-learn) kurulu değil")
+    def test_rag_index_uses_catalog_parse(self):
+        """RAG indeksi dosyayı yeniden okumamalı, verilen parse ile hizalı olmalı"""
+        old_data = get_catalog_service().load(self.products_file)
+        write_products(self.products_file, NEW_PRODUCTS * 2)
+
+        catalog = build_catalog(self.products_file, catalog_data=old_data)
+
+        self.assertIs(catalog.data, old_data)
+        self.assertIs(catalog.rag_search.catalog_data, old_data)
+        self.assertEqual(len(catalog.rag_search.product_embeddings), len(catalog.products))
+
+class TestCatalogReloader(unittest.TestCase):
+    """Arka planda yeniden yükleme testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+        self.products_file = os.path.join(self.data_dir, "products", "butik", "products.json")
+        write_products(self.products_file, OLD_PRODUCTS)
+        self.reloader = CatalogReloader(interval=0)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reload_swaps_every_chatbot_of_a_file(self):
+        """Değişen dosya bir kez yeniden kurulmalı ve tüm chatbotlara takılmalı"""
+        chatbots = [ImprovedFinalMVPChatbot(tenant_id=f"t{i}", products_file=self.products_file,
+                                            shared=SharedChatbotComponents()) for i in range(2)]
+        for chatbot in chatbots:
+            self.reloader.register(chatbot)
+        old_version = chatbots[0].catalog_version
+
+        write_products(self.products_file, NEW_PRODUCTS)
+        self.reloader.reload(self.products_file, wait=True)
+
+        self.assertNotEqual(chatbots[0].catalog_version, old_version)
+        self.assertIs(chatbots[0].catalog, chatbots[1].catalog)
+        self.assertEqual(chatbots[1].products[0].final_price, 800.0)
+        stats = self.reloader.get_stats()
+        self.assertEqual((stats['reloads'], stats['swaps']), (1, 2))
+
+    def test_malformed_file_keeps_live_catalog(self):
+        """Bozuk / yarım yazılmış dosya takılmamalı, eski katalog yayında kalmalı"""
+        chatbot = ImprovedFinalMVPChatbot(tenant_id="butik", products_file=self.products_file,
+                                          shared=SharedChatbotComponents())
+        self.reloader.register(chatbot)
+        old_catalog = chatbot.catalog
+
+        with open(self.products_file, 'w', encoding='utf-8') as f:
+            f.write('[{"name": "Dantelli Gec')
+        self.reloader.reload(self.products_file, wait=True)
+
+        self.assertIs(chatbot.catalog, old_catalog)
+        self.assertEqual(len(chatbot.products), 1)
+        stats = self.reloader.get_stats()
+        self.assertEqual((stats['reloads'], stats['swaps'], stats['reload_errors']), (0, 0, 1))
+
+        # Dosya düzelince yeni katalog takılmalı
+        write_products(self.products_file, NEW_PRODUCTS)
+        self.reloader.reload(self.products_file, wait=True)
+        self.assertEqual(chatbot.products[0].final_price, 800.0)
+
+    def test_journal_append_is_reloaded(self):
+        """Sadece journal'a eklenen ürün de değişiklik sayılmalı ve kataloğa yansımalı"""
+        os.remove(self.products_file)
+        manager = MVPBusinessManager(data_dir=self.data_dir)
+        manager.upsert_products("butik", OLD_PRODUCTS)
+        chatbot = ImprovedFinalMVPChatbot(tenant_id="butik", products_file=self.products_file,
+                                          shared=SharedChatbotComponents())
+        self.reloader.register(chatbot)
+
+        manager.add_product("butik", {"name": "Sabahlık", "price": 900}, compact=False)
+        self.assertEqual(self.reloader.check(), 1)
+        self.reloader._building[self.products_file].join()
+
+        self.assertEqual([p.name for p in chatbot.products], ["Dantelli Gecelik", "Sabahlık"])
+
+    def test_pool_reload_catalog_keeps_chatbot(self):
+        """Havuz ürün değişikliğinde chatbot'u silmeden kataloğu yenilemeli"""
+        pool = TenantChatbotPool(max_size=5, business_manager=FakeBusinessManager(self.data_dir),
+                                 reloader=self.reloader)
+        pool._shared = SharedChatbotComponents()
+        chatbot = pool.get("butik")
+
+        write_products(self.products_file, NEW_PRODUCTS)
+        self.assertTrue(pool.reload_catalog("butik", wait=True))
+
+        self.assertIs(pool.get("butik"), chatbot)
+        self.assertEqual(chatbot.products[0].final_price, 800.0)
+        self.assertIs(pool._catalogs[self.products_file], chatbot.catalog)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Catalog Service Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_service import CatalogLoadError, CatalogService, journal_path
+from database_analyzer import DatabaseAnalyzer
+
+PRODUCTS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 10.0,
+     "final_price": 900.0, "category": "gecelik", "stock": 5, "beden": "S-M-L"},
+    {"name": "Hamile Pijama Takımı", "color": "PEMBE", "price": 1200.0, "discount": 0.0,
+     "final_price": 1200.0, "category": "pijama", "stock": 0}
+]
+
+class TestCatalogService(unittest.TestCase):
+    """Tek seferlik katalog yükleme testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmp_dir.name, "products.json")
+        self._write(PRODUCTS)
+        self.service = CatalogService()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, products):
+        with open(self.products_file, 'w', encoding='utf-8') as f:
+            json.dump(products, f, ensure_ascii=False)
+
+    def test_file_parsed_once(self):
+        """Aynı dosya tekrar parse edilmemeli, aynı nesne paylaşılmalı"""
+        first = self.service.load(self.products_file)
+        second = self.service.load(self.products_file)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.service.get_stats()['parses'], 1)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(first.products[0].final_price, 900.0)
+
+    def test_catalog_is_read_only(self):
+        """Paylaşılan katalog değiştirilememeli"""
+        catalog = self.service.load(self.products_file)
+
+        with self.assertRaises(AttributeError):
+            catalog.products[0].stock = 99
+        with self.assertRaises(TypeError):
+            catalog.schema.field_samples["beden"] = ("XL",)
+
+    def test_changed_file_is_reloaded(self):
+        """Dosya değişince yeni sürüm yüklenmeli"""
+        old_catalog = self.service.load(self.products_file)
+        self._write(PRODUCTS[:1])
+        os.utime(self.products_file, ns=(1, 1))
+
+        new_catalog = self.service.load(self.products_file)
+        self.assertEqual(len(new_catalog), 1)
+        self.assertNotEqual(old_catalog.version, new_catalog.version)
+
+    def test_schema_is_by_product_of_loading(self):
+        """Alan şeması ayrı bir tarama olmadan analyzer'a verilmeli"""
+        catalog = self.service.load(self.products_file)
+        self.assertIn("beden", catalog.schema.available_fields)
+        self.assertEqual(catalog.schema.field_samples["beden"], ("S-M-L",))
+
+        analyzer = DatabaseAnalyzer(self.products_file, schema=catalog.schema)
+        self.assertTrue(analyzer.has_size_info())
+        self.assertFalse(analyzer.has_material_info())
+        self.assertEqual(self.service.get_stats()['parses'], 1)
+
+    def test_malformed_file_keeps_last_good_catalog(self):
+        """Bozuk dosyada son sağlam katalog dönmeli, strict modda hata verilmeli"""
+        good = self.service.load(self.products_file)
+        with open(self.products_file, 'w', encoding='utf-8') as f:
+            f.write('[{"name": ')
+
+        self.assertIs(self.service.load(self.products_file), good)
+        with self.assertRaises(CatalogLoadError):
+            self.service.load(self.products_file, strict=True)
+        self.assertEqual(self.service.get_stats()['parse_errors'], 2)
+
+    def test_journal_is_replayed_over_file(self):
+        """Journal kayıtları product_id ile dosyadaki ürünleri güncellemeli veya eklemeli"""
+        self._write([dict(PRODUCTS[0], product_id="p1"), dict(PRODUCTS[1], product_id="p2")])
+        before = self.service.load(self.products_file)
+        records = [dict(PRODUCTS[0], product_id="p1", final_price=800.0),
+                   dict(PRODUCTS[1], product_id="p3", name="Sabahlık")]
+        with open(journal_path(self.products_file), 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({"op": "upsert", "product": record}, ensure_ascii=False) + "\n")
+            f.write('{"op": "ups')  # Yarım kalmış son satır
+
+        catalog = self.service.load(self.products_file)
+
+        self.assertNotEqual(catalog.version, before.version)
+        self.assertEqual([p.name for p in catalog.products],
+                         ["Dantelli Gecelik", "Hamile Pijama Takımı", "Sabahlık"])
+        self.assertEqual(catalog.products[0].final_price, 800.0)
+
+    def test_missing_file_gives_empty_catalog(self):
+        """Dosya yoksa boş katalog dönmeli"""
+        catalog = self.service.load(os.path.join(self.tmp_dir.name, "yok.json"))
+        self.assertEqual(len(catalog), 0)
+        self.assertEqual(catalog.version, '')
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
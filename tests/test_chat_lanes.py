@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Chat Lane Executor Unit Tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_lanes import ChatLaneExecutor
+
+class TestChatLaneExecutor(unittest.TestCase):
+    """Hızlı / yavaş şerit testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.lanes = ChatLaneExecutor(slow_workers=2, slow_queue=1)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_fast_lane_unaffected_by_slow_backlog(self):
+        """Yavaş şerit doluyken hızlı mesajlar beklememeli"""
+        futures = [self.lanes.submit_slow(self.release.wait, 5) for _ in range(3)]
+        self.assertTrue(all(futures))
+
+        start_time = time.time()
+        self.assertEqual(self.lanes.run_fast(lambda: "merhaba"), "merhaba")
+        self.assertLess(time.time() - start_time, 0.01)
+
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+    def test_slow_lane_is_bounded(self):
+        """Havuz + kuyruk dolunca yeni iş reddedilmeli"""
+        futures = [self.lanes.submit_slow(self.release.wait, 5) for _ in range(3)]
+        self.assertTrue(all(futures))
+        self.assertIsNone(self.lanes.submit_slow(lambda: None))
+
+        stats = self.lanes.get_stats()
+        self.assertEqual((stats['slow']['pending'], stats['slow']['rejected']), (3, 1))
+
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+        time.sleep(0.05)  # Slotlar iş bittikten hemen sonra bırakılır
+        self.assertEqual(self.lanes.submit_slow(lambda: "llm").result(timeout=5), "llm")
+
+    def test_async_queue_separate_from_sync_limit(self):
+        """Async kuyruk WSGI sınırını aşabilmeli, senkron sınırı tüketmemeli"""
+        lanes = ChatLaneExecutor(slow_workers=2, slow_queue=1, async_queue=20)
+        futures = [lanes.submit_slow_async(self.release.wait, 5) for _ in range(22)]
+        self.assertTrue(all(futures))
+        self.assertIsNone(lanes.submit_slow_async(lambda: None))
+
+        # Senkron çağıranlar kendi slotlarını hâlâ alabilmeli
+        sync_futures = [lanes.submit_slow(self.release.wait, 5) for _ in range(3)]
+        self.assertTrue(all(sync_futures))
+        self.assertIsNone(lanes.submit_slow(lambda: None))
+
+        stats = lanes.get_stats()['slow']
+        self.assertEqual((stats['async_pending'], stats['async_rejected']), (22, 1))
+        self.assertEqual((stats['pending'], stats['rejected']), (3, 1))
+
+        self.release.set()
+        for future in futures + sync_futures:
+            future.result(timeout=5)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
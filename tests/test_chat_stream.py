@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Chat Streaming Unit Tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_lanes import ChatLaneExecutor
+from improved_final_mvp_system import ImprovedFinalMVPChatbot
+from llm_scheduler import LLMScheduler, TenantPolicy
+from overload_controller import OverloadController
+from tenant_pool import SharedChatbotComponents
+
+PRODUCTS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 10.0,
+     "final_price": 900.0, "category": "gecelik", "stock": 5},
+    {"name": "Dantelli Gecelik", "color": "PEMBE", "price": 800.0, "discount": 0.0,
+     "final_price": 800.0, "category": "gecelik", "stock": 2}
+]
+
+def make_chatbot(tmp_dir: str) -> ImprovedFinalMVPChatbot:
+    """LLM'siz (model=None) chatbot, geçici ürün dosyasıyla"""
+    products_file = os.path.join(tmp_dir, "products.json")
+    with open(products_file, 'w', encoding='utf-8') as f:
+        json.dump(PRODUCTS, f, ensure_ascii=False)
+    return ImprovedFinalMVPChatbot(tenant_id='stream-test', products_file=products_file,
+                                   shared=SharedChatbotComponents())
+
+class StubModel:
+    """Gemini yerine: kısa bekleyip product_search function call döner"""
+    model_name = 'stub'
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        function_call = SimpleNamespace(args={'intent': 'product_search', 'product_name': 'dantelli gecelik',
+                                              'product_features': [], 'color': '', 'confidence': 0.9})
+        part = SimpleNamespace(function_call=function_call, text='')
+        return SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+            usage_metadata=SimpleNamespace(prompt_token_count=100, candidates_token_count=10),
+            text=''
+        )
+
+class TestChatStream(unittest.TestCase):
+    """SSE olay sırası testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.chatbot = make_chatbot(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_event_order(self):
+        """Olaylar ack → intent → products → message sırasıyla gelmeli"""
+        events = list(self.chatbot.chat_stream("dantelli gecelik arıyorum", session_id="s1"))
+
+        self.assertEqual([event for event, _ in events], ['ack', 'intent', 'products', 'message'])
+        self.assertEqual(events[1][1]['intent'], 'product_search')
+        self.assertEqual({p['name'] for p in events[2][1]['products']}, {"Dantelli Gecelik"})
+        self.assertEqual(events[3][1]['products_found'], len(events[2][1]['products']))
+
+    def test_products_sent_before_formatting(self):
+        """Ürün kartları yanıt metni biçimlenmeden önce gönderilmeli"""
+        seen = []
+        format_response = self.chatbot.format_product_response
+
+        def format_and_record(products):
+            seen.append('format')
+            return format_response(products)
+
+        self.chatbot.format_product_response = format_and_record
+        self.chatbot._chat("dantelli gecelik arıyorum", "s1", lambda event, data: seen.append(event))
+
+        self.assertEqual(seen, ['intent', 'products', 'format'])
+
+    def test_no_products_event_without_results(self):
+        """Ürün dönmeyen mesajda products olayı olmamalı"""
+        events = [event for event, _ in self.chatbot.chat_stream("merhaba", session_id="s2")]
+        self.assertEqual(events, ['ack', 'intent', 'message'])
+
+class TestAsyncChat(unittest.TestCase):
+    """ASGI modu (achat / achat_stream) testleri, LLM taklidiyle"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.chatbot = make_chatbot(self.tmp_dir.name)
+        self.chatbot.model = StubModel()
+        self.chatbot.lanes = ChatLaneExecutor(slow_workers=4, slow_queue=0, async_queue=1000)
+        self.chatbot.overload = OverloadController()
+        self.chatbot.llm_scheduler = LLMScheduler(
+            max_concurrency=4, default_policy=TenantPolicy(max_concurrency=4, daily_tokens=10**9, daily_cost_usd=1e6), wait_timeout=30)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_achat_beyond_wsgi_capacity(self):
+        """WSGI sınırından çok daha fazla eşzamanlı achat reddedilmeden yanıtlanmalı"""
+        conversations = 200
+
+        async def many():
+            return await asyncio.gather(*(
+                self.chatbot.achat(f"bana güzel bir şey önerir misin {i}", session_id=f"a{i}")
+                for i in range(conversations)
+            ))
+
+        responses = asyncio.run(many())
+
+        self.assertGreater(conversations, self.chatbot.lanes.get_stats()['slow']['capacity'])
+        self.assertEqual({response.intent for response in responses}, {'product_search'})
+        self.assertTrue(all(response.products_found for response in responses))
+        self.assertGreaterEqual(self.chatbot.model.calls, conversations)
+        stats = self.chatbot.lanes.get_stats()['slow']
+        self.assertEqual((stats['rejected'], stats['async_rejected']), (0, 0))
+
+    def test_achat_stream_event_order(self):
+        """achat_stream olayları ack → intent → products → message sırasıyla gelmeli"""
+        async def collect():
+            return [item async for item in self.chatbot.achat_stream("bana güzel bir şey önerir misin",
+                                                                    session_id="s1")]
+
+        events = asyncio.run(collect())
+
+        self.assertEqual([event for event, _ in events], ['ack', 'intent', 'products', 'message'])
+        self.assertEqual(events[1][1]['intent'], 'product_search')
+        self.assertGreaterEqual(self.chatbot.model.calls, 1)
+        self.assertEqual(events[3][1]['products_found'], len(events[2][1]['products']))
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
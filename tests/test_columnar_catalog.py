@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Columnar Catalog Unit Tests
+"""
+
+import os
+import pickle
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_service import Product
+from columnar_catalog import ColumnarCatalog, ProductRow, ProductRows
+
+RECORDS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 10.0,
+     "final_price": 900.0, "category": "gecelik", "stock": 5},
+    {"name": "Hamile Pijama Takımı", "color": "PEMBE", "price": 1200.0, "discount": 0.0,
+     "final_price": 1200.0, "category": "pijama", "stock": 0},
+    {"name": "Dantelli Gecelik", "color": "PEMBE", "price": 800.0, "discount": 0.0,
+     "final_price": 800.0, "category": "gecelik", "stock": 2}
+]
+
+class TestColumnarCatalog(unittest.TestCase):
+    """Kolon bazlı katalog testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.columns = ColumnarCatalog(RECORDS)
+
+    def test_row_view_matches_product_interface(self):
+        """Satır görünümü Product alanlarını vermeli"""
+        row = self.columns.row(0)
+        self.assertEqual(row.name, "Dantelli Gecelik")
+        self.assertEqual(row.color, "SİYAH")
+        self.assertEqual(row.final_price, 900.0)
+        self.assertEqual(row.stock, 5)
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def test_colors_are_categorical(self):
+        """Renk ve kategori tekrar eden string tutmamalı"""
+        self.assertEqual(self.columns.colors, ("SİYAH", "PEMBE"))
+        self.assertEqual(list(self.columns.color_codes), [0, 1, 1])
+        self.assertEqual(self.columns.categories, ("gecelik", "pijama"))
+
+    def test_vectorized_filter_and_sort(self):
+        """Filtre ve sıralama kolonlar üzerinde çalışmalı"""
+        mask = self.columns.mask(category="gecelik", in_stock=True)
+        self.assertEqual(list(mask), [True, False, True])
+
+        ids = self.columns.sort_ids('final_price', mask.nonzero()[0])
+        self.assertEqual([self.columns.row(i).final_price for i in ids], [800.0, 900.0])
+
+    def test_sort_by_scores_keeps_catalog_order_for_ties(self):
+        """Skorla azalan sıralama eşitlerde katalog sırasını korumalı"""
+        scores = [50.0, 70.0, 50.0]
+        ids = self.columns.sort_ids(scores, descending=True)
+        self.assertEqual(list(ids), [1, 0, 2])
+
+        discounted = self.columns.mask(discounted=True)
+        self.assertEqual(list(discounted), [True, False, False])
+
+    def test_row_pickles_as_product(self):
+        """Pickle edilen satır tüm kataloğu taşımamalı"""
+        restored = pickle.loads(pickle.dumps(self.columns.row(1)))
+        self.assertIsInstance(restored, Product)
+        self.assertEqual(restored.name, "Hamile Pijama Takımı")
+
+    def test_lazy_rows_sequence(self):
+        """Satır dizisi indeks ve iterasyonu desteklemeli"""
+        rows = ProductRows(self.columns)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1], ProductRow(self.columns, 2))
+        self.assertEqual([row.color for row in rows], ["SİYAH", "PEMBE", "PEMBE"])
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
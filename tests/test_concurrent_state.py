@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Concurrent State Stress Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_lanes import ChatLaneExecutor
+from concurrent_state import BoundedCache, StripedCounters
+from enhanced_conversation_handler import EnhancedConversationHandler
+from improved_final_mvp_system import ImprovedFinalMVPChatbot
+from overload_controller import OverloadController
+from smart_cache_system import SmartCacheSystem
+from tenant_pool import SharedChatbotComponents
+
+THREADS = 64
+
+def run_threads(target, count: int = THREADS):
+    """Start `count` threads together (barrier) and re-raise the first failure"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(i):
+        try:
+            barrier.wait()
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+class TestStripedCounters(unittest.TestCase):
+    """Şeritli sayaç testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.counters = StripedCounters(['requests', 'latency'], stripes=8)
+
+    def test_no_lost_updates(self):
+        """64 thread aynı anda artırınca hiçbir artış kaybolmamalı"""
+        def work(_):
+            for _ in range(2000):
+                self.counters.add('requests')
+                self.counters.add('latency', 0.5)
+
+        run_threads(work)
+        self.assertEqual(self.counters['requests'], THREADS * 2000)
+        self.assertEqual(self.counters.snapshot(), {'requests': THREADS * 2000, 'latency': THREADS * 1000.0})
+
+class TestBoundedCache(unittest.TestCase):
+    """Eşzamanlı sınırlı cache testleri"""
+
+    def test_concurrent_writes_stay_bounded(self):
+        """Eşzamanlı yazma ve tahliye hata vermemeli, boyut sınırı aşılmamalı"""
+        cache = BoundedCache(max_size=100)
+
+        def work(i):
+            for j in range(500):
+                cache.put(f"{i}-{j}", j)
+                cache.get(f"{i}-{j - 1}")
+                cache.setdefault(f"shared-{j % 50}", j)
+            list(cache.items())
+
+        run_threads(work)
+        self.assertEqual(len(cache), 100)
+
+    def test_get_refreshes_recency(self):
+        """Okunan girdi en son tahliye edilmeli"""
+        cache = BoundedCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+class TestSessionIsolation(unittest.TestCase):
+    """Oturumlar arası bağlam sızıntısı testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.handler = EnhancedConversationHandler()
+        self.cache = SmartCacheSystem(default_ttl=60, max_size=1000)
+
+    def _product(self, i: int) -> dict:
+        return {'name': f"Urun {i}", 'color': 'SIYAH', 'price': float(i), 'final_price': float(i),
+                'discount': 0, 'stock': 1}
+
+    def test_conversation_context_is_per_session(self):
+        """Her oturum yalnızca kendi geçmişini ve son ürünlerini görmeli"""
+        def work(i):
+            for turn in range(20):
+                with self.handler.session(f"s{i}") as context:
+                    self.handler.update_context(f"mesaj {i}-{turn}", 'product_search', [self._product(i)])
+                    self.assertIs(self.handler.context, context)
+                    is_followup, response = self.handler.handle_follow_up_questions("1 numaralı ürün fiyatı")
+                    self.assertTrue(is_followup)
+                    self.assertIn(f"Urun {i}**", response)
+                    self.assertTrue(all(item['message'].startswith(f"mesaj {i}-")
+                                        for item in context.conversation_history))
+
+        run_threads(work)
+        self.assertEqual(self.handler.get_conversation_stats()['active_sessions'], THREADS)
+        with self.handler.session("s7"):
+            self.assertEqual(len(self.handler.context.conversation_history), 10)
+
+    def test_stats_do_not_create_a_session(self):
+        """Oturum dışında istatistik okumak boş ('') oturum açmamalı"""
+        with self.handler.session("a"):
+            self.handler.update_context("merhaba", 'greeting')
+
+        stats = self.handler.get_conversation_stats()
+        self.assertEqual(stats['active_sessions'], 1)
+        self.assertEqual(stats['sessions_by_state'], {'greeting': 1})
+        self.assertEqual(self.handler.get_conversation_stats()['active_sessions'], 1)
+
+    def test_same_session_updates_not_lost(self):
+        """Aynı oturuma eşzamanlı yazılar kaybolmamalı"""
+        def work(i):
+            with self.handler.session("ortak"):
+                self.handler.update_context(f"mesaj {i}", 'unclear')
+
+        run_threads(work)
+        with self.handler.session("ortak"):
+            self.assertEqual(self.handler.context.clarification_attempts, THREADS)
+
+    def test_reset_only_drops_one_session(self):
+        """Bir oturumu sıfırlamak diğerlerini etkilememeli"""
+        for session_id in ("a", "b"):
+            with self.handler.session(session_id):
+                self.handler.update_context("gecelik", 'product_search', [self._product(1)])
+        self.handler.reset_context("a")
+        with self.handler.session("a"):
+            self.assertEqual(self.handler.context.last_products, [])
+        with self.handler.session("b"):
+            self.assertEqual(len(self.handler.context.last_products), 1)
+
+    def test_session_cache_is_per_session(self):
+        """Oturum cache'i eşzamanlı yazımda başka oturumun sonucunu döndürmemeli"""
+        def work(i):
+            for turn in range(20):
+                self.cache.put_session("gecelik", [f"s{i}-{turn}"], f"s{i}", store_global=False)
+                self.assertEqual(self.cache.get_session("gecelik", f"s{i}"), [f"s{i}-{turn}"])
+
+        run_threads(work)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['hits'], THREADS * 20)
+        self.assertEqual(stats['total_requests'], 0)
+
+class TestChatbotConcurrency(unittest.TestCase):
+    """Chatbot motoruna eşzamanlı istek testleri (LLM'siz)"""
+
+    TURNS = 12
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        products_file = os.path.join(self.tmp_dir.name, "products.json")
+        with open(products_file, 'w', encoding='utf-8') as f:
+            json.dump([{"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 0.0,
+                        "final_price": 1000.0, "category": "gecelik", "stock": 5}], f, ensure_ascii=False)
+        self.chatbot = ImprovedFinalMVPChatbot(tenant_id='concurrency-test', products_file=products_file,
+                                               shared=SharedChatbotComponents())
+        self.chatbot.lanes = ChatLaneExecutor(slow_workers=8, slow_queue=THREADS)
+        self.chatbot.overload = OverloadController(inflight_levels=[1000, 2000, 3000, 4000])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_concurrent_chats_keep_stats_and_history(self):
+        """Eşzamanlı sohbetlerde sayaçlar kaybolmamalı, her oturum yalnızca kendi geçmişini görmeli"""
+        messages = ["merhaba", "dantelli gecelik arıyorum", "iade var mı"]
+
+        def work(i):
+            for turn in range(self.TURNS):
+                response = self.chatbot.chat(messages[turn % len(messages)], session_id=f"s{i}")
+                self.assertNotIn(response.intent, ('busy', 'error'))
+
+        run_threads(work)
+
+        stats = self.chatbot.get_stats()
+        self.assertEqual(stats['total_requests'], THREADS * self.TURNS)
+        self.assertEqual(stats['successful_requests'], THREADS * self.TURNS)
+        self.assertEqual(stats['conversation_stats']['active_sessions'], THREADS)
+        expected = [messages[turn % len(messages)] for turn in range(self.TURNS)][-10:]
+        for i in range(THREADS):
+            with self.chatbot.conversation_handler.session(f"s{i}") as context:
+                self.assertEqual([item['message'] for item in context.conversation_history], expected)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Graph API Client Unit Tests (against a local stub Graph API server)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_api_client import GraphAPIClient, OutboundMessenger, TokenBucket
+
+class StubGraphAPI(BaseHTTPRequestHandler):
+    """Yanıt sırasını `responses` listesinden alan sahte Graph API"""
+
+    responses = []
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubGraphAPI.requests.append((self.path, self.headers.get('Authorization'), body))
+        status = StubGraphAPI.responses.pop(0) if StubGraphAPI.responses else 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{"messages": [{"id": "wamid.stub"}]}')
+
+    def log_message(self, format, *args):
+        pass
+
+class TestGraphAPIClient(unittest.TestCase):
+    """Giden mesaj istemcisi testleri"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGraphAPI)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/v18.0"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        """Test setup"""
+        StubGraphAPI.responses = []
+        StubGraphAPI.requests = []
+        self.client = GraphAPIClient(base_url=self.base_url, max_retries=2, backoff_base=0.01,
+                                     number_rate=1000, recipient_rate=1000, recipient_burst=100)
+
+    def test_whatsapp_send(self):
+        """Mesaj doğru uç noktaya ve yetkiyle gönderilmeli"""
+        self.assertTrue(self.client.send_whatsapp_text("1098", "905551234567", "Merhaba", "token"))
+
+        path, auth, body = StubGraphAPI.requests[0]
+        self.assertEqual(path, "/v18.0/1098/messages")
+        self.assertEqual(auth, "Bearer token")
+        self.assertEqual(body['text']['body'], "Merhaba")
+
+    def test_retries_on_5xx_and_429(self):
+        """5xx ve 429 yanıtları tekrar denenmeli"""
+        StubGraphAPI.responses = [500, 429]
+        self.assertTrue(self.client.send_whatsapp_text("1098", "905551234567", "Merhaba", "token"))
+
+        self.assertEqual(len(StubGraphAPI.requests), 3)
+        stats = self.client.get_stats()
+        self.assertEqual((stats['retries'], stats['throttled_responses'], stats['sent']), (2, 1, 1))
+
+    def test_client_errors_are_not_retried(self):
+        """4xx hataları tekrar denenmemeli"""
+        StubGraphAPI.responses = [400]
+        self.assertFalse(self.client.send_whatsapp_text("1098", "905551234567", "Merhaba", "token"))
+        self.assertEqual(len(StubGraphAPI.requests), 1)
+        self.assertEqual(self.client.get_stats()['failed'], 1)
+
+    def test_outbound_queue_keeps_recipient_order(self):
+        """Giden kuyruk aynı alıcıya sırayı korumalı"""
+        messenger = OutboundMessenger(self.client, lanes=4, max_size=100)
+        for i in range(5):
+            self.assertTrue(messenger.send_whatsapp("1098", "905551234567", f"mesaj {i}", "token"))
+        messenger.drain(timeout=5)
+
+        texts = [body['text']['body'] for _, _, body in StubGraphAPI.requests]
+        self.assertEqual(texts, [f"mesaj {i}" for i in range(5)])
+
+    def _recipients(self):
+        return [body['to'] for _, _, body in StubGraphAPI.requests]
+
+    def test_rate_limited_recipient_does_not_block_lane(self):
+        """Hız sınırına takılan alıcı aynı şeritteki diğer alıcıları bekletmemeli"""
+        client = GraphAPIClient(base_url=self.base_url, max_retries=2, number_rate=1000,
+                                recipient_rate=2, recipient_burst=1)
+        messenger = OutboundMessenger(client, lanes=1, max_size=100)
+        for i in range(3):
+            messenger.send_whatsapp("1098", "905550000001", f"A {i}", "token")
+        messenger.send_whatsapp("1098", "905550000002", "B", "token")
+
+        time.sleep(0.2)
+        self.assertEqual(self._recipients(), ["905550000001", "905550000002"])
+
+        self.assertTrue(messenger.drain(timeout=5))
+        texts = [body['text']['body'] for _, _, body in StubGraphAPI.requests]
+        self.assertEqual(texts, ["A 0", "B", "A 1", "A 2"])
+        self.assertGreaterEqual(messenger.get_stats()['parked'], 2)
+
+    def test_retry_backoff_does_not_block_lane(self):
+        """Tekrar deneme beklemesi şerit thread'inde uyunmadan yapılmalı"""
+        StubGraphAPI.responses = [500]
+        self.client._retry_delay = lambda attempt, response: 0.3
+        messenger = OutboundMessenger(self.client, lanes=1, max_size=100)
+        messenger.send_whatsapp("1098", "905550000001", "A 0", "token")
+        messenger.send_whatsapp("1098", "905550000001", "A 1", "token")
+        messenger.send_whatsapp("1098", "905550000002", "B", "token")
+
+        self.assertTrue(messenger.drain(timeout=5))
+        texts = [body['text']['body'] for _, _, body in StubGraphAPI.requests]
+        self.assertEqual(texts, ["A 0", "B", "A 0", "A 1"])
+        stats = messenger.get_stats()
+        self.assertEqual((stats['client']['sent'], stats['pending'], stats['parked_recipients']), (3, 0, 0))
+
+    def test_parked_send_survives_full_lane(self):
+        """Park edilmiş mesaj döndüğünde şerit doluysa atılmamalı, kısa süre sonra gönderilmeli"""
+        StubGraphAPI.responses = [500]
+        self.client._retry_delay = lambda attempt, response: 0.1
+        messenger = OutboundMessenger(self.client, lanes=1, max_size=1, requeue_delay=0.05)
+        self.assertTrue(messenger.send_whatsapp("1098", "905550000001", "A 0", "token"))
+        deadline = time.time() + 5
+        while messenger.get_stats()['parked'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(messenger.send_whatsapp("1098", "905550000001", "A 1", "token"))
+
+        # Şeridi meşgul et ve kuyruğunu doldur (max_depth = 1)
+        release = threading.Event()
+        self.assertIsNotNone(messenger.lanes.submit("x", release.wait, 5))
+        time.sleep(0.05)
+        self.assertIsNotNone(messenger.lanes.submit("y", lambda: None))
+        time.sleep(0.3)
+        self.assertGreaterEqual(messenger.get_stats()['requeued'], 1)
+
+        release.set()
+        self.assertTrue(messenger.drain(timeout=5))
+        texts = [body['text']['body'] for _, _, body in StubGraphAPI.requests]
+        self.assertEqual(texts, ["A 0", "A 0", "A 1"])
+        stats = messenger.get_stats()
+        self.assertEqual((stats['dropped'], stats['pending'], stats['client']['sent']), (0, 0, 2))
+
+class TestTokenBucket(unittest.TestCase):
+    """Token bucket testleri"""
+
+    def test_burst_then_wait(self):
+        """Burst dolunca bekleme süresi dönmeli"""
+        bucket = TokenBucket(rate=1, capacity=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 1.0, places=1)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Keyed Lane Executor Unit Tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lane_executor import KeyedLaneExecutor
+
+class TestKeyedLaneExecutor(unittest.TestCase):
+    """Anahtar bazlı sıralı yürütme testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.executor = KeyedLaneExecutor(lanes=8, name="test-lane")
+
+    def tearDown(self):
+        self.executor.shutdown(timeout=5)
+
+    def test_same_key_runs_in_order_without_overlap(self):
+        """Aynı oturumun işleri sırayla ve üst üste binmeden çalışmalı"""
+        order = []
+        running = []
+
+        def step(i):
+            running.append(i)
+            self.assertEqual(len(running), 1)
+            time.sleep(0.001)
+            order.append(i)
+            running.pop()
+
+        futures = [self.executor.submit("whatsapp_905551", step, i) for i in range(20)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(order, list(range(20)))
+
+    def test_different_keys_run_in_parallel(self):
+        """Farklı oturumlar paralel çalışmalı"""
+        keys = ["whatsapp_A", "whatsapp_B"]
+        self.assertNotEqual(self.executor.lane_index(keys[0]), self.executor.lane_index(keys[1]))
+        barrier = threading.Barrier(2, timeout=5)
+
+        futures = [self.executor.submit(key, barrier.wait) for key in keys]
+        for future in futures:
+            future.result(timeout=5)
+
+    def test_errors_and_metrics(self):
+        """Hata future'a taşınmalı, bekleme ve derinlik ölçülmeli"""
+        future = self.executor.submit("whatsapp_1", lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            future.result(timeout=5)
+
+        stats = self.executor.get_stats()
+        self.assertEqual((stats['submitted'], stats['failed']), (1, 1))
+        self.assertEqual(stats['lanes'], 8)
+        self.assertIn('max_wait_time', stats)
+
+    def test_bounded_lane_rejects(self):
+        """Dolu şerit yeni işi reddetmeli"""
+        executor = KeyedLaneExecutor(lanes=1, max_depth=1, name="bounded")
+        release = threading.Event()
+        executor.submit("a", release.wait, 5)
+        time.sleep(0.05)  # İlk iş şeritten alınsın
+        self.assertIsNotNone(executor.submit("a", lambda: None))
+        self.assertIsNone(executor.submit("a", lambda: None))
+        release.set()
+        executor.shutdown(timeout=5)
+        self.assertEqual(executor.get_stats()['rejected'], 1)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
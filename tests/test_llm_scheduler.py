@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+LLM Scheduler Unit Tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_scheduler import LLMScheduler, TenantPolicy
+from technical_cost_calculator import llm_call_cost_usd
+
+class TestLLMScheduler(unittest.TestCase):
+    """İşletme bazlı LLM kabul testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.day = date(2024, 12, 1)
+        self.scheduler = LLMScheduler(
+            max_concurrency=1,
+            default_policy=TenantPolicy(max_concurrency=1, daily_tokens=1000, daily_cost_usd=1.0),
+            wait_timeout=0.2, today=lambda: self.day
+        )
+
+    def test_budget_exhaustion_falls_back(self):
+        """Günlük token bütçesi dolunca çağrı reddedilmeli, yeni günde açılmalı"""
+        grant = self.scheduler.acquire("butik01", 100)
+        self.scheduler.release(grant, input_tokens=900, output_tokens=100)
+
+        self.assertFalse(self.scheduler.within_budget("butik01"))
+        self.assertIsNone(self.scheduler.acquire("butik01", 100))
+        self.assertTrue(self.scheduler.within_budget("butik02"))
+
+        tenant = self.scheduler.get_stats()['tenants']['butik01']
+        self.assertEqual((tenant['tokens_today'], tenant['budget_denials']), (1000, 1))
+        self.assertGreater(tenant['cost_today_usd'], 0)
+
+        self.day += timedelta(days=1)
+        self.assertTrue(self.scheduler.within_budget("butik01"))
+
+    def test_cost_uses_model_price(self):
+        """Maliyet çağrının modelinin fiyatıyla hesaplanmalı"""
+        mistral = "mistral.mistral-7b-instruct-v0:2"
+        for tenant_id, model in (("butik01", mistral), ("butik02", None)):
+            grant = self.scheduler.acquire(tenant_id, 100)
+            self.scheduler.release(grant, input_tokens=300, output_tokens=50, model=model)
+
+        tenants = self.scheduler.get_stats()['tenants']
+        self.assertEqual(tenants['butik01']['cost_today_usd'], round(llm_call_cost_usd(300, 50, mistral), 6))
+        self.assertEqual(tenants['butik02']['cost_today_usd'], round(llm_call_cost_usd(300, 50), 6))
+        self.assertGreater(tenants['butik01']['cost_today_usd'], tenants['butik02']['cost_today_usd'])
+
+    def test_wait_timeout_returns_none(self):
+        """Boş slot zamanında açılmazsa yerel yola düşülmeli"""
+        grant = self.scheduler.acquire("butik01", 10)
+        self.assertIsNone(self.scheduler.acquire("butik02", 10))
+        self.scheduler.release(grant)
+        self.assertEqual(self.scheduler.get_stats()['timed_out'], 1)
+
+    def test_noisy_tenant_does_not_starve_others(self):
+        """Yoğun işletme sırada beklerken diğer işletme öne geçmeli"""
+        self.scheduler.wait_timeout = 5
+        order = []
+        first = self.scheduler.acquire("kampanya", 10)
+
+        def call(tenant_id):
+            grant = self.scheduler.acquire(tenant_id, 10)
+            order.append(tenant_id)
+            time.sleep(0.01)
+            self.scheduler.release(grant)
+
+        threads = [threading.Thread(target=call, args=("kampanya",)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)  # Kampanya istekleri kuyrukta
+        late = threading.Thread(target=call, args=("butik01",))
+        late.start()
+        time.sleep(0.05)
+
+        self.scheduler.release(first)
+        for thread in threads + [late]:
+            thread.join(5)
+        self.assertEqual(order[0], "butik01")
+        self.assertEqual(len(order), 4)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
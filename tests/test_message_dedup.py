@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Message Deduplication Unit Tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_dedup import MessageDeduplicator
+
+class TestMessageDeduplicator(unittest.TestCase):
+    """Mesaj id tekilleştirme testleri"""
+
+    def test_redelivery_is_dropped(self):
+        """Aynı mesaj id ikinci kez görülünce düşürülmeli"""
+        dedup = MessageDeduplicator(window_size=10, ttl=60)
+
+        self.assertFalse(dedup.seen("wamid.1"))
+        self.assertTrue(dedup.seen("wamid.1"))
+        self.assertFalse(dedup.seen("wamid.1", channel="instagram"))
+
+        stats = dedup.get_stats()
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['duplicates_by_channel'], {'whatsapp': 1})
+
+    def test_memory_window_is_bounded(self):
+        """Bellek penceresi sınırlı kalmalı"""
+        dedup = MessageDeduplicator(window_size=3, ttl=60)
+        for i in range(10):
+            dedup.seen(f"wamid.{i}")
+
+        self.assertEqual(dedup.get_stats()['window_entries'], 3)
+        self.assertFalse(dedup.seen("wamid.0"))  # Pencereden düştü
+
+    def test_sqlite_tier_survives_restart(self):
+        """SQLite katmanı yeniden başlatmadan sonra da tekrarı yakalamalı"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "dedup.db")
+            self.assertFalse(MessageDeduplicator(window_size=10, ttl=60, db_path=db_path).seen("wamid.9"))
+
+            restarted = MessageDeduplicator(window_size=10, ttl=60, db_path=db_path)
+            self.assertTrue(restarted.seen("wamid.9"))
+            self.assertEqual(restarted.get_stats()['store_hits'], 1)
+            restarted._conn.close()
+
+    def test_missing_id_is_never_dropped(self):
+        """Id'siz mesaj tekrar sayılmamalı"""
+        dedup = MessageDeduplicator(window_size=10, ttl=60)
+        self.assertFalse(dedup.seen(None))
+        self.assertFalse(dedup.seen(None))
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry Unit Tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_registry import STAGE_HISTOGRAM, LatencyHistogram, MetricsRegistry, timed_stage, get_metrics_registry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestLatencyHistogram(unittest.TestCase):
+    """HDR tarzı gecikme histogramı testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.clock = FakeClock()
+        self.histogram = LatencyHistogram(window=60, slots=6, clock=self.clock)
+
+    def test_bucket_relative_error(self):
+        """Her büyüklükte kova üst sınırı değere 1/8 oranından yakın olmalı"""
+        for value in (0.00015, 0.003, 0.047, 0.9, 7.5, 42.0):
+            bound = self.histogram.upper_bound(self.histogram.bucket_index(value))
+            self.assertGreaterEqual(bound, value)
+            self.assertLessEqual(bound, value * (1 + 1 / 8) + 1e-12)
+
+    def test_percentiles(self):
+        """p50/p95/p99 kuyruk gecikmesini göstermeli"""
+        for _ in range(90):
+            self.histogram.record(0.010)
+        for _ in range(9):
+            self.histogram.record(0.200)
+        self.histogram.record(3.0)
+
+        summary = self.histogram.summary()
+        self.assertEqual(summary['window_count'], 100)
+        self.assertAlmostEqual(summary['p50'], 0.010, delta=0.0015)
+        self.assertAlmostEqual(summary['p95'], 0.200, delta=0.025)
+        self.assertAlmostEqual(summary['p99'], 0.200, delta=0.025)
+        self.assertEqual(summary['count'], 100)
+
+    def test_rolling_window_forgets_old_samples(self):
+        """Pencere dışına çıkan örnekler yüzdeliklere girmemeli"""
+        self.histogram.record(5.0)
+        self.clock.now += 30
+        self.histogram.record(0.01)
+        self.assertEqual(self.histogram.summary()['window_count'], 2)
+
+        self.clock.now += 40
+        summary = self.histogram.summary()
+        self.assertEqual(summary['window_count'], 1)
+        self.assertLess(summary['p99'], 0.02)
+        self.assertEqual(summary['count'], 2)  # toplamlar korunur
+
+    def test_concurrent_records_not_lost(self):
+        """64 thread aynı anda kayıt yapınca örnek kaybolmamalı"""
+        barrier = threading.Barrier(64)
+
+        def work():
+            barrier.wait()
+            for i in range(1000):
+                self.histogram.record(0.001 * (i % 10 + 1))
+
+        threads = [threading.Thread(target=work) for _ in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counts, count, _ = self.histogram.totals()
+        self.assertEqual(count, 64000)
+        self.assertEqual(sum(counts), 64000)
+        self.assertEqual(self.histogram.summary()['window_count'], 64000)
+
+    def test_short_lived_threads_keep_stripes_bounded(self):
+        """Her istek için yeni thread açılsa da şerit sayısı sabit kalmalı"""
+        histogram = LatencyHistogram(window=60, slots=6, clock=self.clock, stripes=4)
+        for _ in range(500):
+            thread = threading.Thread(target=histogram.record, args=(0.01,))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(histogram._shards), 4)
+        self.assertEqual(histogram.totals()[1], 500)
+        self.assertEqual(histogram.summary()['window_count'], 500)
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Metrik kayıt defteri ve snapshot testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.clock = FakeClock()
+        self.registry = MetricsRegistry(snapshot_interval=1.0, clock=self.clock)
+
+    def test_same_labels_same_instrument(self):
+        """Aynı ad ve etiketler aynı enstrümanı döndürmeli"""
+        self.assertIs(self.registry.histogram('chat', intent='greeting'),
+                      self.registry.histogram('chat', intent='greeting'))
+        self.assertIsNot(self.registry.histogram('chat', intent='greeting'),
+                         self.registry.histogram('chat', intent='product_search'))
+
+    def test_snapshot_is_cached_until_interval(self):
+        """Snapshot aralık dolana kadar yeniden hesaplanmamalı"""
+        counters = self.registry.counters('chatbot', ['total_requests'], tenant='butik')
+        counters.add('total_requests')
+        self.registry.observe('chat', 0.05, intent='greeting')
+
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot['counters']['chatbot']['tenant=butik']['total_requests'], 1)
+        self.assertEqual(snapshot['histograms']['chat']['intent=greeting']['window_count'], 1)
+
+        counters.add('total_requests')
+        self.assertIs(self.registry.snapshot(), snapshot)
+        self.clock.now += 1.0
+        self.assertEqual(self.registry.snapshot()['counters']['chatbot']['tenant=butik']['total_requests'], 2)
+
+    def test_timed_stage_records_to_global_registry(self):
+        """timed_stage aşama histogramına kayıt yapmalı"""
+        histogram = get_metrics_registry().histogram(STAGE_HISTOGRAM, stage='test_stage')
+        before = histogram.totals()[1]
+
+        @timed_stage('test_stage')
+        def stage():
+            return 42
+
+        self.assertEqual(stage(), 42)
+        with timed_stage('test_stage'):
+            pass
+        self.assertEqual(histogram.totals()[1], before + 2)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
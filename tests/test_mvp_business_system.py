@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+MVP Business System Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_service import CatalogService
+from mvp_business_system import MVPBusinessManager
+
+class TestProductUpsert(unittest.TestCase):
+    """Toplu ürün upsert ve journal testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manager = MVPBusinessManager(data_dir=self.tmp_dir.name)
+        self.business_id = "butik01"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _snapshot(self):
+        with open(self.manager._products_path(self.business_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_bulk_upsert_writes_snapshot_once(self):
+        """Toplu yükleme tek snapshot yazmalı, journal boş kalmalı"""
+        items = [{"name": f"Gecelik {i}", "color": "SİYAH", "price": 100 + i, "stock": 3}
+                 for i in range(1000)]
+
+        result = self.manager.upsert_products(self.business_id, items)
+
+        self.assertEqual(result['inserted'], 1000)
+        self.assertEqual(len(self._snapshot()), 1000)
+        self.assertFalse(os.path.exists(self.manager._journal_path(self.business_id)))
+
+    def test_upsert_updates_by_name_and_color(self):
+        """Aynı isim+renk tekrar yüklenince güncellenmeli, kopyalanmamalı"""
+        self.manager.upsert_products(self.business_id, [{"name": "Pijama", "color": "PEMBE", "price": 500}])
+        result = self.manager.upsert_products(self.business_id, [
+            {"name": "pijama", "color": "pembe", "price": 450},
+            {"name": "Pijama", "color": "MAVİ", "price": 500}
+        ])
+
+        self.assertEqual((result['inserted'], result['updated'], result['total']), (1, 1, 2))
+        prices = sorted(p['price'] for p in self.manager.get_products(self.business_id))
+        self.assertEqual(prices, [450.0, 500.0])
+
+    def test_journal_replayed_by_other_process(self):
+        """Compaction öncesi journal başka bir yönetici tarafından okunabilmeli"""
+        self.manager.upsert_products(self.business_id, [{"name": "Sabahlık", "price": 900}])
+        self.manager.add_product(self.business_id, {"name": "Gecelik", "price": 300}, compact=False)
+
+        other = MVPBusinessManager(data_dir=self.tmp_dir.name)
+        names = sorted(p['name'] for p in other.get_products(self.business_id))
+        self.assertEqual(names, ["Gecelik", "Sabahlık"])
+        self.assertEqual(len(self._snapshot()), 1)
+
+        self.manager.compact_products(self.business_id)
+        self.assertEqual(len(self._snapshot()), 2)
+        self.assertFalse(os.path.exists(self.manager._journal_path(self.business_id)))
+
+    def test_journal_compacts_at_threshold(self):
+        """Journal eşiği dolunca snapshot'a katlanmalı"""
+        self.manager.journal_compact_threshold = 3
+        for i in range(3):  # İlk ekleme snapshot'ı oluşturur, sonrakiler journal'a gider
+            self.manager.add_product(self.business_id, {"name": f"Ürün {i}", "price": 10})
+        self.assertEqual(len(self._snapshot()), 1)
+
+        self.manager.add_product(self.business_id, {"name": "Ürün 3", "price": 10})
+        self.assertEqual(len(self._snapshot()), 4)
+        self.assertFalse(os.path.exists(self.manager._journal_path(self.business_id)))
+
+    def test_single_add_is_visible_in_catalog(self):
+        """Tek ürün eklemesi snapshot'ı yeniden yazmadan chatbot kataloğunda görünmeli"""
+        self.manager.add_product(self.business_id, {"name": "Sabahlık", "price": 900})
+        self.manager.add_product(self.business_id, {"name": "Gecelik", "price": 300})
+
+        self.assertEqual([p['name'] for p in self._snapshot()], ["Sabahlık"])
+        self.assertTrue(os.path.exists(self.manager._journal_path(self.business_id)))
+        catalog = CatalogService().load(self.manager._products_path(self.business_id))
+        self.assertEqual([p.name for p in catalog.products], ["Sabahlık", "Gecelik"])
+
+    def test_invalid_items_are_skipped(self):
+        """Geçersiz fiyatlı ürün tüm yüklemeyi bozmamalı"""
+        result = self.manager.upsert_products(self.business_id, [
+            {"name": "Geçerli", "price": 10},
+            {"name": "Bozuk", "price": "on lira"}
+        ])
+        self.assertEqual((result['inserted'], result['skipped']), (1, 1))
+
+class TestBusinessRoutingIndex(unittest.TestCase):
+    """Webhook yönlendirme indeksi testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manager = MVPBusinessManager(data_dir=self.tmp_dir.name, backend='json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _create(self, name, phone, **extra):
+        return self.manager.create_business({"name": name, "email": "info@example.com",
+                                             "phone": phone, **extra})
+
+    def test_lookups_by_phone_number_id_and_instagram(self):
+        """phone_number_id, telefon ve Instagram id ile çözümleme"""
+        business_id = self._create("Butik", "0555 123 45 67", whatsapp_phone_number_id="1098",
+                                   instagram_user_id="ig-77", status="active")
+
+        self.assertEqual(self.manager.find_business_by_phone_number_id("1098"), business_id)
+        self.assertEqual(self.manager.find_business_by_phone("+90 555 123 4567"), business_id)
+        self.assertEqual(self.manager.find_business_by_instagram_id("ig-77"), business_id)
+        self.assertIsNone(self.manager.find_business_by_instagram_id("ig-00"))
+
+    def test_update_is_visible_without_rebuild(self):
+        """Güncelleme indeksi yeniden kurmadan yansımalı"""
+        business_id = self._create("Butik", "0555 123 45 67")
+        self.assertEqual(self.manager.get_default_business_id(), business_id)
+        self.assertIsNone(self.manager.get_default_business_id(active_only=True))
+        rebuilds = self.manager.routing.stats['rebuilds']
+
+        self.manager.update_business(business_id, {"phone": "0532 000 00 00", "status": "active"})
+
+        self.assertIsNone(self.manager.find_business_by_phone("05551234567"))
+        self.assertEqual(self.manager.find_business_by_phone("05320000000"), business_id)
+        self.assertEqual(self.manager.get_default_business_id(active_only=True), business_id)
+        self.assertEqual(self.manager.routing.stats['rebuilds'], rebuilds)
+
+    def test_other_process_writes_are_picked_up(self):
+        """Başka yöneticinin oluşturduğu işletme imza kontrolüyle görülmeli"""
+        self.manager.routing.refresh_interval = 0
+        self.assertIsNone(self.manager.find_business_by_phone("05551234567"))
+
+        other = MVPBusinessManager(data_dir=self.tmp_dir.name, backend='json')
+        business_id = other.create_business({"name": "Yeni", "email": "a@b.c", "phone": "05551234567"})
+
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), business_id)
+
+    def test_shared_phone_resolves_to_oldest_business(self):
+        """Aynı telefonu kullanan işletmelerde en eskisi kazanmalı (güncellemede ve yeniden kurulumda)"""
+        oldest = self._create("Eski", "0555 123 45 67")
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), oldest)
+
+        newest = self._create("Yeni", "0555 123 45 67")
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), oldest)
+
+        self.manager.update_business(newest, {"status": "active"})
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), oldest)
+
+        self.manager.routing.rebuild()
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), oldest)
+
+        # Eski işletme numarasını değiştirince numara diğerine geçmeli
+        self.manager.update_business(oldest, {"phone": "0532 000 00 00"})
+        self.assertEqual(self.manager.find_business_by_phone("05551234567"), newest)
+        self.assertEqual(self.manager.find_business_by_phone("05320000000"), oldest)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Overload Controller Unit Tests
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from overload_controller import (LOCAL_INTENT, NORMAL, SHED, SKIP_ENHANCEMENT, SKIP_VALIDATION,
+                                 OverloadController)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestOverloadController(unittest.TestCase):
+    """Aşırı yük kademeleri testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.clock = FakeClock()
+        self.controller = OverloadController(
+            inflight_levels=[2, 4, 6, 8], latency_levels=[1, 2, 3, 4],
+            exit_ratio=0.5, cooldown=5, alpha=1.0, idle_decay=0, clock=self.clock
+        )
+
+    def test_in_flight_raises_level(self):
+        """Eşzamanlı istek sayısı arttıkça kademe yükselmeli"""
+        for _ in range(4):
+            self.controller.begin()
+        self.assertEqual(self.controller.level, SKIP_ENHANCEMENT)
+        self.assertTrue(self.controller.should_degrade(SKIP_VALIDATION))
+        self.assertFalse(self.controller.should_degrade(LOCAL_INTENT))
+
+    def test_degradation_scope_records_fired_steps(self):
+        """Takip bloğu içinde kapatılan adımlar kaydedilmeli, dışındakiler kaydedilmemeli"""
+        with self.controller.track_degradation() as degradation:
+            self.controller.should_degrade(SKIP_VALIDATION)
+        self.assertEqual(degradation.steps, set())
+
+        for _ in range(4):
+            self.controller.begin()
+        with self.controller.track_degradation() as degradation:
+            self.controller.should_degrade(SKIP_VALIDATION)
+            self.controller.should_degrade(LOCAL_INTENT)
+        self.controller.should_degrade(SKIP_ENHANCEMENT)
+        self.assertEqual(degradation.steps, {SKIP_VALIDATION})
+
+    def test_latency_raises_level(self):
+        """Yavaş yanıtlar kademeyi yükseltmeli"""
+        self.controller.begin()
+        self.controller.end(4.5)
+        self.assertEqual(self.controller.level, SHED)
+        self.assertTrue(self.controller.should_degrade(SHED))
+        self.assertEqual(self.controller.get_stats()['shed'], 1)
+
+    def test_hysteresis_steps_down_after_cooldown(self):
+        """Kademe ancak yük çıkış eşiğinin altında kalınca ve adım adım düşmeli"""
+        self.controller.observe_queue_wait(3.5)
+        self.assertEqual(self.controller.level, LOCAL_INTENT)
+
+        # Eşik altı ama çıkış eşiğinin (x0.5) üstü: kademe korunur
+        self.controller.observe_queue_wait(2.5)
+        self.clock.now += 60
+        self.assertEqual(self.controller.level, LOCAL_INTENT)
+
+        # Baskı kalktı: bekleme süresi sonunda birer kademe düşer
+        self.controller.observe_queue_wait(0.1)
+        self.assertEqual(self.controller.level, LOCAL_INTENT)
+        self.clock.now += 5
+        self.assertEqual(self.controller.level, SKIP_ENHANCEMENT)
+        self.clock.now += 5
+        self.assertEqual(self.controller.level, SKIP_VALIDATION)
+        self.clock.now += 5
+        self.assertEqual(self.controller.level, NORMAL)
+        self.assertEqual(self.controller.get_stats()['level_name'], 'normal')
+
+    def test_idle_latency_fades(self):
+        """Yeni örnek gelmezse gecikme sinyali sönmeli"""
+        controller = OverloadController(inflight_levels=[2, 4, 6, 8], latency_levels=[1, 2, 3, 4],
+                                        cooldown=0, alpha=1.0, idle_decay=1.0, clock=self.clock)
+        with controller.track():
+            pass
+        controller.observe_queue_wait(1.5)
+        self.assertEqual(controller.level, SKIP_VALIDATION)
+        self.clock.now += 10
+        self.assertEqual(controller.level, NORMAL)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
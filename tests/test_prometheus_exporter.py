@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Prometheus Exporter Unit Tests
+"""
+
+import os
+import sys
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_registry import MetricsRegistry
+from prometheus_exporter import _allowed_networks, is_scrape_allowed, render_metrics
+
+class TestRenderMetrics(unittest.TestCase):
+    """Prometheus metin formatı testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.registry = MetricsRegistry()
+
+    def _lines(self):
+        return render_metrics(self.registry).splitlines()
+
+    def test_counters_get_total_suffix_and_labels(self):
+        """Sayaç grupları etiketli *_total sayaçları olarak çıkmalı"""
+        cache = self.registry.counters('cache', ['hits', 'misses'], layer='smart')
+        cache.add('hits', 3)
+        self.registry.counters('chatbot', ['total_requests'], tenant='butik').add('total_requests')
+
+        lines = self._lines()
+        self.assertIn('# TYPE cache_hits_total counter', lines)
+        self.assertIn('cache_hits_total{layer="smart"} 3', lines)
+        self.assertIn('cache_misses_total{layer="smart"} 0', lines)
+        self.assertIn('chatbot_total_requests_total{tenant="butik"} 1', lines)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram kovaları kümülatif olmalı, +Inf toplam sayıya eşit olmalı"""
+        for seconds in (0.00005, 0.003, 0.003, 0.2, 500.0):
+            self.registry.observe('stage_latency_seconds', seconds, stage='rag')
+
+        lines = self._lines()
+        self.assertIn('# TYPE stage_latency_seconds histogram', lines)
+        buckets = [line for line in lines if line.startswith('stage_latency_seconds_bucket')]
+        counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertIn('stage_latency_seconds_bucket{stage="rag",le="0.0001"} 1', lines)
+        self.assertIn('stage_latency_seconds_bucket{stage="rag",le="0.0032"} 3', lines)
+        self.assertIn('stage_latency_seconds_bucket{stage="rag",le="+Inf"} 5', lines)
+        self.assertIn('stage_latency_seconds_count{stage="rag"} 5', lines)
+        self.assertTrue(any(line.startswith('stage_latency_seconds_sum{stage="rag"} 500.2') for line in lines))
+
+    def test_gauges_and_label_escaping(self):
+        """Gauge değerleri okunmalı, hatalı gauge atlanmalı, etiketler kaçışlanmalı"""
+        self.registry.gauge('webhook_queue_depth', lambda: 7)
+        self.registry.gauge('broken_gauge', lambda: 1 / 0)
+        self.registry.counters('llm', ['calls'], model='say "merhaba"\\n').add('calls')
+
+        lines = self._lines()
+        self.assertIn('# TYPE webhook_queue_depth gauge', lines)
+        self.assertIn('webhook_queue_depth 7', lines)
+        self.assertFalse(any(line.startswith('broken_gauge') for line in lines))
+        self.assertIn('llm_calls_total{model="say \\"merhaba\\"\\\\n"} 1', lines)
+
+class TestScrapeAccess(unittest.TestCase):
+    """/metrics erişim kontrolü testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.networks = _allowed_networks("127.0.0.1,::1,10.0.0.0/8,geçersiz")
+
+    def test_direct_scrape_from_allowed_address(self):
+        """İzinli adresten doğrudan gelen istek kabul edilmeli, diğerleri reddedilmeli"""
+        self.assertTrue(is_scrape_allowed({}, "127.0.0.1", "", self.networks))
+        self.assertTrue(is_scrape_allowed({}, "10.1.2.3", "", self.networks))
+        self.assertFalse(is_scrape_allowed({}, "203.0.113.9", "", self.networks))
+        self.assertFalse(is_scrape_allowed({}, None, "", self.networks))
+
+    def test_proxied_request_needs_token(self):
+        """Reverse proxy üzerinden gelen istek localhost görünse de token istemeli"""
+        headers = {'X-Forwarded-For': '203.0.113.9'}
+        self.assertFalse(is_scrape_allowed(headers, "127.0.0.1", "", self.networks))
+        self.assertFalse(is_scrape_allowed(headers, "127.0.0.1", "gizli", self.networks))
+        self.assertTrue(is_scrape_allowed({**headers, 'Authorization': 'Bearer gizli'}, "127.0.0.1",
+                                          "gizli", self.networks))
+
+    def test_wrong_or_empty_token_rejected(self):
+        """Yanlış token ya da tanımsız token ile erişim olmamalı"""
+        self.assertFalse(is_scrape_allowed({'Authorization': 'Bearer yanlis'}, "203.0.113.9",
+                                           "gizli", self.networks))
+        self.assertFalse(is_scrape_allowed({'Authorization': 'Bearer '}, "203.0.113.9", "", self.networks))
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
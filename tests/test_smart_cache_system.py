@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Smart Cache System Unit Tests
+"""
+
+import threading
+import time
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_cache_system import SmartCacheSystem, Uncached
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    """Soft/hard TTL ve stampede koruması testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.cache = SmartCacheSystem(default_ttl=60, max_size=10, early_expiration_beta=0)
+
+    def _age_entry(self, query: str, seconds: float):
+        """Cache girdisini yapay olarak yaşlandır"""
+        entry = self.cache.cache[self.cache._generate_key(query)]
+        entry.created_at -= seconds
+
+    def test_fresh_hit_does_not_recompute(self):
+        """Taze girdi tekrar hesaplanmamalı"""
+        calls = []
+        compute = lambda: calls.append(1) or ["urun"]
+
+        self.assertEqual(self.cache.get_or_compute("gecelik", compute), ["urun"])
+        self.assertEqual(self.cache.get_or_compute("gecelik", compute), ["urun"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+
+    def test_stale_entry_served_while_single_refresh_runs(self):
+        """Soft TTL sonrası eski değer dönmeli, tek arka plan yenilemesi yapılmalı"""
+        self.cache.get_or_compute("pijama", lambda: ["eski"])
+        self._age_entry("pijama", 50)  # soft TTL = 48s, hard TTL = 60s
+
+        release = threading.Event()
+        calls = []
+
+        def slow_compute():
+            calls.append(1)
+            release.wait(2)
+            return ["yeni"]
+
+        results = [self.cache.get_or_compute("pijama", slow_compute) for _ in range(5)]
+        self.assertEqual(results, [["eski"]] * 5)
+
+        release.set()
+        deadline = time.time() + 2
+        while self.cache.get_stats()['background_refreshes'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_stats()['stale_serves'], 5)
+        self.assertEqual(self.cache.get_or_compute("pijama", slow_compute), ["yeni"])
+
+    def test_hard_expired_entry_is_recomputed(self):
+        """Hard TTL sonrası değer senkron olarak yeniden hesaplanmalı"""
+        self.cache.get_or_compute("sabahlık", lambda: ["eski"])
+        self._age_entry("sabahlık", 61)
+
+        self.assertEqual(self.cache.get_or_compute("sabahlık", lambda: ["yeni"]), ["yeni"])
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Aynı anahtar için eşzamanlı miss'ler tek hesaplamada birleşmeli"""
+        calls = []
+        calls_lock = threading.Lock()
+        start = threading.Barrier(8)
+
+        def compute():
+            with calls_lock:
+                calls.append(1)
+            time.sleep(0.1)
+            return ["urun"]
+
+        def worker():
+            start.wait()
+            self.cache.get_or_compute("takım", compute)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_stats()['coalesced_recomputes'], 7)
+        self.assertEqual(self.cache._key_locks, {})
+
+    def test_probabilistic_early_refresh(self):
+        """Hesaplama süresi uzun olan girdiler soft TTL öncesi yenilenebilmeli"""
+        draws = [0.0, 0.99]  # İlk okuma: aralık 0, erken yenileme yok; ikinci: uzun aralık
+        cache = SmartCacheSystem(default_ttl=60, early_expiration_beta=1.0, random_fn=lambda: draws.pop(0))
+        cache.put("gecelik", ["eski"], compute_time=1)
+
+        self.assertEqual(cache.get_or_compute("gecelik", lambda: ["yeni"]), ["eski"])
+        self.assertEqual(cache.get_stats()['early_refreshes'], 0)
+
+        cache.cache[cache._generate_key("gecelik")].created_at -= 45  # soft TTL = 48s
+        self.assertEqual(cache.get_or_compute("gecelik", lambda: ["yeni"]), ["eski"])
+        self.assertEqual(cache.get_stats()['early_refreshes'], 1)
+
+    def test_empty_results_not_cached(self):
+        """Boş sonuçlar cache'e yazılmamalı"""
+        self.assertEqual(self.cache.get_or_compute("yok", lambda: []), [])
+        self.assertEqual(len(self.cache.cache), 0)
+
+class TestNegativeCache(unittest.TestCase):
+    """Sonuçsuz aramalar için negatif cache testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.cache = SmartCacheSystem(default_ttl=60, negative_ttl=30, early_expiration_beta=0)
+
+    def test_zero_result_query_computed_once(self):
+        """Sonuçsuz sorgu aynı katalog sürümünde tekrar hesaplanmamalı"""
+        calls = []
+        compute = lambda: calls.append(1) or []
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get_or_compute("adidas gecelik", compute,
+                                                       negative_scope="butik:v1"), [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.get_stats()['negative_hits'], 2)
+
+    def test_scope_is_per_tenant_and_catalog_version(self):
+        """Farklı tenant veya katalog sürümü negatif girdiyi paylaşmamalı"""
+        self.cache.put_negative("adidas gecelik", "butik:v1")
+
+        self.assertTrue(self.cache.is_negative("adidas gecelik", "butik:v1"))
+        self.assertFalse(self.cache.is_negative("adidas gecelik", "butik:v2"))
+        self.assertFalse(self.cache.is_negative("adidas gecelik", "sutcu:v1"))
+
+    def test_invalidate_tenant(self):
+        """Katalog değişince sadece o tenant'ın negatif girdileri silinmeli"""
+        self.cache.put_negative("adidas", "butik:v1")
+        self.cache.put_negative("adidas", "sutcu:v1")
+
+        self.assertEqual(self.cache.invalidate_negative("butik"), 1)
+        self.assertFalse(self.cache.is_negative("adidas", "butik:v1"))
+        self.assertTrue(self.cache.is_negative("adidas", "sutcu:v1"))
+
+    def test_uncached_results_are_not_stored(self):
+        """Uncached ile dönen sonuçlar (bozulmuş mod) hiçbir cache'e yazılmamalı"""
+        self.assertEqual(self.cache.get_or_compute("adidas", lambda: Uncached([]),
+                                                   negative_scope="butik:v1"), [])
+        self.assertEqual(self.cache.get_or_compute("gecelik", lambda: Uncached(["x"]),
+                                                   negative_scope="butik:v1"), ["x"])
+
+        self.assertEqual(len(self.cache.negative_cache), 0)
+        self.assertEqual(len(self.cache.cache), 0)
+        self.assertEqual(self.cache.get_stats()['uncached_results'], 2)
+
+    def test_negative_entry_expires(self):
+        """Negatif girdiler kısa TTL sonunda düşmeli"""
+        self.cache.put_negative("adidas", "butik:v1")
+        key = "butik:v1|" + self.cache._generate_key("adidas")
+        self.cache.negative_cache[key] -= 31
+
+        self.assertFalse(self.cache.is_negative("adidas", "butik:v1"))
+
+class TestCacheRetirement(unittest.TestCase):
+    """Katalog değişiminde cache emekliye ayırma testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.cache = SmartCacheSystem(default_ttl=60, early_expiration_beta=0)
+
+    def test_retire_drops_all_layers(self):
+        """Eski katalog için tüm girdiler silinmeli"""
+        self.cache.put("gecelik", ["eski"])
+        self.cache.put_session("pijama", ["eski"], "s1", store_global=False)
+        self.cache.put_negative("adidas", "butik:v1")
+
+        self.assertEqual(self.cache.retire(), 3)
+        self.assertIsNone(self.cache.get("gecelik"))
+        self.assertEqual(self.cache.session_cache, {})
+        self.assertFalse(self.cache.is_negative("adidas", "butik:v1"))
+
+    def test_in_flight_result_not_stored_after_retire(self):
+        """Retire öncesi başlayan hesaplama cache'e yazılmamalı"""
+        def compute():
+            self.cache.retire()  # Katalog hesaplama sırasında değişti
+            return ["eski"]
+
+        self.assertEqual(self.cache.get_or_compute("gecelik", compute), ["eski"])
+        self.assertEqual(self.cache.cache, {})
+        self.assertEqual(self.cache.get_stats()['discarded_results'], 1)
+
+    def test_caller_generation_wins_over_current(self):
+        """Katalogu sabitlemeden önce okunan nesil verilince, arada retire olsa da yazılmamalı"""
+        generation = self.cache.generation
+        self.cache.retire()  # Sabitleme ile get_or_compute arasında takas
+
+        self.assertEqual(self.cache.get_or_compute("gecelik", lambda: ["eski"], generation=generation), ["eski"])
+        self.assertEqual(self.cache.cache, {})
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
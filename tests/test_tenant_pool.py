@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tenant Chatbot Pool Unit Tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tenant_pool
+from cache_snapshot import snapshot_path
+from catalog_reloader import CatalogReloader
+from tenant_pool import SharedChatbotComponents, TenantChatbotPool
+
+PRODUCTS = [
+    {"name": "Dantelli Gecelik", "color": "SİYAH", "price": 1000.0, "discount": 0.0,
+     "final_price": 1000.0, "category": "gecelik", "stock": 5}
+]
+
+class FakeBusinessManager:
+    """Ayar imzası testten değiştirilebilen en küçük işletme yöneticisi"""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.signatures = {}
+
+    def business_signature(self, business_id: str):
+        return self.signatures.get(business_id, 1)
+
+    def _load_business(self, business_id: str):
+        return types.SimpleNamespace(name=business_id, phone='', email='', website='', instagram_handle='',
+                                     chatbot_config={}, sector='fashion')
+
+class TestTenantChatbotPool(unittest.TestCase):
+    """Kiracı chatbot havuzu testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.products_file = os.path.join(self.tmp_dir.name, "products.json")
+        with open(self.products_file, 'w', encoding='utf-8') as f:
+            json.dump(PRODUCTS, f, ensure_ascii=False)
+
+        self.business_manager = FakeBusinessManager(self.tmp_dir.name)
+        self.pool = TenantChatbotPool(max_size=2, business_manager=self.business_manager,
+                                      reloader=CatalogReloader(interval=0))
+        self.pool._shared = SharedChatbotComponents(bedrock_client=object())
+        # Her kiracı aynı ürün dosyasını kullanır (varsayılan katalog yüklenmez)
+        self.pool._products_file = lambda business_id: self.products_file
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_least_recently_used_tenant_is_evicted(self):
+        """Havuz dolunca en uzun süredir kullanılmayan kiracı çıkarılmalı"""
+        self.pool.get("a")
+        self.pool.get("b")
+        self.pool.get("a")
+        self.pool.get("c")
+
+        self.assertIn("a", self.pool)
+        self.assertNotIn("b", self.pool)
+        self.assertIn("c", self.pool)
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['evictions'], stats['hits'], stats['builds']), (1, 1, 3))
+
+    def test_signature_change_rebuilds_chatbot(self):
+        """Ayarlar değişince chatbot yeniden kurulmalı, değişmezse aynısı dönmeli"""
+        chatbot = self.pool.get("a")
+        self.assertIs(self.pool.get("a"), chatbot)
+
+        self.business_manager.signatures["a"] = 2
+        rebuilt = self.pool.get("a")
+
+        self.assertIsNot(rebuilt, chatbot)
+        self.assertIs(self.pool.get("a"), rebuilt)
+        self.assertEqual(self.pool.get_stats()['change_invalidations'], 1)
+
+    def test_tenants_share_catalog_and_clients(self):
+        """Aynı ürün dosyasını kullanan kiracılar kataloğu ve LLM istemcilerini paylaşmalı"""
+        first, second = self.pool.get("a"), self.pool.get("b")
+
+        self.assertIsNot(first, second)
+        self.assertIs(first.catalog, second.catalog)
+        self.assertIs(first.bedrock_client, self.pool.shared.bedrock_client)
+        self.assertIs(second.bedrock_client, self.pool.shared.bedrock_client)
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['catalog_builds'], stats['shared_catalogs']), (1, 1))
+
+    def test_cache_snapshot_survives_eviction(self):
+        """Havuzdan çıkan kiracının cache'i kaydedilmeli, yeniden kurulunca geri yüklenmeli"""
+        self.pool.snapshot_dir = self.tmp_dir.name
+        chatbot = self.pool.get("a")
+        chatbot.smart_cache.put("gecelik", ["urun1"])
+        self.pool.get("b")
+        self.pool.get("c")  # "a" çıkarılır
+
+        self.assertNotIn("a", self.pool)
+        self.assertTrue(os.path.exists(snapshot_path("a", self.tmp_dir.name)))
+
+        rebuilt = self.pool.get("a")
+        self.assertIsNot(rebuilt, chatbot)
+        self.assertEqual(rebuilt.smart_cache.get("gecelik"), ["urun1"])
+        self.assertEqual(self.pool.post_deploy_hit_rate(), 100)
+
+        # Kapanışta havuzdaki tüm kiracılar yazılmalı
+        self.assertEqual(self.pool.save_snapshots(), 2)
+        self.assertTrue(os.path.exists(snapshot_path("c", self.tmp_dir.name)))
+
+    def test_concurrent_first_use_builds_catalog_once(self):
+        """Aynı dosyayı ilk kez isteyen eşzamanlı kiracılar kataloğu bir kez kurmalı"""
+        build_catalog = tenant_pool.build_catalog
+
+        def slow_build_catalog(*args, **kwargs):
+            time.sleep(0.05)
+            return build_catalog(*args, **kwargs)
+
+        tenant_pool.build_catalog = slow_build_catalog
+        self.addCleanup(setattr, tenant_pool, 'build_catalog', build_catalog)
+        self.pool.max_size = 8
+
+        threads = [threading.Thread(target=self.pool.get, args=(f"t{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.pool), 8)
+        self.assertEqual(self.pool.get_stats()['catalog_builds'], 1)
+        self.assertEqual(len({id(self.pool.get(f"t{i}").catalog) for i in range(8)}), 1)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
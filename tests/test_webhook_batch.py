@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Webhook Batch Processing Unit Tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook_batch import InboundMessage, SenderBatchProcessor, coalesce_messages
+
+def _message(sender, text, timestamp, business_id="butik01"):
+    return InboundMessage('whatsapp', sender, business_id, text, timestamp, [f"{sender}-{timestamp}"])
+
+class TestWebhookBatch(unittest.TestCase):
+    """Toplu webhook işleme testleri"""
+
+    def test_fragments_are_coalesced(self):
+        """Kısa aralıkla gelen parçalar tek mesaja birleşmeli"""
+        turns = coalesce_messages([
+            _message("905551", "siyah gecelik", 100),
+            _message("905551", "fiyatı ne kadar", 102),
+            _message("905551", "teşekkürler", 200)
+        ], window=3)
+
+        self.assertEqual([t.text for t in turns], ["siyah gecelik fiyatı ne kadar", "teşekkürler"])
+        self.assertEqual(len(turns[0].message_ids), 2)
+
+    def test_senders_in_order_and_concurrent(self):
+        """Aynı gönderici sıralı, farklı göndericiler paralel işlenmeli"""
+        processor = SenderBatchProcessor(lanes=8, coalesce_window=0)
+        both_running = threading.Barrier(2, timeout=5)
+        seen = {}
+
+        def handle_turn(turn):
+            if turn.text.endswith("1"):
+                both_running.wait()  # İki gönderici aynı anda çalışmıyorsa zaman aşımı
+            seen.setdefault(turn.sender_id, []).append(turn.text)
+            return {'status': 'success'}
+
+        results = processor.process([
+            _message("A", "a1", 1), _message("B", "b1", 1),
+            _message("A", "a2", 5), _message("B", "b2", 5)
+        ], handle_turn)
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(seen, {"A": ["a1", "a2"], "B": ["b1", "b2"]})
+
+    def test_failed_turn_does_not_stop_batch(self):
+        """Bir tur hata verirse diğerleri işlenmeli"""
+        processor = SenderBatchProcessor(lanes=1, coalesce_window=0)
+
+        def handle_turn(turn):
+            if turn.text == "bozuk":
+                raise RuntimeError("LLM hatası")
+            return {'status': 'success'}
+
+        results = processor.process([_message("A", "bozuk", 1), _message("A", "sağlam", 2)], handle_turn)
+
+        self.assertEqual([r['status'] for r in results], ['error', 'success'])
+        self.assertEqual(processor.get_stats()['turn_errors'], 1)
+
+    def test_closed_lanes_still_process_delivery(self):
+        """Kapanış sırasında şeritler iş almasa da mesajlar kaybolmamalı"""
+        processor = SenderBatchProcessor(lanes=2, coalesce_window=0)
+        processor.lanes.shutdown(timeout=5)
+        handled = []
+
+        results = processor.process([_message("A", "gecelik", 1), _message("B", "pijama", 1)],
+                                    lambda turn: handled.append(turn.text) or {'status': 'success'})
+
+        self.assertEqual(sorted(handled), ["gecelik", "pijama"])
+        self.assertEqual([r['status'] for r in results], ['success', 'success'])
+        self.assertEqual(processor.get_stats()['inline_senders'], 2)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Webhook Queue Unit Tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the parent directory to the path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook_queue import WebhookQueue
+
+class TestWebhookQueue(unittest.TestCase):
+    """Asenkron webhook kuyruğu testleri"""
+
+    def setUp(self):
+        """Test setup"""
+        self.release = threading.Event()
+        self.processed = []
+
+        def slow_processor(payload):
+            self.release.wait(5)
+            self.processed.append(payload['id'])
+
+        self.queue = WebhookQueue({'whatsapp': slow_processor}, workers=1, max_size=2, drain_timeout=5)
+        self.queue.start()
+
+    def tearDown(self):
+        self.release.set()
+        self.queue.drain()
+
+    def test_submit_returns_without_waiting(self):
+        """Kuyruğa alma işlemin bitmesini beklememeli"""
+        start_time = time.time()
+        self.assertTrue(self.queue.submit('whatsapp', {'id': 1}))
+        self.assertLess(time.time() - start_time, 0.5)
+        self.assertEqual(self.processed, [])
+
+    def test_full_queue_rejects(self):
+        """Kuyruk dolunca teslimat reddedilmeli ve sayılmalı"""
+        results = [self.queue.submit('whatsapp', {'id': i}) for i in range(5)]
+
+        self.assertIn(False, results)
+        stats = self.queue.get_stats()
+        self.assertGreater(stats['rejected'], 0)
+        self.assertLessEqual(stats['depth'], 2)
+
+    def test_drain_finishes_queued_jobs(self):
+        """Drain sırasında kuyruktaki işler tamamlanmalı, yeni iş alınmamalı"""
+        self.queue.submit('whatsapp', {'id': 1})
+        self.queue.submit('whatsapp', {'id': 2})
+        self.release.set()
+
+        self.assertTrue(self.queue.drain())
+        self.assertEqual(sorted(self.processed), [1, 2])
+        self.assertFalse(self.queue.submit('whatsapp', {'id': 3}))
+
+    def test_failed_job_does_not_kill_worker(self):
+        """Hata veren iş worker'ı durdurmamalı"""
+        self.queue.processors['instagram'] = lambda payload: 1 / 0
+        self.release.set()
+        self.queue.submit('instagram', {})
+        self.queue.submit('whatsapp', {'id': 7})
+
+        self.queue.drain()
+        self.assertEqual(self.processed, [7])
+        self.assertEqual(self.queue.get_stats()['failed'], 1)
+
+    def test_busy_count_survives_observer_failure(self):
+        """Bekleme gözlemcisi hata verse de iş çalışmalı, meşgul sayısı sıfıra dönmeli"""
+        def failing_observer(wait):
+            raise RuntimeError("observer")
+
+        self.queue.wait_observer = failing_observer
+        self.release.set()
+        self.queue.submit('whatsapp', {'id': 8})
+        self.queue.submit('whatsapp', {'id': 9})
+
+        self.queue.drain()
+        self.assertEqual(self.processed, [8, 9])
+        self.assertEqual(self.queue.get_stats()['busy_workers'], 0)
+
+if __name__ == "__main__":
+    # Test suite'i çalıştır
+    unittest.main(verbosity=2)
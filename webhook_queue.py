@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Webhook Queue
+Bounded job queue with a worker pool so webhook requests are acknowledged immediately
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WebhookJob:
+    """One verified webhook delivery waiting for processing"""
+    kind: str  # processor name: whatsapp, instagram
+    payload: Dict[str, Any]
+    received_at: float = field(default_factory=time.time)
+
+class WebhookQueue:
+    """Bounded queue + worker threads
+
+    `submit` never blocks: when the queue is full the delivery is rejected
+    so the caller can answer 503 and let Meta retry later instead of tying
+    up a web worker. `drain` stops intake and waits for queued jobs to
+    finish (registered with atexit for graceful shutdown). `wait_observer`
+    is called with each job's queue wait (overload detection).
+    """
+
+    _STOP = object()
+
+    def __init__(self, processors: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 workers: int = None, max_size: int = None, drain_timeout: float = None,
+                 name: str = "webhook", wait_observer: Optional[Callable[[float], None]] = None):
+        self.processors = processors
+        self.name = name
+        self.wait_observer = wait_observer
+        self.workers = workers if workers is not None else int(os.getenv('WEBHOOK_WORKERS', '4'))
+        self.max_size = max_size if max_size is not None else int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+        self.drain_timeout = (drain_timeout if drain_timeout is not None
+                              else float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', '30')))
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_size)
+        self._threads = []
+        self._accepting = True
+        self._busy = 0
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'submitted': 0,
+            'processed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'max_depth': 0,
+            'total_wait_time': 0.0,
+            'total_process_time': 0.0
+        }
+
+    def start(self):
+        """Start the worker threads (workers <= 0 means inline processing)"""
+        if self._threads or self.workers <= 0:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.drain)
+        logger.info(f"📥 {self.name} queue started ({self.workers} workers, max {self.max_size} queued)")
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> bool:
+        """Queue a delivery; False means overloaded (or shutting down)"""
+        job = WebhookJob(kind, payload)
+        if not self._threads:
+            if not self._accepting:
+                return False
+            with self._lock:
+                self.stats['submitted'] += 1
+            self._run(job)
+            return True
+
+        with self._lock:
+            if not self._accepting:
+                self.stats['rejected'] += 1
+                return False
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.stats['rejected'] += 1
+                logger.warning(f"⚠️ {self.name} queue full ({self.max_size}), rejecting {kind} job")
+                return False
+            self.stats['submitted'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self._queue.qsize())
+        return True
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is self._STOP:
+                    return
+                wait = time.time() - job.received_at
+                with self._lock:
+                    self._busy += 1
+                    self.stats['total_wait_time'] += wait
+                try:
+                    if self.wait_observer:
+                        try:
+                            self.wait_observer(wait)
+                        except Exception as e:
+                            logger.error(f"❌ {self.name} wait observer failed: {e}")
+                    self._run(job)
+                finally:
+                    with self._lock:
+                        self._busy -= 1
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: WebhookJob):
+        start_time = time.time()
+        try:
+            self.processors[job.kind](job.payload)
+            ok = True
+        except Exception as e:
+            logger.error(f"❌ {self.name} job failed ({job.kind}): {e}")
+            ok = False
+        with self._lock:
+            self.stats['processed' if ok else 'failed'] += 1
+            self.stats['total_process_time'] += time.time() - start_time
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stop intake, finish queued jobs and stop workers; False if timed out"""
+        timeout = self.drain_timeout if timeout is None else timeout
+        with self._lock:
+            self._accepting = False
+        if not self._threads:
+            return True
+
+        deadline = time.time() + timeout
+        pending = self._queue.qsize()
+        if pending:
+            logger.info(f"⏳ Draining {self.name} queue ({pending} jobs)...")
+        for _ in self._threads:
+            # Stop markers go behind the queued jobs; a full queue frees up as workers run
+            try:
+                self._queue.put(self._STOP, timeout=max(0.0, deadline - time.time()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+
+        drained = not any(thread.is_alive() for thread in self._threads)
+        if not drained:
+            logger.warning(f"⚠️ {self.name} drain timed out, {self._queue.qsize()} jobs left")
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        return drained
+
+    def get_stats(self) -> Dict:
+        """Queue statistics (depth and busy workers show backpressure)"""
+        with self._lock:
+            finished = self.stats['processed'] + self.stats['failed']
+            return {
+                **self.stats,
+                'depth': self._queue.qsize(),
+                'capacity': self.max_size,
+                'workers': len(self._threads),
+                'busy_workers': self._busy,
+                'accepting': self._accepting,
+                'avg_wait_time': self.stats['total_wait_time'] / finished if finished else 0.0,
+                'avg_process_time': self.stats['total_process_time'] / finished if finished else 0.0
+            }
@@ -13,9 +13,19 @@ import logging
 import hmac
 import hashlib
 from typing import Dict, Any
-from improved_final_mvp_system import ImprovedFinalMVPChatbot
 from mvp_business_system import get_business_manager
+from tenant_pool import get_tenant_pool
+from webhook_queue import WebhookQueue
+from message_dedup import get_message_deduplicator
+from webhook_batch import InboundMessage, SenderBatchProcessor
+from graph_api_client import get_outbound_messenger
+from overload_controller import get_overload_controller
+from llm_scheduler import get_llm_scheduler
+from chat_lanes import get_chat_lanes
 from domain_config import domain_config
+from asgi_bridge import AsgiApp, run_app
+from metrics_registry import get_metrics_registry
+from prometheus_exporter import add_metrics_route
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -43,20 +53,30 @@ limiter = Limiter(
 )
 limiter.init_app(app)
 
+# Prometheus /metrics (scrapes are not rate limited)
+limiter.exempt(add_metrics_route(app))
+
 # WhatsApp Business API Configuration
 VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN', 'your-verify-token-here')
 WEBHOOK_SECRET = os.getenv('WHATSAPP_WEBHOOK_SECRET', 'your-webhook-secret')
 ACCESS_TOKEN = os.getenv('WHATSAPP_ACCESS_TOKEN', 'your-access-token')
+PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID', '')
+INSTAGRAM_ACCESS_TOKEN = os.getenv('INSTAGRAM_ACCESS_TOKEN', '')
 
 # Initialize components
 business_manager = get_business_manager()
+tenant_pool = get_tenant_pool()
+tenant_pool.enable_cache_snapshots()  # Tenants start warm after a deploy
+tenant_pool.prewarm()
+tenant_pool.reloader.start()  # Hot-swap edited product files
+message_dedup = get_message_deduplicator()
+batch_processor = SenderBatchProcessor()
+outbound = get_outbound_messenger()  # Started before the webhook queue so it drains last
+overload = get_overload_controller()
 
 class WhatsAppWebhookHandler:
     """WhatsApp webhook handler"""
     
-    def __init__(self):
-        self.business_chatbots = {}  # Cache for business chatbots
-    
     def verify_webhook(self, mode: str, token: str, challenge: str) -> str:
         """Verify webhook subscription"""
         if mode == "subscribe" and token == VERIFY_TOKEN:
@@ -81,154 +101,124 @@ class WhatsAppWebhookHandler:
         return hmac.compare_digest(f"sha256={expected_signature}", signature)
     
     def process_webhook(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process incoming webhook data"""
+        """Process incoming webhook data (every entry, change and message)"""
         try:
-            # Extract message data
-            entry = data.get('entry', [{}])[0]
-            changes = entry.get('changes', [{}])[0]
-            value = changes.get('value', {})
-            
-            # Check if it's a message
-            messages = value.get('messages', [])
-            if not messages:
-                return {'status': 'no_messages'}
-            
-            message = messages[0]
-            
-            # Extract sender info
-            from_number = message.get('from')
-            message_type = message.get('type')
-            
-            # Extract message content
-            if message_type == 'text':
-                message_text = message.get('text', {}).get('body', '')
-            else:
-                logger.info(f"Unsupported message type: {message_type}")
-                return {'status': 'unsupported_type'}
-            
-            # Determine business from phone number or context
-            business_id = self._determine_business(from_number, value)
-            
-            if not business_id:
-                logger.error(f"❌ Could not determine business for number: {from_number}")
-                return {'status': 'business_not_found'}
-            
-            # Get or create chatbot for business
-            chatbot = self._get_business_chatbot(business_id)
-            
-            if not chatbot:
-                logger.error(f"❌ Could not create chatbot for business: {business_id}")
-                return {'status': 'chatbot_error'}
-            
-            # Process message with chatbot
-            session_id = f"whatsapp_{from_number}"
-            response = chatbot.chat(message_text, session_id=session_id)
-            
-            # Send response back via WhatsApp API
-            self._send_whatsapp_message(from_number, response.message)
-            
-            logger.info(f"✅ Processed message from {from_number}: {message_text[:50]}...")
-            
+            inbound = []
+            skipped = {'duplicate': 0, 'unsupported_type': 0, 'business_not_found': 0}
+            
+            for entry in data.get('entry', []):
+                for change in entry.get('changes', []):
+                    value = change.get('value', {})
+                    for message in value.get('messages', []):
+                        # Meta redeliveries: drop before any chat work
+                        if message_dedup.seen(message.get('id'), 'whatsapp'):
+                            logger.info(f"🔁 Duplicate WhatsApp message dropped: {message.get('id')}")
+                            skipped['duplicate'] += 1
+                            continue
+                        
+                        if message.get('type') != 'text':
+                            logger.info(f"Unsupported message type: {message.get('type')}")
+                            skipped['unsupported_type'] += 1
+                            continue
+                        
+                        # Determine business from phone number or context
+                        from_number = message.get('from')
+                        business_id = self._determine_business(from_number, value)
+                        if not business_id:
+                            logger.error(f"❌ Could not determine business for number: {from_number}")
+                            skipped['business_not_found'] += 1
+                            continue
+                        
+                        inbound.append(InboundMessage(
+                            channel='whatsapp',
+                            sender_id=from_number,
+                            business_id=business_id,
+                            text=message.get('text', {}).get('body', ''),
+                            timestamp=float(message.get('timestamp') or 0),
+                            message_ids=[message.get('id')],
+                            reply_from=value.get('metadata', {}).get('phone_number_id') or PHONE_NUMBER_ID
+                        ))
+            
+            if not inbound:
+                return {'status': 'no_messages', 'skipped': skipped}
+            
+            results = batch_processor.process(inbound, self._handle_turn)
             return {
                 'status': 'success',
-                'business_id': business_id,
-                'response_sent': True,
-                'intent': response.intent,
-                'confidence': response.confidence
+                'messages': len(inbound),
+                'turns': results,
+                'skipped': skipped
             }
             
         except Exception as e:
             logger.error(f"❌ Webhook processing error: {e}")
             return {'status': 'error', 'error': str(e)}
     
+    def _handle_turn(self, turn: InboundMessage) -> Dict[str, Any]:
+        """Run one (possibly coalesced) chat turn and reply"""
+        chatbot = self._get_business_chatbot(turn.business_id)
+        if not chatbot:
+            logger.error(f"❌ Could not create chatbot for business: {turn.business_id}")
+            return {'status': 'chatbot_error', 'business_id': turn.business_id}
+        
+        # Process message with chatbot
+        response = chatbot.chat(turn.text, session_id=f"whatsapp_{turn.sender_id}")
+        
+        # Send response back via WhatsApp API
+        response_sent = self._send_whatsapp_message(turn.sender_id, response.message, turn.reply_from)
+        
+        logger.info(f"✅ Processed message from {turn.sender_id}: {turn.text[:50]}...")
+        
+        return {
+            'status': 'success',
+            'business_id': turn.business_id,
+            'response_sent': response_sent,
+            'intent': response.intent,
+            'confidence': response.confidence,
+            'fragments': len(turn.message_ids)
+        }
+    
     def _determine_business(self, phone_number: str, webhook_data: Dict) -> str:
         """Determine which business this message belongs to"""
-        # Method 1: Check if phone number is registered to a specific business
-        businesses = business_manager.get_all_businesses()
+        metadata = webhook_data.get('metadata', {})
         
-        for business in businesses:
-            # Check if phone number matches business phone
-            business_phone = business.get('phone', '').replace(' ', '').replace('+', '')
-            incoming_phone = phone_number.replace(' ', '').replace('+', '')
-            
-            if business_phone and business_phone in incoming_phone:
-                return business['business_id']
+        # Method 1: Receiving WhatsApp number (routing index lookups)
+        business_id = (business_manager.find_business_by_phone_number_id(metadata.get('phone_number_id', ''))
+                       or business_manager.find_business_by_phone(metadata.get('display_phone_number', ''))
+                       or business_manager.find_business_by_phone(phone_number or ''))
+        if business_id:
+            return business_id
         
         # Method 2: Use webhook metadata (if available)
-        metadata = webhook_data.get('metadata', {})
         if 'business_id' in metadata:
             return metadata['business_id']
         
-        # Method 3: Default to first active business (for demo)
-        active_businesses = [b for b in businesses if b.get('status') == 'active']
-        if active_businesses:
-            return active_businesses[0]['business_id']
-        
-        # Method 4: Use first available business
-        if businesses:
-            return businesses[0]['business_id']
-        
-        return None
+        # Method 3: Default to first active business, then first available (for demo)
+        return business_manager.get_default_business_id()
     
     def _get_business_chatbot(self, business_id: str):
-        """Get or create chatbot for business"""
-        if business_id not in self.business_chatbots:
-            try:
-                # Create business-specific chatbot
-                chatbot = ImprovedFinalMVPChatbot()
-                self.business_chatbots[business_id] = chatbot
-                logger.info(f"✅ Created chatbot for business: {business_id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to create chatbot for {business_id}: {e}")
-                return None
-        
-        return self.business_chatbots[business_id]
+        """Get pooled chatbot for business"""
+        return tenant_pool.get(business_id)
     
-    def _send_whatsapp_message(self, to_number: str, message: str):
-        """Send message via WhatsApp Business API"""
-        import requests
-        
+    def _send_whatsapp_message(self, to_number: str, message: str, phone_number_id: str = '') -> bool:
+        """Queue a reply for the WhatsApp Business API (sent by the outbound workers)"""
         if not ACCESS_TOKEN:
             logger.error("❌ No WhatsApp access token configured")
             return False
         
-        # WhatsApp Business API endpoint
-        url = f"https://graph.facebook.com/v18.0/YOUR_PHONE_NUMBER_ID/messages"
-        
-        headers = {
-            'Authorization': f'Bearer {ACCESS_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'messaging_product': 'whatsapp',
-            'to': to_number,
-            'type': 'text',
-            'text': {
-                'body': message
-            }
-        }
+        phone_number_id = phone_number_id or PHONE_NUMBER_ID
+        if not phone_number_id:
+            logger.error("❌ No WhatsApp phone_number_id for reply")
+            return False
         
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            
-            if response.status_code == 200:
-                logger.info(f"✅ Message sent to {to_number}")
-                return True
-            else:
-                logger.error(f"❌ Failed to send message: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Error sending WhatsApp message: {e}")
+        if not outbound.send_whatsapp(phone_number_id, to_number, message, ACCESS_TOKEN):
+            logger.error(f"❌ Outbound queue full, reply to {to_number} dropped")
             return False
+        return True
 
 class InstagramWebhookHandler:
     """Instagram webhook handler"""
     
-    def __init__(self):
-        self.business_chatbots = {}  # Cache for business chatbots
-    
     def verify_webhook(self, mode: str, token: str, challenge: str) -> str:
         """Verify Instagram webhook subscription"""
         if mode == "subscribe" and token == VERIFY_TOKEN:
@@ -239,105 +229,107 @@ class InstagramWebhookHandler:
             return "Verification failed"
     
     def process_instagram_webhook(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process incoming Instagram webhook data"""
+        """Process incoming Instagram webhook data (every entry and messaging event)"""
         try:
-            # Extract Instagram message data
-            entry = data.get('entry', [{}])[0]
-            messaging = entry.get('messaging', [])
-            
-            if not messaging:
-                return {'status': 'no_messages'}
-            
-            message_data = messaging[0]
-            
-            # Extract sender info
-            sender_id = message_data.get('sender', {}).get('id')
-            recipient_id = message_data.get('recipient', {}).get('id')
-            
-            # Extract message content
-            message = message_data.get('message', {})
-            message_text = message.get('text', '')
-            
-            if not message_text:
-                logger.info("No text message found in Instagram webhook")
-                return {'status': 'no_text_message'}
-            
-            # Determine business from recipient ID
-            business_id = self._determine_business_from_instagram(recipient_id)
-            
-            if not business_id:
-                logger.error(f"❌ Could not determine business for Instagram ID: {recipient_id}")
-                return {'status': 'business_not_found'}
-            
-            # Get or create chatbot for business
-            chatbot = self._get_business_chatbot(business_id)
-            
-            if not chatbot:
-                logger.error(f"❌ Could not create chatbot for business: {business_id}")
-                return {'status': 'chatbot_error'}
-            
-            # Process message with chatbot
-            session_id = f"instagram_{sender_id}"
-            response = chatbot.chat(message_text, session_id=session_id)
-            
-            # Send response back via Instagram API
-            self._send_instagram_message(sender_id, response.message)
-            
-            logger.info(f"✅ Processed Instagram message from {sender_id}: {message_text[:50]}...")
-            
+            inbound = []
+            skipped = {'duplicate': 0, 'no_text_message': 0, 'business_not_found': 0}
+            
+            for entry in data.get('entry', []):
+                for message_data in entry.get('messaging', []):
+                    sender_id = message_data.get('sender', {}).get('id')
+                    recipient_id = message_data.get('recipient', {}).get('id')
+                    message = message_data.get('message', {})
+                    
+                    # Meta redeliveries: drop before any chat work
+                    if message_dedup.seen(message.get('mid'), 'instagram'):
+                        logger.info(f"🔁 Duplicate Instagram message dropped: {message.get('mid')}")
+                        skipped['duplicate'] += 1
+                        continue
+                    
+                    if not message.get('text'):
+                        logger.info("No text message found in Instagram webhook")
+                        skipped['no_text_message'] += 1
+                        continue
+                    
+                    # Determine business from recipient ID
+                    business_id = self._determine_business_from_instagram(recipient_id)
+                    if not business_id:
+                        logger.error(f"❌ Could not determine business for Instagram ID: {recipient_id}")
+                        skipped['business_not_found'] += 1
+                        continue
+                    
+                    inbound.append(InboundMessage(
+                        channel='instagram',
+                        sender_id=sender_id,
+                        business_id=business_id,
+                        text=message['text'],
+                        timestamp=float(message_data.get('timestamp') or 0) / 1000,  # ms
+                        message_ids=[message.get('mid')],
+                        reply_from=recipient_id
+                    ))
+            
+            if not inbound:
+                return {'status': 'no_messages', 'skipped': skipped}
+            
+            results = batch_processor.process(inbound, self._handle_turn)
             return {
                 'status': 'success',
-                'business_id': business_id,
-                'response_sent': True,
-                'intent': response.intent,
-                'confidence': response.confidence
+                'messages': len(inbound),
+                'turns': results,
+                'skipped': skipped
             }
             
         except Exception as e:
             logger.error(f"❌ Instagram webhook processing error: {e}")
             return {'status': 'error', 'error': str(e)}
     
+    def _handle_turn(self, turn: InboundMessage) -> Dict[str, Any]:
+        """Run one (possibly coalesced) chat turn and reply"""
+        chatbot = self._get_business_chatbot(turn.business_id)
+        if not chatbot:
+            logger.error(f"❌ Could not create chatbot for business: {turn.business_id}")
+            return {'status': 'chatbot_error', 'business_id': turn.business_id}
+        
+        # Process message with chatbot
+        response = chatbot.chat(turn.text, session_id=f"instagram_{turn.sender_id}")
+        
+        # Send response back via Instagram API
+        response_sent = self._send_instagram_message(turn.sender_id, response.message, turn.reply_from)
+        
+        logger.info(f"✅ Processed Instagram message from {turn.sender_id}: {turn.text[:50]}...")
+        
+        return {
+            'status': 'success',
+            'business_id': turn.business_id,
+            'response_sent': response_sent,
+            'intent': response.intent,
+            'confidence': response.confidence,
+            'fragments': len(turn.message_ids)
+        }
+    
     def _determine_business_from_instagram(self, instagram_id: str) -> str:
         """Determine which business this Instagram message belongs to"""
-        businesses = business_manager.get_all_businesses()
-        
-        for business in businesses:
-            # Check if Instagram ID matches business Instagram account
-            instagram_account = business.get('instagram_account', {})
-            if instagram_account.get('id') == instagram_id:
-                return business['business_id']
+        business_id = business_manager.find_business_by_instagram_id(instagram_id or '')
+        if business_id:
+            return business_id
         
         # Default to first active business (for demo)
-        active_businesses = [b for b in businesses if b.get('status') == 'active']
-        if active_businesses:
-            return active_businesses[0]['business_id']
-        
-        return None
+        return business_manager.get_default_business_id(active_only=True)
     
     def _get_business_chatbot(self, business_id: str):
-        """Get or create chatbot for business"""
-        if business_id not in self.business_chatbots:
-            try:
-                # Create business-specific chatbot
-                chatbot = ImprovedFinalMVPChatbot()
-                self.business_chatbots[business_id] = chatbot
-                logger.info(f"✅ Created Instagram chatbot for business: {business_id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to create Instagram chatbot for {business_id}: {e}")
-                return None
-        
-        return self.business_chatbots[business_id]
+        """Get pooled chatbot for business"""
+        return tenant_pool.get(business_id)
     
-    def _send_instagram_message(self, recipient_id: str, message: str):
-        """Send message via Instagram Basic Display API"""
-        # Note: Instagram Basic Display API doesn't support sending messages
-        # This would require Instagram Messaging API (different from Basic Display)
-        # For now, we'll log the response
-        logger.info(f"📱 Instagram response to {recipient_id}: {message[:100]}...")
-        
-        # TODO: Implement Instagram Messaging API when available
-        # This requires business verification and additional permissions
-        
+    def _send_instagram_message(self, recipient_id: str, message: str, account_id: str = '') -> bool:
+        """Queue a reply for the Instagram Messaging API (sent by the outbound workers)"""
+        if not INSTAGRAM_ACCESS_TOKEN or not account_id:
+            # Messaging API not configured: log the response only
+            logger.info(f"📱 Instagram response to {recipient_id}: {message[:100]}...")
+            return True
+        
+        if not outbound.send_instagram(account_id, recipient_id, message, INSTAGRAM_ACCESS_TOKEN):
+            logger.error(f"❌ Outbound queue full, Instagram reply to {recipient_id} dropped")
+            return False
         return True
     
     def verify_webhook(self, mode: str, token: str, challenge: str) -> str:
@@ -364,152 +356,53 @@ class InstagramWebhookHandler:
         return hmac.compare_digest(f"sha256={expected_signature}", signature)
     
     def process_webhook(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process incoming webhook data"""
-        try:
-            # Extract message data
-            entry = data.get('entry', [{}])[0]
-            changes = entry.get('changes', [{}])[0]
-            value = changes.get('value', {})
-            
-            # Check if it's a message
-            messages = value.get('messages', [])
-            if not messages:
-                return {'status': 'no_messages'}
-            
-            message = messages[0]
-            
-            # Extract sender info
-            from_number = message.get('from')
-            message_type = message.get('type')
-            
-            # Extract message content
-            if message_type == 'text':
-                message_text = message.get('text', {}).get('body', '')
-            else:
-                logger.info(f"Unsupported message type: {message_type}")
-                return {'status': 'unsupported_type'}
-            
-            # Determine business from phone number or context
-            business_id = self._determine_business(from_number, value)
-            
-            if not business_id:
-                logger.error(f"❌ Could not determine business for number: {from_number}")
-                return {'status': 'business_not_found'}
-            
-            # Get or create chatbot for business
-            chatbot = self._get_business_chatbot(business_id)
-            
-            if not chatbot:
-                logger.error(f"❌ Could not create chatbot for business: {business_id}")
-                return {'status': 'chatbot_error'}
-            
-            # Process message with chatbot
-            session_id = f"whatsapp_{from_number}"
-            response = chatbot.chat(message_text, session_id=session_id)
-            
-            # Send response back via WhatsApp API
-            self._send_whatsapp_message(from_number, response.message)
-            
-            logger.info(f"✅ Processed message from {from_number}: {message_text[:50]}...")
-            
-            return {
-                'status': 'success',
-                'business_id': business_id,
-                'response_sent': True,
-                'intent': response.intent,
-                'confidence': response.confidence
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Webhook processing error: {e}")
-            return {'status': 'error', 'error': str(e)}
+        """Process incoming webhook data (same payload format as WhatsApp)"""
+        return whatsapp_handler.process_webhook(data)
     
     def _determine_business(self, phone_number: str, webhook_data: Dict) -> str:
         """Determine which business this message belongs to"""
-        # Method 1: Check if phone number is registered to a specific business
-        businesses = business_manager.get_all_businesses()
+        metadata = webhook_data.get('metadata', {})
         
-        for business in businesses:
-            # Check if phone number matches business phone
-            business_phone = business.get('phone', '').replace(' ', '').replace('+', '')
-            incoming_phone = phone_number.replace(' ', '').replace('+', '')
-            
-            if business_phone and business_phone in incoming_phone:
-                return business['business_id']
+        # Method 1: Receiving WhatsApp number (routing index lookups)
+        business_id = (business_manager.find_business_by_phone_number_id(metadata.get('phone_number_id', ''))
+                       or business_manager.find_business_by_phone(metadata.get('display_phone_number', ''))
+                       or business_manager.find_business_by_phone(phone_number or ''))
+        if business_id:
+            return business_id
         
         # Method 2: Use webhook metadata (if available)
-        metadata = webhook_data.get('metadata', {})
         if 'business_id' in metadata:
             return metadata['business_id']
         
-        # Method 3: Default to first active business (for demo)
-        active_businesses = [b for b in businesses if b.get('status') == 'active']
-        if active_businesses:
-            return active_businesses[0]['business_id']
-        
-        # Method 4: Use first available business
-        if businesses:
-            return businesses[0]['business_id']
-        
-        return None
+        # Method 3: Default to first active business, then first available (for demo)
+        return business_manager.get_default_business_id()
     
     def _get_business_chatbot(self, business_id: str):
-        """Get or create chatbot for business"""
-        if business_id not in self.business_chatbots:
-            try:
-                # Create business-specific chatbot
-                chatbot = ImprovedFinalMVPChatbot()
-                self.business_chatbots[business_id] = chatbot
-                logger.info(f"✅ Created chatbot for business: {business_id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to create chatbot for {business_id}: {e}")
-                return None
-        
-        return self.business_chatbots[business_id]
+        """Get pooled chatbot for business"""
+        return tenant_pool.get(business_id)
     
-    def _send_whatsapp_message(self, to_number: str, message: str):
-        """Send message via WhatsApp Business API"""
-        import requests
-        
-        if not ACCESS_TOKEN:
-            logger.error("❌ No WhatsApp access token configured")
-            return False
-        
-        # WhatsApp Business API endpoint
-        url = f"https://graph.facebook.com/v18.0/YOUR_PHONE_NUMBER_ID/messages"
-        
-        headers = {
-            'Authorization': f'Bearer {ACCESS_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'messaging_product': 'whatsapp',
-            'to': to_number,
-            'type': 'text',
-            'text': {
-                'body': message
-            }
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            
-            if response.status_code == 200:
-                logger.info(f"✅ Message sent to {to_number}")
-                return True
-            else:
-                logger.error(f"❌ Failed to send message: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Error sending WhatsApp message: {e}")
-            return False
+    def _send_whatsapp_message(self, to_number: str, message: str, phone_number_id: str = '') -> bool:
+        """Queue a reply for the WhatsApp Business API"""
+        return whatsapp_handler._send_whatsapp_message(to_number, message, phone_number_id)
 
 # Initialize webhook handlers
 whatsapp_handler = WhatsAppWebhookHandler()
 instagram_handler = InstagramWebhookHandler()
 
+# Deliveries are acknowledged right away and processed by background workers
+webhook_queue = WebhookQueue({
+    'whatsapp': whatsapp_handler.process_webhook,
+    'instagram': instagram_handler.process_instagram_webhook
+}, wait_observer=overload.observe_queue_wait)
+webhook_queue.start()
+get_metrics_registry().gauge('webhook_queue_depth', lambda: webhook_queue.get_stats()['depth'])
+
+def _enqueue(kind: str, data: Dict[str, Any]):
+    """Queue a verified delivery; 503 lets Meta retry when we are overloaded"""
+    if not webhook_queue.submit(kind, data):
+        return jsonify({'status': 'overloaded'}), 503, {'Retry-After': '5'}
+    return jsonify({'status': 'queued'}), 200
+
 @app.route('/webhook', methods=['GET'])
 @limiter.limit("30 per minute")
 def verify_webhook():
@@ -560,9 +453,7 @@ def handle_webhook():
         if not data:
             return "Bad Request", 400
         
-        result = whatsapp_handler.process_webhook(data)
-        
-        return jsonify(result), 200
+        return _enqueue('whatsapp', data)
         
     except Exception as e:
         logger.error(f"❌ WhatsApp webhook handling error: {e}")
@@ -584,9 +475,7 @@ def handle_instagram_webhook():
         if not data:
             return "Bad Request", 400
         
-        result = instagram_handler.process_instagram_webhook(data)
-        
-        return jsonify(result), 200
+        return _enqueue('instagram', data)
         
     except Exception as e:
         logger.error(f"❌ Instagram webhook handling error: {e}")
@@ -639,9 +528,28 @@ def webhook_status():
         'verify_token_configured': bool(VERIFY_TOKEN),
         'access_token_configured': bool(ACCESS_TOKEN),
         'webhook_secret_configured': bool(WEBHOOK_SECRET),
-        'active_whatsapp_chatbots': len(whatsapp_handler.business_chatbots),
-        'active_instagram_chatbots': len(instagram_handler.business_chatbots),
-        'businesses_available': len(business_manager.get_all_businesses())
+        'active_chatbots': len(tenant_pool),
+        'tenant_pool': tenant_pool.get_stats(),
+        'businesses_available': business_manager.count_businesses(),
+        'routing_index': business_manager.routing.get_stats(),
+        'webhook_queue': webhook_queue.get_stats(),
+        'deduplication': message_dedup.get_stats(),
+        'batching': batch_processor.get_stats(),
+        'outbound': outbound.get_stats(),
+        'overload': overload.get_stats(),
+        'llm_scheduler': get_llm_scheduler().get_stats(),
+        'chat_lanes': get_chat_lanes().get_stats()
+    })
+
+@app.route('/health')
+def health():
+    """Health check with the current degradation level"""
+    stats = overload.get_stats()
+    return jsonify({
+        'status': 'healthy' if stats['level'] == 0 else 'degraded',
+        'degradation_level': stats['level'],
+        'overload': stats,
+        'webhook_queue_depth': webhook_queue.get_stats()['depth']
     })
 
 @app.route('/webhook/businesses')
@@ -691,6 +599,9 @@ def test_instagram_webhook():
             'error': str(e)
         }), 500
 
+# ASGI serving mode (SERVER_MODE=asgi or `uvicorn webhook_system:asgi_app`)
+asgi_app = AsgiApp(app)
+
 if __name__ == '__main__':
     port = int(os.environ.get('WEBHOOK_PORT', 5007))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -717,4 +628,4 @@ if __name__ == '__main__':
     print("3. Configure webhook URL in Meta Developer Console:")
     print("   https://your-domain.com/webhook")
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
+    run_app(app, asgi_app, port, debug)
\ No newline at end of file